@@ -1,32 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_read_db
 from app.services.auth_service import AuthService
 from app.schemas.auth import UserCreate, UserLogin, Token, UserResponse
-from app.core.logger import log_action
+from app.core.rate_limit import rate_limit
+from app.core.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(prefix="/auth", tags=["authentication"], route_class=TracedRoute, dependencies=[Depends(rate_limit)])
 security = HTTPBearer()
-limiter = Limiter(key_func=get_remote_address)
 
 @router.post("/register", response_model=UserResponse)
-@log_action("user_registration")
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     auth_service = AuthService(db)
-    return auth_service.register_user(user)
+    return await auth_service.register_user(user)
 
 @router.post("/login", response_model=Token)
-@log_action("user_login")
-def login(user_login: UserLogin, db: Session = Depends(get_db)):
+async def login(user_login: UserLogin, db: AsyncSession = Depends(get_db)):
     auth_service = AuthService(db)
-    return auth_service.authenticate_user(user_login)
+    return await auth_service.authenticate_user(user_login)
 
 @router.get("/me", response_model=UserResponse)
-@log_action("get_user_info")
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    auth_service = AuthService(db)
-    return auth_service.get_current_user(credentials.credentials)
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db), read_db: AsyncSession = Depends(get_read_db)):
+    auth_service = AuthService(db, read_db)
+    return await auth_service.get_current_user(credentials.credentials)
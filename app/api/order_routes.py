@@ -1,38 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi import BackgroundTasks
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_db, get_read_db
 from app.services.order_service import OrderService
 from app.services.auth_service import AuthService
-from app.schemas.order import OrderCreate, OrderResponse, OrderListResponse
-from app.core.logger import log_action
+from app.schemas.order import OrderCreate, OrderResponse, OrderBatchCreate, OrderBatchResponse, OrderExportFilter, OrderFilter, OrderListResponse, OrderStatsFilter, OrderStatsResponse
+from app.core.config import settings
+from app.core.rate_limit import rate_limit
+from app.core.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(prefix="/orders", tags=["orders"], route_class=TracedRoute, dependencies=[Depends(rate_limit)])
 security = HTTPBearer()
-limiter = Limiter(key_func=get_remote_address)
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
-    auth_service = AuthService(db)
-    return auth_service.get_current_user(credentials.credentials)
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db), read_db: AsyncSession = Depends(get_read_db)):
+    auth_service = AuthService(db, read_db)
+    return await auth_service.get_current_user(credentials.credentials)
 
 @router.post("/create", response_model=OrderResponse)
-@log_action("create_order")
-def create_order(order: OrderCreate, background_tasks: BackgroundTasks, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+async def create_order(order: OrderCreate, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db), idempotency_key: Annotated[Optional[str], Header(min_length=1, max_length=settings.IDEMPOTENCY_KEY_MAX_LENGTH)] = None):
     order_service = OrderService(db)
-    return order_service.create_order(order, current_user.id, current_user.email, background_tasks)
+    return await order_service.create_order(order, current_user, idempotency_key)
 
-@router.get("/", response_model=OrderListResponse)
-@log_action("get_orders")
-def get_orders(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+@router.post("/batch", response_model=OrderBatchResponse)
+async def create_orders_batch(batch: OrderBatchCreate, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     order_service = OrderService(db)
+    return await order_service.create_orders(batch, current_user)
+
+@router.get("/", response_model=OrderListResponse)
+async def get_orders(filters: Annotated[OrderFilter, Query()], current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db), read_db: AsyncSession = Depends(get_read_db), if_none_match: Annotated[Optional[str], Header()] = None):
+    order_service = OrderService(db, read_db)
     
     if current_user.role == "admin":
-        orders = order_service.get_all_orders()
-    else:
-        orders = order_service.get_user_orders(current_user.id)
+        return await order_service.get_all_orders(filters, requester_id=current_user.id, if_none_match=if_none_match)
     
-    return OrderListResponse(orders=orders)
+    if filters.user_id is not None and filters.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to list other users' orders"
+        )
+    return await order_service.get_user_orders(current_user.id, filters, if_none_match)
+
+@router.get("/export")
+async def export_orders(filters: Annotated[OrderExportFilter, Query()], current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db), read_db: AsyncSession = Depends(get_read_db)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can export orders"
+        )
+    order_service = OrderService(db, read_db)
+    return await order_service.export_orders(filters, requester_id=current_user.id)
+
+@router.get("/stats", response_model=OrderStatsResponse)
+async def get_order_stats(filters: Annotated[OrderStatsFilter, Query()], current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db), read_db: AsyncSession = Depends(get_read_db)):
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view order statistics"
+        )
+    order_service = OrderService(db, read_db)
+    return await order_service.get_order_stats(filters, requester_id=current_user.id)
@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from prometheus_client import Counter
+
+CACHE_REQUESTS = Counter('cache_requests_total', 'In-process cache lookups', ['cache', 'result'])
+
+_MISSING = object()
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a TTL.
+
+    Holds at most ``maxsize`` entries; inserting beyond that evicts the least
+    recently used one. Hits and misses are exported to Prometheus under the
+    cache ``name``. ``on_evict(key, value)``, if given, is called (outside
+    the cache's lock) for entries dropped by the LRU or found expired, so
+    callers can keep side indexes in step; delete() and clear() do not call it.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, on_evict=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._on_evict = on_evict
+        self._hit_counter = CACHE_REQUESTS.labels(cache=name, result="hit")
+        self._miss_counter = CACHE_REQUESTS.labels(cache=name, result="miss")
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                self._hit_counter.inc()
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+        self._miss_counter.inc()
+        if entry is not _MISSING and self._on_evict is not None:
+            self._on_evict(key, entry[1])
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        evicted = []
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted_key, (_, evicted_value) = self._data.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+        if self._on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self._on_evict(evicted_key, evicted_value)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
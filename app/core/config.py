@@ -11,25 +11,171 @@ class Settings:
     
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./database.db')
+    # Serve requests through the async engine; set to False to run the sync
+    # engine in the threadpool instead (kept for benchmarking the two paths)
+    DB_ASYNC = os.getenv('DB_ASYNC', 'True').lower() == 'true'
+    # Read replicas: comma-separated DSNs that read-only queries are spread
+    # over. A user's reads stay on the primary for DB_READ_YOUR_WRITES_SECONDS
+    # after they write, so they always see their own changes.
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    DB_READ_YOUR_WRITES_SECONDS = float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'))
+    # SQLite file where workers share who wrote recently, so stickiness holds
+    # under `uvicorn --workers N`; empty keeps it per process
+    DB_READ_YOUR_WRITES_PATH = os.getenv('DB_READ_YOUR_WRITES_PATH', './recent_writes.db')
+    # How long a lookup in that file waits for a lock before reading from the primary
+    DB_READ_YOUR_WRITES_BUSY_TIMEOUT_MS = int(os.getenv('DB_READ_YOUR_WRITES_BUSY_TIMEOUT_MS', '50'))
+    
+    # Order sharding: path of the JSON shard map (written by
+    # app/workers/rebalance_shards.py) that spreads users' orders over several
+    # databases; empty keeps every order on DATABASE_URL. Processes pick up
+    # map changes within ORDER_SHARD_MAP_CHECK_INTERVAL seconds.
+    ORDER_SHARD_MAP = os.getenv('ORDER_SHARD_MAP', '')
+    ORDER_SHARD_MAP_CHECK_INTERVAL = float(os.getenv('ORDER_SHARD_MAP_CHECK_INTERVAL', '5'))
+    # Sharded order ids are reserved from the primary this many at a time
+    ORDER_ID_BLOCK_SIZE = int(os.getenv('ORDER_ID_BLOCK_SIZE', '1000'))
+    
+    # Apply pending migrations when the app starts; otherwise run init_db.py
+    # before starting (or scaling out) the server
+    DB_MIGRATE_ON_STARTUP = os.getenv('DB_MIGRATE_ON_STARTUP', 'False').lower() == 'true'
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+    
+    # SQLite connection pragmas, applied to every new connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-64000'))  # negative = KiB
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', '268435456'))
+    SQLITE_FOREIGN_KEYS = os.getenv('SQLITE_FOREIGN_KEYS', 'True').lower() == 'true'
+    
+    # Order listing pagination
+    ORDERS_PAGE_DEFAULT_LIMIT = int(os.getenv('ORDERS_PAGE_DEFAULT_LIMIT', '50'))
+    ORDERS_PAGE_MAX_LIMIT = int(os.getenv('ORDERS_PAGE_MAX_LIMIT', '500'))
+    
+    # GET /orders/stats: hours covered when created_from is not given, and
+    # the page size of its per-user breakdown (keyset paginated on user_id)
+    ORDER_STATS_DEFAULT_WINDOW_HOURS = int(os.getenv('ORDER_STATS_DEFAULT_WINDOW_HOURS', '168'))
+    ORDER_STATS_USERS_DEFAULT_LIMIT = int(os.getenv('ORDER_STATS_USERS_DEFAULT_LIMIT', '100'))
+    ORDER_STATS_USERS_MAX_LIMIT = int(os.getenv('ORDER_STATS_USERS_MAX_LIMIT', '1000'))
+    ORDERS_BATCH_MAX_SIZE = int(os.getenv('ORDERS_BATCH_MAX_SIZE', '1000'))
+    
+    # GET /orders/export: rows fetched and encoded per chunk, and the zlib level of gzip=true
+    ORDER_EXPORT_BATCH_SIZE = int(os.getenv('ORDER_EXPORT_BATCH_SIZE', '5000'))
+    ORDER_EXPORT_GZIP_LEVEL = int(os.getenv('ORDER_EXPORT_GZIP_LEVEL', '1'))
+    
+    # Cold orders: app/workers/archive_orders.py moves whole months older than
+    # ORDER_ARCHIVE_AFTER_MONTHS (besides the current one) out of the orders
+    # table into gzip CSV files under ORDER_ARCHIVE_DIR
+    ORDER_ARCHIVE_DIR = os.getenv('ORDER_ARCHIVE_DIR', './archive')
+    ORDER_ARCHIVE_AFTER_MONTHS = int(os.getenv('ORDER_ARCHIVE_AFTER_MONTHS', '3'))
+    # Processes re-read the archive catalogue at most this often (seconds); the
+    # archiver waits for them before deleting archived rows from the table
+    ORDER_ARCHIVE_CATALOGUE_TTL = float(os.getenv('ORDER_ARCHIVE_CATALOGUE_TTL', '5'))
     
     # JWT
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     ALGORITHM = os.getenv('ALGORITHM', 'HS256')
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '30'))
     
+    # Password hashing: PASSWORD_KDF is "bcrypt" or "scrypt"; hashes made with
+    # another scheme or older parameters are upgraded on the next login
+    PASSWORD_KDF = os.getenv('PASSWORD_KDF', 'bcrypt')
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    SCRYPT_N = int(os.getenv('SCRYPT_N', '16384'))
+    SCRYPT_R = int(os.getenv('SCRYPT_R', '8'))
+    SCRYPT_P = int(os.getenv('SCRYPT_P', '1'))
+    # "process" (dedicated pool), "thread" or "inline" (on the event loop; benchmarks only)
+    PASSWORD_HASH_EXECUTOR = os.getenv('PASSWORD_HASH_EXECUTOR', 'process')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+    # Hashing calls running or queued before new ones are rejected with 503
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '64'))
+    
+    # Authenticated-principal cache (entries also expire with their token);
+    # per process, so changes made by another worker show up within the TTL
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', '10000'))
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', '60'))
+    
+    # Serialized GET /orders pages, reused until the listed orders change.
+    # Pages are per process; their versions are shared through
+    # ORDER_LIST_CACHE_VERSIONS_PATH, so a write through any worker
+    # invalidates them everywhere (empty: per process, stale up to the TTL)
+    ORDER_LIST_CACHE_SIZE = int(os.getenv('ORDER_LIST_CACHE_SIZE', '10000'))
+    ORDER_LIST_CACHE_TTL = int(os.getenv('ORDER_LIST_CACHE_TTL', '30'))
+    ORDER_LIST_CACHE_VERSIONS_PATH = os.getenv('ORDER_LIST_CACHE_VERSIONS_PATH', './order_list_versions.db')
+    # How long a version lookup waits for that file before skipping the cache
+    ORDER_LIST_CACHE_BUSY_TIMEOUT_MS = int(os.getenv('ORDER_LIST_CACHE_BUSY_TIMEOUT_MS', '50'))
+    # Users whose last write version is remembered per process (older ones fall back to a floor)
+    ORDER_LIST_CACHE_MAX_USERS = int(os.getenv('ORDER_LIST_CACHE_MAX_USERS', '100000'))
+    
+    # Idempotency-Key on POST /orders/create: retries within the TTL replay
+    # the stored response; the most recent keys are also kept in memory
+    IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+    IDEMPOTENCY_KEY_MAX_LENGTH = int(os.getenv('IDEMPOTENCY_KEY_MAX_LENGTH', '255'))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000'))
+    
     # Email
     SMTP_SERVER = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
     SMTP_PORT = int(os.getenv('SMTP_PORT', '587'))
     EMAIL_USER = os.getenv('EMAIL_USER', '')
     EMAIL_PASS = os.getenv('EMAIL_PASS', '')
     EMAIL_FROM = os.getenv('EMAIL_FROM', '')
+    SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'True').lower() == 'true'
+    SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', '30'))
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', '4'))
+    SMTP_POOL_IDLE_TIMEOUT = float(os.getenv('SMTP_POOL_IDLE_TIMEOUT', '60'))
+    SMTP_POOL_HEALTHCHECK_INTERVAL = float(os.getenv('SMTP_POOL_HEALTHCHECK_INTERVAL', '15'))
     
-    # Rate Limiting
+    # Notification outbox worker
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+    OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', '8'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '8'))
+    OUTBOX_BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', '5'))
+    OUTBOX_BACKOFF_MAX = float(os.getenv('OUTBOX_BACKOFF_MAX', '900'))
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '300'))
+    OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', '1'))
+    
+    # Rate Limiting: token bucket of RATE_LIMIT_REQUESTS per RATE_LIMIT_WINDOW
+    # seconds for each route and client, overridable per route, e.g.
+    # RATE_LIMIT_ROUTES="GET /orders/=120/60,POST /auth/login=10/60" (0 = unlimited)
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
     RATE_LIMIT_REQUESTS = int(os.getenv('RATE_LIMIT_REQUESTS', '5'))
     RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_WINDOW', '60'))
+    RATE_LIMIT_ROUTES = os.getenv('RATE_LIMIT_ROUTES', '')
+    # "sqlite" shares buckets between worker processes; "memory" is per process
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'sqlite')
+    RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', './rate_limits.db')
+    # How long a check waits for the shared file's write lock before letting the request through
+    RATE_LIMIT_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('RATE_LIMIT_SQLITE_BUSY_TIMEOUT_MS', '50'))
     
     # Logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
     LOG_FILE = os.getenv('LOG_FILE', 'logs/app.log')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # "json" or "text"
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # Per-call "Completed X in Ys" lines from log_action; failures are always logged
+    LOG_ACTION_TIMINGS = os.getenv('LOG_ACTION_TIMINGS', 'False' if ENVIRONMENT == 'production' else 'True').lower() == 'true'
+    # Fraction of calls whose timings are logged, e.g. "create_order=0.1,get_orders=0.01"
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+    
+    # HTTP metrics histogram buckets (seconds / bytes), comma-separated
+    METRICS_LATENCY_BUCKETS = tuple(float(b) for b in os.getenv(
+        'METRICS_LATENCY_BUCKETS', '0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10'
+    ).split(','))
+    METRICS_SIZE_BUCKETS = tuple(float(b) for b in os.getenv(
+        'METRICS_SIZE_BUCKETS', '100,1000,10000,100000,1000000,10000000'
+    ).split(','))
+    
+    # Tracing: per-stage span histograms are always recorded while enabled;
+    # TRACING_SAMPLE_RATE of traces are also exported ("none", "file" or "otlp")
+    TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'True').lower() == 'true'
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none')
+    TRACING_FILE = os.getenv('TRACING_FILE', 'logs/traces.jsonl')
+    TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+    TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'mini-order-service')
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+    TRACING_EXPORT_BATCH_SIZE = int(os.getenv('TRACING_EXPORT_BATCH_SIZE', '512'))
+    TRACING_EXPORT_INTERVAL = float(os.getenv('TRACING_EXPORT_INTERVAL', '2'))
+    TRACING_QUEUE_SIZE = int(os.getenv('TRACING_QUEUE_SIZE', '10000'))
 
 settings = Settings()
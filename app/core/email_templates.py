@@ -0,0 +1,110 @@
+import html
+import re
+import threading
+import uuid
+from email.header import Header
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from app.core.config import settings
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+# name -> subject; each name needs <name>.html and <name>.txt in TEMPLATE_DIR
+EMAIL_TEMPLATES = {
+    "order_success": "Order Successful",
+    "order_failed": "Order Failed",
+    "order_batch": "Order Batch Summary",
+}
+
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+class CompiledTemplate:
+    """Template split once into encoded static chunks and field slots"""
+
+    def __init__(self, source: str, escape=None):
+        # Mail bodies travel with CRLF line endings
+        source = source.replace("\r\n", "\n").replace("\n", "\r\n")
+        parts = PLACEHOLDER.split(source)
+        self.static = [part.encode("utf-8") for part in parts[0::2]]
+        self.fields = parts[1::2]
+        self.escape = escape
+
+    def render(self, values: dict) -> bytes:
+        chunks = [self.static[0]]
+        for field, static in zip(self.fields, self.static[1:]):
+            value = str(values[field])
+            if self.escape:
+                value = self.escape(value)
+            chunks.append(value.encode("utf-8"))
+            chunks.append(static)
+        return b"".join(chunks)
+
+class CompiledEmail:
+    """text/plain + text/html multipart/alternative message with prebuilt MIME scaffolding.
+
+    Everything except the recipient, Date, Message-ID and template fields is
+    encoded once, so rendering a message is a handful of byte joins.
+    """
+
+    def __init__(self, subject: str, text_source: str, html_source: str, sender: str):
+        self.text = CompiledTemplate(text_source)
+        self.html = CompiledTemplate(html_source, escape=html.escape)
+        boundary = f"=_{uuid.uuid4().hex}"
+        self.headers = (
+            f"From: {sender}\r\n"
+            f"Subject: {Header(subject, 'utf-8').encode()}\r\n"
+            "MIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n'
+        ).encode("ascii")
+        self.text_open = (
+            f"\r\n--{boundary}\r\n"
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: 8bit\r\n\r\n"
+        ).encode("ascii")
+        self.html_open = (
+            f"\r\n--{boundary}\r\n"
+            'Content-Type: text/html; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: 8bit\r\n\r\n"
+        ).encode("ascii")
+        self.close = f"\r\n--{boundary}--\r\n".encode("ascii")
+
+    def render(self, to_email: str, values: dict) -> bytes:
+        if "\r" in to_email or "\n" in to_email:
+            raise ValueError("Invalid recipient address")
+        envelope = (
+            f"To: {to_email}\r\n"
+            f"Date: {formatdate(usegmt=True)}\r\n"
+            f"Message-ID: {make_msgid()}\r\n"
+        ).encode("utf-8")
+        return b"".join((
+            self.headers, envelope, self.text_open, self.text.render(values),
+            self.html_open, self.html.render(values), self.close
+        ))
+
+class EmailTemplateEngine:
+    def __init__(self, sender: str, directory: Path = TEMPLATE_DIR, templates: dict = EMAIL_TEMPLATES):
+        self.templates = {
+            name: CompiledEmail(
+                subject,
+                (directory / f"{name}.txt").read_text(encoding="utf-8"),
+                (directory / f"{name}.html").read_text(encoding="utf-8"),
+                sender
+            )
+            for name, subject in templates.items()
+        }
+
+    def render(self, name: str, to_email: str, **values) -> bytes:
+        """Complete RFC 5322 message, ready for SMTP.sendmail"""
+        return self.templates[name].render(to_email, values)
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_template_engine() -> EmailTemplateEngine:
+    """Process-wide engine; templates are read and compiled on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = EmailTemplateEngine(settings.EMAIL_FROM)
+    return _engine
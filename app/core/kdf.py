@@ -0,0 +1,135 @@
+"""Password key-derivation functions.
+
+Each KDF produces a self-describing hash string, so stored hashes can be
+verified whatever PASSWORD_KDF is currently configured, and hashes made
+with an older scheme or weaker parameters are reported by needs_rehash():
+
+- bcrypt:  "$2b$<rounds>$<salt+hash>"
+- scrypt:  "$scrypt$n=<n>,r=<r>,p=<p>$<salt b64>$<hash b64>"
+- sha256:  64 hex digits, the original unsalted scheme; verify only
+
+This module is imported by the password hashing worker processes, so it
+only depends on the standard library, bcrypt and Settings.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import bcrypt
+from app.core.config import settings
+
+class BcryptKDF:
+    name = "bcrypt"
+    # bcrypt only reads the first 72 bytes; earlier bcrypt releases truncated
+    # silently, bcrypt>=5 raises instead, so truncate explicitly
+    MAX_BYTES = 72
+
+    def __init__(self, rounds: int = 12):
+        self.rounds = rounds
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(("$2b$", "$2a$", "$2y$"))
+
+    def hash(self, password: str) -> str:
+        secret = password.encode("utf-8")[:self.MAX_BYTES]
+        return bcrypt.hashpw(secret, bcrypt.gensalt(self.rounds)).decode("ascii")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        secret = password.encode("utf-8")[:self.MAX_BYTES]
+        return bcrypt.checkpw(secret, hashed.encode("ascii"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return not hashed.startswith("$2b$") or int(hashed.split("$")[2]) != self.rounds
+
+class ScryptKDF:
+    name = "scrypt"
+    PREFIX = "$scrypt$"
+
+    def __init__(self, n: int = 2 ** 14, r: int = 8, p: int = 1, salt_bytes: int = 16, key_bytes: int = 32):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.salt_bytes = salt_bytes
+        self.key_bytes = key_bytes
+
+    @property
+    def params(self) -> str:
+        return f"n={self.n},r={self.r},p={self.p}"
+
+    def identify(self, hashed: str) -> bool:
+        return hashed.startswith(self.PREFIX)
+
+    def _derive(self, password: str, salt: bytes, n: int, r: int, p: int, key_bytes: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+            maxmem=128 * n * r * p + 1024 * 1024, dklen=key_bytes
+        )
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(self.salt_bytes)
+        key = self._derive(password, salt, self.n, self.r, self.p, self.key_bytes)
+        return f"{self.PREFIX}{self.params}${_b64(salt)}${_b64(key)}"
+
+    def verify(self, password: str, hashed: str) -> bool:
+        _, _, params, salt, key = hashed.split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        expected = _unb64(key)
+        derived = self._derive(
+            password, _unb64(salt), int(values["n"]), int(values["r"]), int(values["p"]), len(expected)
+        )
+        return hmac.compare_digest(derived, expected)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return not hashed.startswith(f"{self.PREFIX}{self.params}$")
+
+class LegacySHA256:
+    """The original unsalted SHA-256 hex digest; accepted for login, never produced"""
+    name = "sha256"
+
+    def identify(self, hashed: str) -> bool:
+        return len(hashed) == 64 and all(c in "0123456789abcdef" for c in hashed)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return True
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def _unb64(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+def configured_kdfs() -> dict:
+    return {
+        "bcrypt": BcryptKDF(settings.BCRYPT_ROUNDS),
+        "scrypt": ScryptKDF(settings.SCRYPT_N, settings.SCRYPT_R, settings.SCRYPT_P),
+    }
+
+KDFS = configured_kdfs()
+VERIFY_ONLY = [LegacySHA256()]
+
+def current_kdf():
+    try:
+        return KDFS[settings.PASSWORD_KDF]
+    except KeyError:
+        raise ValueError(f"Unknown PASSWORD_KDF {settings.PASSWORD_KDF!r}; expected one of {sorted(KDFS)}")
+
+def identify(hashed: str):
+    for kdf in (*KDFS.values(), *VERIFY_ONLY):
+        if kdf.identify(hashed):
+            return kdf
+    return None
+
+def hash_password(password: str) -> str:
+    return current_kdf().hash(password)
+
+def verify_password(password: str, hashed: str) -> bool:
+    kdf = identify(hashed)
+    return kdf is not None and kdf.verify(password, hashed)
+
+def needs_rehash(hashed: str) -> bool:
+    """True if the hash was not made by the configured KDF with its current parameters"""
+    kdf = identify(hashed)
+    return kdf is not current_kdf() or kdf.needs_rehash(hashed)
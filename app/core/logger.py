@@ -1,36 +1,164 @@
-import logging
+import atexit
 import functools
-from datetime import datetime
+import inspect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from datetime import datetime, timezone
 from app.core.config import settings
+from app.core.tracing import span
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including fields passed through ``extra``"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread untouched; drops them if the queue is full.
+
+    Formatting (message interpolation, JSON encoding) and file I/O all happen
+    on the listener thread, never on the request path.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+_listener = None
+
+def configure_logging():
+    """Route all logging through a queue drained by a background listener thread.
+
+    Called by each entry point (the app's lifespan, workers, scripts) rather
+    than at import, so importing the app opens no files and starts no threads.
+    """
+    global _listener
+    if _listener is not None:
+        return
 
-# Configure logging
-logging.basicConfig(
-    level=getattr(logging, settings.LOG_LEVEL),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(settings.LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
+    if settings.LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    handlers = [logging.StreamHandler()]
+    if settings.LOG_FILE:
+        os.makedirs(os.path.dirname(settings.LOG_FILE) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(settings.LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, settings.LOG_LEVEL))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
 
 logger = logging.getLogger(__name__)
 
-def log_action(action_name: str):
-    """Decorator for logging actions"""
+def _parse_sample_rates(spec: str) -> dict:
+    """Parse "create_order=0.1,get_orders=0.01" into {action: rate}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        action, _, rate = item.partition("=")
+        rates[action.strip()] = float(rate)
+    return rates
+
+SAMPLE_RATES = _parse_sample_rates(settings.LOG_SAMPLE_RATES)
+
+def _timing_enabled(action_name: str) -> bool:
+    """Whether this call's start/complete lines are logged; failures always are"""
+    if not settings.LOG_ACTION_TIMINGS or not logger.isEnabledFor(logging.INFO):
+        return False
+    rate = SAMPLE_RATES.get(action_name, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+def _log_start(action_name: str):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Starting %s", action_name, extra={"action": action_name})
+
+def _log_completed(action_name: str, start_time: float):
+    duration = time.perf_counter() - start_time
+    logger.info("Completed %s in %.3fs", action_name, duration,
+                extra={"action": action_name, "duration_ms": round(duration * 1000, 3)})
+
+def _log_failed(action_name: str, start_time: float, error: Exception):
+    duration = time.perf_counter() - start_time
+    logger.error("Failed %s in %.3fs: %s", action_name, duration, error,
+                 extra={"action": action_name, "duration_ms": round(duration * 1000, 3)})
+
+def log_action(action_name: str, stage: str = "service"):
+    """Decorator for logging actions (sync and async callables).
+
+    Each call is also traced as a span of the given stage, which is where
+    latency should be read from; the log line is optional and sampled.
+    """
     def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start_time = time.perf_counter()
+                timed = _timing_enabled(action_name)
+                if timed:
+                    _log_start(action_name)
+
+                try:
+                    with span(action_name, stage):
+                        result = await func(*args, **kwargs)
+                    if timed:
+                        _log_completed(action_name, start_time)
+                    return result
+                except Exception as e:
+                    _log_failed(action_name, start_time, e)
+                    raise
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = datetime.now()
-            logger.info(f"Starting {action_name}")
-            
+            start_time = time.perf_counter()
+            timed = _timing_enabled(action_name)
+            if timed:
+                _log_start(action_name)
+
             try:
-                result = func(*args, **kwargs)
-                duration = (datetime.now() - start_time).total_seconds()
-                logger.info(f"Completed {action_name} in {duration:.2f}s")
+                with span(action_name, stage):
+                    result = func(*args, **kwargs)
+                if timed:
+                    _log_completed(action_name, start_time)
                 return result
             except Exception as e:
-                duration = (datetime.now() - start_time).total_seconds()
-                logger.error(f"Failed {action_name} in {duration:.2f}s: {str(e)}")
+                _log_failed(action_name, start_time, e)
                 raise
         return wrapper
     return decorator
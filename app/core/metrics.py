@@ -0,0 +1,72 @@
+"""HTTP metrics, recorded by a pure ASGI middleware.
+
+Requests are labelled by the matched route template rather than the raw
+path, so path parameters and scanner traffic cannot grow label cardinality.
+"""
+import time
+from prometheus_client import Counter, Gauge, Histogram
+from app.core.config import settings
+from app.core.tracing import HTTP_METHODS, request_method, route_template
+
+REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'HTTP request duration',
+    ['method', 'endpoint'], buckets=settings.METRICS_LATENCY_BUCKETS
+)
+RESPONSE_SIZE = Histogram(
+    'http_response_size_bytes', 'HTTP response body size',
+    ['method', 'endpoint'], buckets=settings.METRICS_SIZE_BUCKETS
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', 'HTTP requests currently being served', ['method']
+)
+
+# Bounded by routes x methods x status codes, since labels never use the raw path
+_label_cache = {}
+
+def _children(method: str, endpoint: str, status: int):
+    """Labelled metric children for one (method, endpoint, status), looked up once"""
+    key = (method, endpoint, status)
+    children = _label_cache.get(key)
+    if children is None:
+        children = _label_cache[key] = (
+            REQUEST_COUNT.labels(method, endpoint, status),
+            REQUEST_DURATION.labels(method, endpoint),
+            RESPONSE_SIZE.labels(method, endpoint),
+        )
+    return children
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.in_progress = {method: REQUESTS_IN_PROGRESS.labels(method) for method in HTTP_METHODS | {"OTHER"}}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = request_method(scope)
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_progress = self.in_progress[method]
+        in_progress.inc()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            duration = time.perf_counter() - start_time
+            in_progress.dec()
+            count, latency, response_size = _children(method, route_template(scope), status_code)
+            count.inc()
+            latency.observe(duration)
+            response_size.observe(size)
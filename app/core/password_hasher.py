@@ -0,0 +1,81 @@
+"""Runs password hashing and verification off the event loop.
+
+A slow KDF costs tens to hundreds of milliseconds of CPU per call; run on
+the event loop, a burst of logins would stall every other request. Calls go
+to a dedicated process pool (PASSWORD_HASH_EXECUTOR="process") of
+PASSWORD_HASH_WORKERS processes instead. At most PASSWORD_HASH_MAX_PENDING
+calls may be running or queued; beyond that PasswordHasherBusy is raised
+immediately rather than letting the queue, and every caller's latency, grow.
+"""
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.core import kdf
+from app.core.config import settings
+
+class PasswordHasherBusy(Exception):
+    """Too many hashing calls are already pending"""
+
+class PasswordHasher:
+    def __init__(self, executor: str = "process", workers: int = 1, max_pending: int = 64):
+        self.executor_kind = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Created on first use; worker processes are spawned rather than
+        # forked so they do not inherit the server's threads and sockets
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.executor_kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            self.workers, mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.executor_kind == "inline":
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            return await asyncio.wrap_future(self.executor.submit(func, *args))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool next time
+            with self._executor_lock:
+                self._executor = None
+            raise
+        finally:
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        # The KDF instance is pickled with its parameters, so workers hash with
+        # the parent's configuration whatever their own environment says
+        return await self._run(kdf.current_kdf().hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        scheme = kdf.identify(hashed)
+        if scheme is None:
+            return False
+        return await self._run(scheme.verify, password, hashed)
+
+    def shutdown(self, wait: bool = False):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_EXECUTOR, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
+# Wait at exit: without the join, worker processes can outlive the server
+atexit.register(password_hasher.shutdown, wait=True)
@@ -0,0 +1,226 @@
+"""Per-route, per-client token-bucket rate limiting.
+
+Each (route, client) pair owns a bucket holding up to `requests` tokens that
+refills at `requests / window` tokens per second; a request spends one token
+or is rejected with 429 and a Retry-After header. Clients are identified by
+user id when the request carries a valid bearer token and by IP otherwise.
+
+Buckets live in a store selected by RATE_LIMIT_BACKEND:
+
+- "sqlite" (default): one row per bucket in a shared file, updated by a
+  single UPSERT ... RETURNING statement, so every worker process on the host
+  sees the same counts. Each check is one primary-key lookup and write,
+  and only that statement is run in the threadpool; if the file stays
+  locked for longer than
+  RATE_LIMIT_SQLITE_BUSY_TIMEOUT_MS the request is let through rather than
+  held up.
+- "memory": a per-process LRU dict, checked on the event loop; only
+  consistent with a single worker.
+
+Routes whose rule allows 0 requests are unlimited and never reach the store.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.logger import logger
+from app.core.security import verify_token
+from app.core.tracing import route_template
+from app.services.principal_cache import principal_cache
+
+RateLimitRule = namedtuple("RateLimitRule", ["requests", "window"])
+
+def parse_rules(spec: str) -> dict:
+    """Parse "POST /auth/login=5/60,GET /orders/=120/60" into {route: RateLimitRule}"""
+    rules = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        route, _, limit = item.rpartition("=")
+        requests, _, window = limit.partition("/")
+        rules[route.strip()] = RateLimitRule(int(requests), float(window))
+    return rules
+
+class MemoryBucketStore:
+    # A dict update under an uncontended lock; cheaper than a threadpool hop
+    blocking = False
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, rate: float, now: float):
+        """Spend one token; returns (allowed, tokens left)"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(capacity)
+            else:
+                tokens = min(capacity, bucket[0] + max(now - bucket[1], 0) * rate)
+                self._buckets.move_to_end(key)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, tokens
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteBucketStore:
+    # Refill and spend in one statement; SET expressions all see the old row,
+    # so concurrent processes cannot interleave between the read and the write
+    TAKE = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated_at, allowed)
+        VALUES (:key, :capacity - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = CASE WHEN MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate) >= 1
+                          THEN MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate) - 1
+                          ELSE MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate) END,
+            allowed = MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate) >= 1,
+            updated_at = MAX(updated_at, :now)
+        RETURNING allowed, tokens
+    """
+    PRUNE_EVERY = 10000
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # Losing a few seconds of counts on power failure is harmless, so skip fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        # Its own short timeout: a check is cheap, and waiting long only delays the request
+        self._conn.execute(f"PRAGMA busy_timeout={settings.RATE_LIMIT_SQLITE_BUSY_TIMEOUT_MS}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, allowed INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+
+    def take(self, key: str, capacity: int, rate: float, now: float):
+        """Spend one token; returns (allowed, tokens left)"""
+        with self._lock:
+            try:
+                allowed, tokens = self._conn.execute(
+                    self.TAKE, {"key": key, "capacity": capacity, "rate": rate, "now": now}
+                ).fetchone()
+            except sqlite3.OperationalError as e:
+                # Fail open: the limiter must not turn lock contention into errors
+                logger.warning(f"Rate limit check skipped: {e}")
+                return True, float(capacity)
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                self._prune(now)
+        return bool(allowed), tokens
+
+    def _prune(self, now: float):
+        # A bucket untouched for a whole window has refilled completely and is
+        # indistinguishable from a missing one
+        self._conn.execute("DELETE FROM rate_limit_buckets WHERE updated_at < ?", (now - max_window(),))
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM rate_limit_buckets")
+
+    def close(self):
+        self._conn.close()
+
+def max_window() -> float:
+    return max([settings.RATE_LIMIT_WINDOW] + [rule.window for rule in ROUTE_RULES.values()])
+
+ROUTE_RULES = parse_rules(settings.RATE_LIMIT_ROUTES)
+
+def create_store():
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryBucketStore()
+    return SQLiteBucketStore(settings.RATE_LIMIT_SQLITE_PATH)
+
+class RateLimiter:
+    def __init__(self, store_factory=create_store):
+        self.store_factory = store_factory
+        self._store = None
+        self._store_lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Opened on first use so importing the app does not touch the file
+        if self._store is None:
+            with self._store_lock:
+                if self._store is None:
+                    self._store = self.store_factory()
+        return self._store
+
+    @property
+    def blocking(self) -> bool:
+        # An unopened store may still have a file to open
+        return self._store is None or self._store.blocking
+
+    def rule_for(self, route: str) -> RateLimitRule:
+        return ROUTE_RULES.get(route) or RateLimitRule(settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_WINDOW)
+
+    def check(self, route: str, client: str) -> float:
+        """Spend a token for client on route; returns 0 if allowed, else seconds until one is available"""
+        rule = self.rule_for(route)
+        if rule.requests <= 0:
+            return 0
+        rate = rule.requests / rule.window
+        allowed, tokens = self.store.take(f"{route}|{client}", rule.requests, rate, time.time())
+        if allowed:
+            return 0
+        return (1 - tokens) / rate
+
+    async def acheck(self, route: str, client: str) -> float:
+        """check() without blocking the event loop on a store that does I/O"""
+        if self.blocking:
+            return await run_in_threadpool(self.check, route, client)
+        return self.check(route, client)
+
+    def reset(self):
+        if self._store is not None:
+            self._store.reset()
+
+rate_limiter = RateLimiter()
+
+def client_key(request: Request) -> str:
+    """user:<id> for a valid bearer token, otherwise ip:<address>"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer":
+        # The principal cache already holds verified tokens; decoding a JWT
+        # costs more than the rest of the check put together
+        cached = principal_cache.get(token)
+        if cached is not None:
+            return f"user:{cached.principal.id}"
+        try:
+            return f"user:{verify_token(token)['user_id']}"
+        except (HTTPException, KeyError):
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+async def rate_limit(request: Request):
+    """Router dependency enforcing the rule for the matched route.
+
+    Runs on the event loop; only the SQLite update (and opening the file on
+    first use) goes to the threadpool, and unlimited routes return before
+    identifying the client.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    route = f"{request.method} {route_template(request.scope)}"
+    if rate_limiter.rule_for(route).requests <= 0:
+        return
+    retry_after = await rate_limiter.acheck(route, client_key(request))
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
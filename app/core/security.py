@@ -1,20 +1,26 @@
-from passlib.context import CryptContext
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
+from app.core import kdf
 from app.core.config import settings
-import hashlib
 
-# Use a simpler hashing method for compatibility
 def hash_password(password: str) -> str:
-    """Simple password hashing using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Hash with the configured KDF, in the calling thread.
+
+    Request handlers use app.core.password_hasher, which runs this in a
+    process pool; this form is for scripts and fixtures.
+    """
+    return kdf.hash_password(password)
 
 def verify_password_hash(plain_password: str, hashed_password: str) -> bool:
-    """Verify password hash"""
-    return hash_password(plain_password) == hashed_password
+    """Verify against a hash made by any supported KDF, including legacy SHA-256"""
+    return kdf.verify_password(plain_password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    return kdf.needs_rehash(hashed_password)
 
 def create_access_token(data: dict) -> str:
+    # jose pulls in cryptography; importing it on first use keeps it out of app startup
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
@@ -22,6 +28,7 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 def verify_token(token: str) -> dict:
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
@@ -0,0 +1,165 @@
+import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from app.core.config import settings
+from app.core.logger import logger
+
+# The server answered and rejected the command; the session itself is still usable
+# (smtplib sends RSET before raising these), so neither discard nor retry
+SERVER_REJECTIONS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+def is_connection_error(error: Exception) -> bool:
+    """Broken or unreachable connection, worth retrying on a fresh one"""
+    return isinstance(error, OSError) and not isinstance(error, SERVER_REJECTIONS)
+
+class SMTPPoolTimeout(Exception):
+    """No pooled SMTP connection became free in time"""
+
+class SMTPConnectionPool:
+    """Bounded pool of connected, authenticated SMTP sessions.
+
+    Connections are reused LIFO so a small working set stays warm. Sessions
+    idle for longer than ``idle_timeout`` are closed, and ones idle for longer
+    than ``healthcheck_interval`` must answer NOOP before being handed out.
+    A send that fails on a broken connection is retried once on a new one.
+    """
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "",
+                 use_tls: bool = True, max_size: int = 4, idle_timeout: float = 60.0,
+                 healthcheck_interval: float = 15.0, timeout: float = 30.0,
+                 connection_factory=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.healthcheck_interval = healthcheck_interval
+        self.timeout = timeout
+        self._factory = connection_factory
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self):
+        conn = self._factory(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                conn.starttls()
+            if self.username:
+                conn.login(self.username, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.quit()
+        except Exception:
+            conn.close()
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except OSError:
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, last_used = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout:
+                self._close(conn)
+            elif idle_for > self.healthcheck_interval and not self._is_alive(conn):
+                conn.close()
+            else:
+                return conn
+        return self._connect()
+
+    def _checkin(self, conn):
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            self._idle.append((conn, now))
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.popleft()[0])
+        for stale in expired:
+            self._close(stale)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session; it is discarded instead of returned if the block raises"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise SMTPPoolTimeout(f"No SMTP connection available within {self.timeout}s")
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except SERVER_REJECTIONS:
+                self._checkin(conn)
+                raise
+            except Exception:
+                conn.close()
+                raise
+            self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def _send(self, send):
+        try:
+            with self.connection() as conn:
+                return send(conn)
+        except OSError as e:
+            if not is_connection_error(e):
+                raise
+            logger.warning(f"SMTP connection failed ({e!r}); retrying on a new connection")
+            with self.connection() as conn:
+                return send(conn)
+
+    def sendmail(self, from_addr: str, to_addrs, msg, mail_options=()):
+        def send(conn):
+            options = list(mail_options)
+            if isinstance(msg, bytes) and not options:
+                # Prebuilt messages carry 8bit bodies; declare them where the server allows
+                conn.ehlo_or_helo_if_needed()
+                if conn.has_extn("8bitmime"):
+                    options.append("BODY=8BITMIME")
+            return conn.sendmail(from_addr, to_addrs, msg, options)
+        return self._send(send)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn, _ in idle:
+            self._close(conn)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Process-wide pool for the SMTP relay configured in Settings"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SMTPConnectionPool(
+                    settings.SMTP_SERVER,
+                    settings.SMTP_PORT,
+                    username=settings.EMAIL_USER,
+                    password=settings.EMAIL_PASS,
+                    use_tls=settings.SMTP_USE_TLS,
+                    max_size=settings.SMTP_POOL_SIZE,
+                    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+                    healthcheck_interval=settings.SMTP_POOL_HEALTHCHECK_INTERVAL,
+                    timeout=settings.SMTP_TIMEOUT
+                )
+    return _pool
@@ -0,0 +1,444 @@
+"""Per-stage latency tracing.
+
+Spans nest through a context variable, so a service call made while handling
+a request becomes a child of that request's span. Every finished span feeds
+two histograms: its wall time labelled by stage and name, and its self time
+(wall time minus time spent in child spans) labelled by stage. Self times do
+not double-count nested work, so they show where a request actually spends
+its time. Sampled traces can also be exported as OTLP/JSON to a collector or
+to a file.
+
+Stages: request (whole ASGI request), route (handler including dependency
+resolution), auth, service, db (one span per statement) and serialization
+(response model validation and JSON rendering).
+"""
+import atexit
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from fastapi.routing import APIRoute
+from prometheus_client import Histogram
+from sqlalchemy import event
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+SPAN_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+SPAN_DURATION = Histogram(
+    'trace_span_duration_seconds', 'Span wall time, including child spans',
+    ['stage', 'name'], buckets=SPAN_BUCKETS
+)
+STAGE_SELF_DURATION = Histogram(
+    'trace_stage_self_duration_seconds', 'Span wall time not spent in child spans',
+    ['stage'], buckets=SPAN_BUCKETS
+)
+
+# OTLP span kinds
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+_current_span = ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = (
+        "name", "stage", "kind", "trace_id", "span_id", "parent_id", "parent", "sampled",
+        "attributes", "error", "start_unix_ns", "_start", "duration_ns", "child_ns"
+    )
+
+    def __init__(self, name: str, stage: str, parent=None, attributes=None, kind=KIND_INTERNAL,
+                 start: int = None, trace_id: str = None, parent_id: str = None, sampled: bool = None):
+        self.name = name
+        self.stage = stage
+        self.kind = kind
+        self.parent = parent
+        self.attributes = attributes or {}
+        self.error = None
+        self.span_id = f"{random.getrandbits(64):016x}"
+        if parent is not None:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+        else:
+            self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+            self.parent_id = parent_id
+            self.sampled = _should_sample() if sampled is None else sampled
+        now = time.perf_counter_ns()
+        self._start = now if start is None else start
+        self.start_unix_ns = time.time_ns() - (now - self._start)
+        self.duration_ns = None
+        self.child_ns = 0
+
+    @property
+    def end_unix_ns(self) -> int:
+        return self.start_unix_ns + (self.duration_ns or 0)
+
+    def end(self, end: int = None):
+        if self.duration_ns is not None:
+            return
+        self.duration_ns = (time.perf_counter_ns() if end is None else end) - self._start
+        if self.parent is not None:
+            self.parent.child_ns += self.duration_ns
+        _record(self)
+
+def _should_sample() -> bool:
+    rate = settings.TRACING_SAMPLE_RATE
+    return _exporter is not None and (rate >= 1.0 or random.random() < rate)
+
+def _record(span: Span):
+    SPAN_DURATION.labels(stage=span.stage, name=span.name).observe(span.duration_ns / 1e9)
+    # Children that ran concurrently can overlap, so clamp at zero
+    STAGE_SELF_DURATION.labels(stage=span.stage).observe(max(span.duration_ns - span.child_ns, 0) / 1e9)
+    if span.sampled and _exporter is not None:
+        _exporter.submit(span)
+
+def current_span():
+    return _current_span.get()
+
+@contextmanager
+def span(name: str, stage: str, **attributes):
+    """Time the enclosed block as a child of the current span"""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+
+    current = Span(name, stage, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+def traced(name: str, stage: str):
+    """Decorator form of span() for sync and async callables"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# -- Database -----------------------------------------------------------------
+
+def instrument_engine(sync_engine):
+    """One "db" span per statement executed inside a traced request"""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_statement_span(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None or not settings.TRACING_ENABLED:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        context._trace_span = Span(
+            operation, "db", parent, {"db.system": conn.dialect.name, "db.statement": statement}, kind=KIND_CLIENT
+        )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def end_statement_span(conn, cursor, statement, parameters, context, executemany):
+        statement_span = getattr(context, "_trace_span", None)
+        if statement_span is not None:
+            statement_span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def fail_statement_span(exception_context):
+        statement_span = getattr(exception_context.execution_context, "_trace_span", None)
+        if statement_span is not None:
+            error = exception_context.original_exception
+            statement_span.error = f"{type(error).__name__}: {error}"
+            statement_span.end()
+
+# -- ASGI / routing -----------------------------------------------------------
+
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+def request_method(scope) -> str:
+    """The request method for metric labels and span names; any other method is "OTHER".
+
+    The method is client-controlled, so passing it through unchecked would let
+    arbitrary verbs create unbounded label sets.
+    """
+    return scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+
+def route_template(scope) -> str:
+    """Path template of the route that handled the request, e.g. "/orders/create".
+
+    Read after the app has run, once routing has stored the matched route in
+    the scope; requests no route matched share one fixed label.
+    """
+    route = scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "<unmatched>"
+
+def _parse_traceparent(value: bytes):
+    """W3C traceparent "00-<trace_id>-<span_id>-<flags>" -> (trace_id, span_id, sampled)"""
+    parts = value.decode("latin-1").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+class TracingMiddleware:
+    """Opens the root "request" span for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        remote = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                remote = _parse_traceparent(value)
+                break
+        trace_id, parent_id, sampled = remote if remote else (None, None, None)
+        if sampled:
+            sampled = _exporter is not None
+
+        root = Span(request_method(scope), "request", kind=KIND_SERVER,
+                    trace_id=trace_id, parent_id=parent_id, sampled=sampled)
+        token = _current_span.set(root)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            template = route_template(scope)
+            method = request_method(scope)
+            root.name = f"{method} {template}"
+            root.attributes["http.method"] = method
+            root.attributes["http.route"] = template
+            root.end()
+
+_endpoint_returned = ContextVar("endpoint_returned", default=None)
+
+def _note_endpoint_return():
+    returned = _endpoint_returned.get()
+    if returned is not None:
+        returned.append(time.perf_counter_ns())
+
+def _mark_return(endpoint):
+    # A list rather than a context variable: sync endpoints run in the
+    # threadpool under a copied context, but the list itself is shared
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            result = await endpoint(*args, **kwargs)
+            _note_endpoint_return()
+            return result
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        result = endpoint(*args, **kwargs)
+        _note_endpoint_return()
+        return result
+    return wrapper
+
+class TracedRoute(APIRoute):
+    """APIRoute that records a "route" span and its "serialization" child.
+
+    Serialization is timed from the endpoint returning to the handler
+    producing the Response, i.e. response model validation plus rendering.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_return(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path_format
+
+        async def traced_handler(request):
+            if not settings.TRACING_ENABLED:
+                return await handler(request)
+            returned = []
+            token = _endpoint_returned.set(returned)
+            try:
+                with span(f"{request.method} {path}", "route") as route_span:
+                    response = await handler(request)
+                    if returned:
+                        Span("serialize_response", "serialization", route_span, start=returned[-1]).end()
+                    return response
+            finally:
+                _endpoint_returned.reset(token)
+        return traced_handler
+
+# -- Export -------------------------------------------------------------------
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+def to_otlp_span(span: Span) -> dict:
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_unix_ns),
+        "endTimeUnixNano": str(span.end_unix_ns),
+        "attributes": _otlp_attributes({"app.stage": span.stage, **span.attributes}),
+        "status": {"code": 2, "message": span.error} if span.error else {},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+def to_otlp_request(spans: list, service_name: str) -> dict:
+    """ExportTraceServiceRequest in the OTLP/JSON encoding"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": service_name})},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [to_otlp_span(span) for span in spans],
+            }],
+        }]
+    }
+
+class FileSpanWriter:
+    """Appends one OTLP/JSON export request per line"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, payload: bytes):
+        with self.path.open("ab") as f:
+            f.write(payload + b"\n")
+
+class OTLPHTTPWriter:
+    """POSTs OTLP/JSON to a collector's /v1/traces endpoint"""
+
+    def __init__(self, endpoint: str, timeout: float = 5):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def __call__(self, payload: bytes):
+        request = urllib.request.Request(
+            self.endpoint, data=payload, method="POST", headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class SpanExporter:
+    """Batches finished spans on a background thread; drops spans if the queue is full"""
+
+    def __init__(self, writer, service_name: str, batch_size: int = 512, interval: float = 2, queue_size: int = 10000):
+        self.writer = writer
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span: Span):
+        try:
+            self.queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _next_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: list):
+        payload = json.dumps(to_otlp_request(batch, self.service_name), separators=(",", ":")).encode("utf-8")
+        try:
+            self.writer(payload)
+        except Exception as e:
+            log.warning("Dropped %d spans; export failed: %s", len(batch), e)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._export(batch)
+
+    def shutdown(self):
+        """Stop the thread and export whatever is still queued"""
+        self._stopped.set()
+        self._thread.join(self.interval + 1)
+        remaining = []
+        while True:
+            try:
+                remaining.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(remaining), self.batch_size):
+            self._export(remaining[start:start + self.batch_size])
+
+_exporter = None
+
+def configure_tracing():
+    """Start the exporter selected by TRACING_EXPORTER (none, file or otlp); called by entry points"""
+    global _exporter
+    if _exporter is not None or not settings.TRACING_ENABLED:
+        return
+    if settings.TRACING_EXPORTER == "file":
+        writer = FileSpanWriter(settings.TRACING_FILE)
+    elif settings.TRACING_EXPORTER == "otlp":
+        writer = OTLPHTTPWriter(settings.TRACING_OTLP_ENDPOINT)
+    else:
+        return
+    _exporter = SpanExporter(
+        writer, settings.TRACING_SERVICE_NAME,
+        batch_size=settings.TRACING_EXPORT_BATCH_SIZE,
+        interval=settings.TRACING_EXPORT_INTERVAL,
+        queue_size=settings.TRACING_QUEUE_SIZE
+    )
+    atexit.register(_exporter.shutdown)
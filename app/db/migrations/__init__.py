@@ -0,0 +1,78 @@
+"""
+Versioned schema migrations.
+
+Each ``mNNNN_<name>.py`` module in this package defines ``VERSION``,
+``DESCRIPTION`` and ``upgrade(connection)``. ``run_migrations`` applies every
+migration newer than the version recorded in ``schema_version``, each one in
+its own transaction, so existing databases pick up schema changes that
+``Base.metadata.create_all`` would never apply.
+
+A migration that rebuilds a table on SQLite sets ``REBUILDS_TABLES = True``:
+it then runs with foreign key enforcement off, as SQLite's table rebuild
+procedure requires, and is expected to check the constraints itself.
+"""
+
+import importlib
+from contextlib import contextmanager
+import pkgutil
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select
+from app.core.logger import logger
+
+version_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+def load_migrations():
+    """Migration modules of this package, ordered by VERSION"""
+    modules = [
+        importlib.import_module(f"{__name__}.{info.name}")
+        for info in pkgutil.iter_modules(__path__)
+        if info.name.startswith("m")
+    ]
+    return sorted(modules, key=lambda module: module.VERSION)
+
+def current_version(connection) -> int:
+    version_metadata.create_all(connection)
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+@contextmanager
+def _foreign_keys_off(connection, enabled: bool):
+    """PRAGMA foreign_keys=OFF around a transaction; the pragma is a no-op inside one"""
+    if not enabled or connection.dialect.name != "sqlite":
+        yield
+        return
+    previous = connection.exec_driver_sql("PRAGMA foreign_keys").scalar()
+    connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    connection.commit()
+    try:
+        yield
+    finally:
+        connection.exec_driver_sql(f"PRAGMA foreign_keys={'ON' if previous else 'OFF'}")
+        connection.commit()
+
+def run_migrations(engine, target: int = None) -> list[int]:
+    """Upgrade the database behind ``engine`` to ``target`` (default: latest)"""
+    applied = []
+    with engine.begin() as connection:
+        version = current_version(connection)
+    
+    for migration in load_migrations():
+        if migration.VERSION <= version or (target is not None and migration.VERSION > target):
+            continue
+        logger.info(f"Applying migration {migration.VERSION}: {migration.DESCRIPTION}")
+        with engine.connect() as connection:
+            with _foreign_keys_off(connection, getattr(migration, "REBUILDS_TABLES", False)):
+                with connection.begin():
+                    migration.upgrade(connection)
+                    connection.execute(schema_version.insert().values(
+                        version=migration.VERSION,
+                        description=migration.DESCRIPTION
+                    ))
+        applied.append(migration.VERSION)
+    return applied
@@ -0,0 +1,32 @@
+"""Baseline users/orders schema as originally created by create_all"""
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, func
+
+VERSION = 1
+DESCRIPTION = "initial users and orders tables"
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("role", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "orders",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, nullable=False),
+    Column("success", Boolean, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+def upgrade(connection):
+    # checkfirst keeps this a no-op on databases that predate versioning
+    metadata.create_all(connection, checkfirst=True)
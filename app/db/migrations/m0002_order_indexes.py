@@ -0,0 +1,73 @@
+"""Foreign key on orders.user_id plus the indexes behind order listings"""
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, Table, func, inspect, text
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable, ForeignKeyConstraint
+from app.core.logger import logger
+
+VERSION = 2
+DESCRIPTION = "orders.user_id foreign key and listing indexes"
+# The SQLite rebuild copies rows that may predate the foreign key
+REBUILDS_TABLES = True
+
+INDEXES = {
+    # per-user listings: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+    "ix_orders_user_id_created_at_id": ("user_id", "created_at", "id"),
+    # success-filtered listings over a time range
+    "ix_orders_success_created_at": ("success", "created_at"),
+    # unfiltered admin listings and keyset cursors
+    "ix_orders_created_at_id": ("created_at", "id"),
+}
+
+def _rebuild_with_foreign_key(connection):
+    """SQLite cannot ALTER TABLE ... ADD CONSTRAINT, so copy into a new table"""
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    rebuilt = Table(
+        "orders_rebuild",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("user_id", Integer, ForeignKey("users.id", name="fk_orders_user_id_users"), nullable=False),
+        Column("success", Boolean, nullable=False),
+        Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    )
+    connection.execute(CreateTable(rebuilt))
+    connection.execute(text(
+        "INSERT INTO orders_rebuild (id, user_id, success, created_at) "
+        "SELECT id, user_id, success, created_at FROM orders"
+    ))
+    connection.execute(text("DROP TABLE orders"))
+    connection.execute(text("ALTER TABLE orders_rebuild RENAME TO orders"))
+    connection.execute(text("CREATE INDEX ix_orders_id ON orders (id)"))
+    _report_orphans(connection)
+
+def _report_orphans(connection):
+    """Orders of users that no longer exist were legal before the foreign key; keep them and say so"""
+    orphans = connection.execute(text("PRAGMA foreign_key_check(orders)")).all()
+    if not orphans:
+        return
+    user_ids = connection.execute(text(
+        "SELECT DISTINCT user_id FROM orders WHERE user_id NOT IN (SELECT id FROM users) ORDER BY user_id"
+    )).scalars().all()
+    logger.warning(
+        f"{len(orphans)} orders reference missing users (user_id {', '.join(map(str, user_ids[:20]))}"
+        f"{', ...' if len(user_ids) > 20 else ''}); they were kept, but updating them will fail the "
+        f"foreign key until the users are restored or the orders deleted"
+    )
+
+def upgrade(connection):
+    inspector = inspect(connection)
+    if not inspector.get_foreign_keys("orders"):
+        if connection.dialect.name == "sqlite":
+            _rebuild_with_foreign_key(connection)
+        else:
+            orders = Table("orders", MetaData(), Column("user_id", Integer))
+            connection.execute(AddConstraint(ForeignKeyConstraint(
+                [orders.c.user_id], ["users.id"], name="fk_orders_user_id_users"
+            )))
+        inspector = inspect(connection)
+    
+    existing = {index["name"] for index in inspector.get_indexes("orders")}
+    orders = Table("orders", MetaData(), *(Column(name) for name in ("id", "user_id", "success", "created_at")))
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            connection.execute(CreateIndex(Index(name, *(orders.c[column] for column in columns))))
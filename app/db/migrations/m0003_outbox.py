@@ -0,0 +1,26 @@
+"""Transactional outbox drained by the notification worker"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, JSON, MetaData, String, Table, func
+
+VERSION = 3
+DESCRIPTION = "outbox table for order notifications"
+
+metadata = MetaData()
+
+Table(
+    "outbox",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("event_type", String, nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("available_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Column("locked_until", DateTime(timezone=True)),
+    Column("last_error", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_outbox_status_available_at", "status", "available_at"),
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
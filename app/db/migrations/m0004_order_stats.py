@@ -0,0 +1,29 @@
+"""Hourly per-user order rollup, backfilled from existing orders"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table, text
+
+VERSION = 4
+DESCRIPTION = "order_stats rollup table"
+
+metadata = MetaData()
+
+Table(
+    "order_stats",
+    metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("bucket_start", DateTime(timezone=True), primary_key=True),
+    Column("total", Integer, nullable=False),
+    Column("succeeded", Integer, nullable=False),
+    Column("failed", Integer, nullable=False),
+    Index("ix_order_stats_bucket_start", "bucket_start"),
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
+    connection.execute(text("DELETE FROM order_stats"))
+    connection.execute(text(
+        "INSERT INTO order_stats (user_id, bucket_start, total, succeeded, failed) "
+        "SELECT user_id, strftime('%Y-%m-%d %H:00:00', created_at), COUNT(*), "
+        "SUM(CASE WHEN success THEN 1 ELSE 0 END), SUM(CASE WHEN success THEN 0 ELSE 1 END) "
+        "FROM orders GROUP BY 1, 2"
+    ))
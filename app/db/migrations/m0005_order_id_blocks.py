@@ -0,0 +1,18 @@
+"""Order id allocation for sharded order databases"""
+
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+VERSION = 5
+DESCRIPTION = "order_id_blocks table"
+
+metadata = MetaData()
+
+Table(
+    "order_id_blocks",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("next_id", Integer, nullable=False),
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
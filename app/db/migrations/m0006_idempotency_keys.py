@@ -0,0 +1,22 @@
+"""Stored responses for Idempotency-Key retries of order creation"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, MetaData, String, Table
+
+VERSION = 6
+DESCRIPTION = "idempotency_keys table"
+
+metadata = MetaData()
+
+Table(
+    "idempotency_keys",
+    metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("response", LargeBinary),
+    Column("expires_at", DateTime(timezone=True), nullable=False),
+    Index("ix_idempotency_keys_expires_at", "expires_at"),
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
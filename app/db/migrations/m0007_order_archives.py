@@ -0,0 +1,23 @@
+"""Catalogue of order archive files written by app/workers/archive_orders.py"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, func
+
+VERSION = 7
+DESCRIPTION = "order_archives catalogue table"
+
+metadata = MetaData()
+
+Table(
+    "order_archives",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("path", String, unique=True, nullable=False),
+    Column("starts_at", DateTime(timezone=True), nullable=False),
+    Column("ends_at", DateTime(timezone=True), nullable=False),
+    Column("row_count", Integer, nullable=False),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_order_archives_starts_at", "starts_at"),
+)
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
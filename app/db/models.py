@@ -1,7 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index, JSON, LargeBinary
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from app.db.session import Base
 
+# SQLite's CURRENT_TIMESTAMP has second precision; binding datetimes in the same
+# format keeps equality comparisons on created_at (keyset cursors) exact
+Timestamp = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
 class User(Base):
     __tablename__ = "users"
     
@@ -16,6 +21,87 @@ class Order(Base):
     __tablename__ = "orders"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", name="fk_orders_user_id_users"), nullable=False)
     success = Column(Boolean, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    
+    # Server-generated created_at comes back in the INSERT's RETURNING clause
+    __mapper_args__ = {"eager_defaults": True}
+    
+    # Kept in sync with app/db/migrations/m0002_order_indexes.py
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_orders_success_created_at", "success", "created_at"),
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
+
+class OutboxMessage(Base):
+    """Notification written in the same transaction as the order it describes"""
+    __tablename__ = "outbox"
+    
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # "pending", "processing" or "dead"
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(Timestamp, nullable=False, server_default=func.now())
+    locked_until = Column(Timestamp)
+    last_error = Column(String)
+    created_at = Column(Timestamp, server_default=func.now())
+    
+    __table_args__ = (
+        Index("ix_outbox_status_available_at", "status", "available_at"),
+    )
+
+class OrderStats(Base):
+    """Hourly order counts per user, maintained in the order-creating transaction"""
+    __tablename__ = "order_stats"
+    
+    user_id = Column(Integer, primary_key=True)
+    bucket_start = Column(Timestamp, primary_key=True)  # start of the UTC hour
+    total = Column(Integer, nullable=False, default=0)
+    succeeded = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    
+    # Kept in sync with app/db/migrations/m0004_order_stats.py
+    __table_args__ = (
+        Index("ix_order_stats_bucket_start", "bucket_start"),
+    )
+
+class OrderIdBlock(Base):
+    """High-water mark of order ids handed out to sharded writers, a block at a time"""
+    __tablename__ = "order_id_blocks"
+    
+    name = Column(String, primary_key=True)
+    next_id = Column(Integer, nullable=False)
+
+class IdempotencyKey(Base):
+    """Response of an order creation, replayed to retries that carry the same Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # hash of the request body
+    response = Column(LargeBinary)  # set in the same transaction that claims the key
+    expires_at = Column(Timestamp, nullable=False)
+    
+    # Kept in sync with app/db/migrations/m0006_idempotency_keys.py
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+
+class OrderArchive(Base):
+    """A gzip CSV file holding orders moved out of the orders table, all created in [starts_at, ends_at)"""
+    __tablename__ = "order_archives"
+    
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    starts_at = Column(Timestamp, nullable=False)
+    ends_at = Column(Timestamp, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    archived_at = Column(Timestamp, server_default=func.now())
+    
+    # Kept in sync with app/db/migrations/m0007_order_archives.py
+    __table_args__ = (
+        Index("ix_order_archives_starts_at", "starts_at"),
+    )
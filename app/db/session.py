@@ -1,15 +1,307 @@
-from sqlalchemy import create_engine
+import itertools
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.logger import logger
+from app.core.tracing import instrument_engine
+
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite"}
+
+def to_async_url(url: str) -> str:
+    """Map a sync DSN onto its async driver (sqlite:// -> sqlite+aiosqlite://)"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+def sqlite_pragmas(foreign_keys: bool = None, read_only: bool = False) -> dict:
+    """Per-connection SQLite tuning from Settings.
+
+    WAL lets readers proceed during a write and, with synchronous=NORMAL,
+    commits without an fsync per transaction; busy_timeout makes writers
+    queue for the lock instead of failing with "database is locked".
+    Replica connections are additionally query_only, so a write routed to a
+    replica by mistake fails instead of diverging from the primary.
+    """
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "foreign_keys": "ON" if (settings.SQLITE_FOREIGN_KEYS if foreign_keys is None else foreign_keys) else "OFF",
+    }
+    if read_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+def _apply_pragmas(sync_engine, pragmas: dict):
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def engine_options(url: str, **overrides) -> dict:
+    """Explicit pool sizing unless the caller picks a pool class or the database is in-memory"""
+    parsed = make_url(url)
+    options = {}
+    in_memory = False
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        in_memory = parsed.database in (None, "", ":memory:")
+    if not in_memory and "poolclass" not in overrides:
+        options.update(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT
+        )
+    options.update(overrides)
+    return options
+
+def create_db_engine(url: str, foreign_keys: bool = None, read_only: bool = False, **overrides):
+    db_engine = create_engine(url, **engine_options(url, **overrides))
+    if db_engine.dialect.name == "sqlite":
+        _apply_pragmas(db_engine, sqlite_pragmas(foreign_keys, read_only))
+    instrument_engine(db_engine)
+    return db_engine
+
+def create_async_db_engine(url: str, foreign_keys: bool = None, read_only: bool = False, **overrides):
+    db_engine = create_async_engine(to_async_url(url), **engine_options(url, **overrides))
+    if db_engine.dialect.name == "sqlite":
+        _apply_pragmas(db_engine.sync_engine, sqlite_pragmas(foreign_keys, read_only))
+    instrument_engine(db_engine.sync_engine)
+    return db_engine
+
+engine = create_db_engine(settings.DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+async_engine = create_async_db_engine(settings.DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+class ThreadpoolResult:
+    """AsyncResult.partitions() over a sync Result, each fetch in the threadpool"""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size: int = None):
+        while rows := await run_in_threadpool(self.result.fetchmany, size):
+            yield rows
+
+    async def close(self):
+        await run_in_threadpool(self.result.close)
+
+class SyncSessionAdapter:
+    """Exposes a sync Session through the AsyncSession API.
+
+    Every database round-trip runs in the threadpool, so repositories are
+    written once against the async interface and DB_ASYNC=False still
+    reproduces the original threadpool-bound request path.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    @property
+    def bind(self):
+        return self.sync_session.bind
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+        return ThreadpoolResult(result)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        self.sync_session.delete(instance)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+@asynccontextmanager
+async def open_session(session_factory, async_session_factory):
+    """Open a session on whichever engine DB_ASYNC selects"""
+    if settings.DB_ASYNC:
+        async with async_session_factory() as db:
+            yield db
+    else:
+        db = SyncSessionAdapter(session_factory())
+        try:
+            yield db
+        finally:
+            await db.close()
+
+def make_get_db(session_factory, async_session_factory):
+    async def get_db():
+        async with open_session(session_factory, async_session_factory) as db:
+            yield db
+    return get_db
+
+get_db = make_get_db(SessionLocal, AsyncSessionLocal)
+
+def replica_session_factories(url: str):
+    """(sessionmaker, async_sessionmaker) for a read-only replica"""
+    return (
+        sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                     bind=create_db_engine(url, read_only=True)),
+        async_sessionmaker(create_async_db_engine(url, read_only=True), autoflush=False, expire_on_commit=False),
+    )
+
+class SQLiteWriteMarks:
+    """Per-user "wrote until" deadlines in a SQLite file shared by every worker process on the host"""
+    MARK = """
+        INSERT INTO recent_writes (user_id, until) VALUES (:user_id, :until)
+        ON CONFLICT (user_id) DO UPDATE SET until = MAX(until, excluded.until)
+    """
+    PRUNE_EVERY = 10000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # A lost mark only costs a read from a lagging replica, so skip fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"PRAGMA busy_timeout={settings.DB_READ_YOUR_WRITES_BUSY_TIMEOUT_MS}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recent_writes (user_id INTEGER PRIMARY KEY, until REAL NOT NULL)"
+        )
+
+    def mark(self, user_id: int, until: float):
+        with self._lock:
+            self._conn.execute(self.MARK, {"user_id": user_id, "until": until})
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM recent_writes WHERE until < ?", (time.time(),))
+
+    def until(self, user_id: int) -> float:
+        """Deadline of the user's last mark, 0 if there is none"""
+        with self._lock:
+            row = self._conn.execute("SELECT until FROM recent_writes WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0.0
+
+    def reset(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM recent_writes")
+
+    def close(self):
+        self._conn.close()
+
+class SessionRouter:
+    """Decides whether a read may go to a replica, and which one.
+
+    Writes always use the primary (get_db). Reads are spread round-robin over
+    the replicas, except for users who wrote within the last `sticky_seconds`:
+    a replica may not have caught up with that write yet, so their reads stay
+    on the primary. Recent writers are remembered in this process and, with
+    `shared_path`, in a file every worker process reads, so a write handled by
+    one worker keeps the next read on the primary whichever worker serves it.
+    The file is only touched from the threadpool.
+    """
+
+    def __init__(self, replicas: list, sticky_seconds: float, max_users: int = 100000, shared_path: str = ""):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self._recent_writers = TTLCache("recent_writers", max_users, sticky_seconds) if sticky_seconds > 0 else None
+        self._shared = SQLiteWriteMarks(shared_path) if replicas and shared_path and sticky_seconds > 0 else None
+        self._counter = itertools.count()
+
+    async def record_write(self, user_id: int):
+        if not self.replicas or self._recent_writers is None:
+            return
+        self._recent_writers.set(user_id, True)
+        if self._shared is not None:
+            try:
+                await run_in_threadpool(self._shared.mark, user_id, time.time() + self.sticky_seconds)
+            except sqlite3.Error as e:
+                # Other workers may serve this user's next read from a replica
+                logger.warning(f"Recent write of user {user_id} not shared: {e}")
+
+    async def reads_from_primary(self, user_id: int = None) -> bool:
+        if not self.replicas:
+            return True
+        if user_id is None or self._recent_writers is None:
+            return False
+        if self._recent_writers.get(user_id, False):
+            return True
+        if self._shared is None:
+            return False
+        try:
+            return await run_in_threadpool(self._shared.until, user_id) > time.time()
+        except sqlite3.Error as e:
+            # The primary is never stale
+            logger.warning(f"Recent writes of user {user_id} unknown, reading from the primary: {e}")
+            return True
+
+    def open_replica_session(self):
+        session_factory, async_session_factory = self.replicas[next(self._counter) % len(self.replicas)]
+        return open_session(session_factory, async_session_factory)
+
+    def reset(self):
+        if self._recent_writers is not None:
+            self._recent_writers.clear()
+        if self._shared is not None:
+            self._shared.reset()
+
+session_router = SessionRouter(
+    [replica_session_factories(url) for url in settings.DATABASE_REPLICA_URLS],
+    settings.DB_READ_YOUR_WRITES_SECONDS,
+    shared_path=settings.DB_READ_YOUR_WRITES_PATH
+)
+
+async def get_read_db(db=Depends(get_db)):
+    """Session for read-only queries: a replica if any are configured, else the request's primary session.
+
+    Services take it alongside get_db's session and use it only for reads
+    that session_router allows off the primary. Sessions connect lazily, so
+    a request that never reads from the replica never opens a connection.
+    """
+    if not session_router.replicas:
         yield db
-    finally:
-        db.close()
+        return
+    async with session_router.open_replica_session() as read_db:
+        yield read_db
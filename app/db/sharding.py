@@ -0,0 +1,232 @@
+"""
+Sharding of orders by user.
+
+Every SQLite database has one write lock, so all create_order transactions
+queue behind each other however many workers serve them. With a shard map
+configured (ORDER_SHARD_MAP), each user's orders, order_stats rows and
+outbox messages live on one of several shard databases instead, and writes
+for users on different shards commit in parallel. Users, logins and the id
+allocator stay on the primary (DATABASE_URL).
+
+Users are hashed into a fixed number of virtual buckets (user_id % buckets)
+and the map assigns each bucket to a shard. Moving a bucket, or adding a
+shard and spreading buckets onto it, only rewrites the map and the moved
+users' rows; see app/workers/rebalance_shards.py. The map is a JSON file:
+
+    {"shards": ["sqlite:///./orders-0.db", "sqlite:///./orders-1.db"],
+     "buckets": 256,
+     "assignments": [0, 1, 0, 1, ...]}
+
+Order ids must stay unique across shards (listings merge and paginate on
+(created_at, id)), so sharded inserts take ids reserved in blocks from the
+primary's order_id_blocks table rather than each shard's AUTOINCREMENT.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.session import create_async_db_engine, create_db_engine, engine, open_session
+
+DEFAULT_BUCKETS = 256
+
+class ShardMap:
+    """Assignment of user buckets to shard DSNs"""
+
+    def __init__(self, shards: list[str], buckets: int = DEFAULT_BUCKETS, assignments: list[int] = None):
+        if not shards:
+            raise ValueError("A shard map needs at least one shard")
+        if assignments is None:
+            assignments = [bucket % len(shards) for bucket in range(buckets)]
+        if len(assignments) != buckets:
+            raise ValueError(f"Expected {buckets} bucket assignments, got {len(assignments)}")
+        if any(not 0 <= shard < len(shards) for shard in assignments):
+            raise ValueError("Bucket assigned to a shard that is not in the map")
+        self.shards = list(shards)
+        self.buckets = buckets
+        self.assignments = list(assignments)
+
+    def bucket_for(self, user_id: int) -> int:
+        return user_id % self.buckets
+
+    def shard_for(self, user_id: int) -> int:
+        return self.assignments[user_id % self.buckets]
+
+    def buckets_of(self, shard: int) -> list[int]:
+        return [bucket for bucket, owner in enumerate(self.assignments) if owner == shard]
+
+    def to_dict(self) -> dict:
+        return {"shards": self.shards, "buckets": self.buckets, "assignments": self.assignments}
+
+    @classmethod
+    def load(cls, path: str) -> "ShardMap":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["shards"], data["buckets"], data.get("assignments"))
+
+    def save(self, path: str):
+        """Replace the file atomically, so readers see the old map or the new one"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+def bucket_condition(user_id_column, buckets: int, bucket: int):
+    """SQL condition selecting the rows of one user bucket"""
+    return user_id_column % buckets == bucket
+
+def shard_session_factories(url: str, **engine_overrides):
+    """(sessionmaker, async_sessionmaker) for a shard.
+
+    Users live on the primary, so the orders -> users foreign key cannot be
+    enforced on a shard.
+    """
+    return (
+        sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                     bind=create_db_engine(url, foreign_keys=False, **engine_overrides)),
+        async_sessionmaker(create_async_db_engine(url, foreign_keys=False, **engine_overrides),
+                           autoflush=False, expire_on_commit=False),
+    )
+
+def migrate_shards(shard_map: ShardMap) -> dict:
+    """Apply pending migrations to every shard; returns {url: applied versions}"""
+    from app.db.migrations import run_migrations
+    applied = {}
+    for url in shard_map.shards:
+        shard_engine = create_db_engine(url, foreign_keys=False)
+        try:
+            applied[url] = run_migrations(shard_engine)
+        finally:
+            shard_engine.dispose()
+    return applied
+
+class ShardRouter:
+    """Routes a user's order reads and writes to the shard that owns them.
+
+    The map file is re-read when it changes, checked at most every
+    `check_interval` seconds, and engines are created lazily per shard DSN.
+    Without a map path the router is disabled and orders stay on the primary.
+    """
+
+    def __init__(self, path: str = "", check_interval: float = 5, **engine_overrides):
+        self.path = path
+        self.check_interval = check_interval
+        self.engine_overrides = engine_overrides
+        self._map = None
+        self._map_version = None
+        self._next_check = 0.0
+        self._factories = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def shard_map(self) -> ShardMap:
+        now = time.monotonic()
+        if self._map is None or now >= self._next_check:
+            with self._lock:
+                if self._map is None or now >= self._next_check:
+                    stat = os.stat(self.path)
+                    version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                    if version != self._map_version:
+                        self._map, self._map_version = ShardMap.load(self.path), version
+                    self._next_check = now + self.check_interval
+        return self._map
+
+    @property
+    def shard_count(self) -> int:
+        return len(self.shard_map.shards)
+
+    def shard_for(self, user_id: int) -> int:
+        return self.shard_map.shard_for(user_id)
+
+    def session_factories(self, shard: int):
+        url = self.shard_map.shards[shard]
+        factories = self._factories.get(url)
+        if factories is None:
+            with self._lock:
+                factories = self._factories.get(url)
+                if factories is None:
+                    factories = self._factories[url] = shard_session_factories(url, **self.engine_overrides)
+        return factories
+
+    def open_shard_session(self, shard: int):
+        return open_session(*self.session_factories(shard))
+
+    def open_user_session(self, user_id: int):
+        """Session on the shard that owns user_id's orders"""
+        return self.open_shard_session(self.shard_for(user_id))
+
+    async def scatter(self, query) -> list:
+        """Await query(db) on every shard concurrently; results in shard order"""
+        async def run(shard):
+            async with self.open_shard_session(shard) as db:
+                return await query(db)
+        return await asyncio.gather(*(run(shard) for shard in range(self.shard_count)))
+
+    async def dispose(self):
+        with self._lock:
+            factories, self._factories = list(self._factories.values()), {}
+        for session_factory, async_session_factory in factories:
+            session_factory.kw["bind"].dispose()
+            await async_session_factory.kw["bind"].dispose()
+
+class OrderIdAllocator:
+    """Hands out globally unique order ids, reserving `block_size` at a time on the primary.
+
+    A reservation is one UPSERT that also skips past ids already used by
+    orders on the primary, so turning sharding on (or importing the
+    primary's orders into shards) never reuses an id. Ids left in a block
+    when the process exits are simply never used.
+    """
+
+    RESERVE = text(
+        "INSERT INTO order_id_blocks (name, next_id) "
+        "SELECT 'orders', COALESCE(MAX(id), 0) + 1 + :size FROM orders WHERE 1 "
+        "ON CONFLICT (name) DO UPDATE SET next_id = MAX(next_id, excluded.next_id - :size) + :size "
+        "RETURNING next_id"
+    )
+
+    def __init__(self, engine, block_size: int):
+        self.engine = engine
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def _reserve_block(self) -> tuple[int, int]:
+        with self.engine.begin() as connection:
+            end = connection.execute(self.RESERVE, {"size": self.block_size}).scalar_one()
+        return end - self.block_size, end
+
+    async def allocate(self, count: int) -> list[int]:
+        ids = []
+        while True:
+            with self._lock:
+                take = min(count - len(ids), self._end - self._next)
+                ids.extend(range(self._next, self._next + take))
+                self._next += take
+            if len(ids) == count:
+                return ids
+            start, end = await run_in_threadpool(self._reserve_block)
+            with self._lock:
+                # Another caller may have refilled meanwhile; its block is used first
+                if self._next >= self._end:
+                    self._next, self._end = start, end
+
+    def reset(self):
+        with self._lock:
+            self._next = self._end = 0
+
+shard_router = ShardRouter(settings.ORDER_SHARD_MAP, settings.ORDER_SHARD_MAP_CHECK_INTERVAL)
+order_ids = OrderIdAllocator(engine, settings.ORDER_ID_BLOCK_SIZE)
@@ -1,27 +1,38 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from prometheus_client import make_asgi_app
 import time
-import logging
+from starlette.concurrency import run_in_threadpool
 from app.api import auth_routes, order_routes
-from app.db.session import engine
-from app.db.models import Base
+from app.db.session import engine, async_engine
+from app.db.sharding import migrate_shards, shard_router
 from app.core.config import settings
+from app.core.logger import configure_logging
+from app.core.metrics import MetricsMiddleware
+from app.core.password_hasher import password_hasher
+from app.core.tracing import TracingMiddleware, configure_tracing
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here runs at import: workers and tests importing the app do no
+    # database I/O and start no threads until the server actually starts
+    configure_logging()
+    configure_tracing()
+    if settings.DB_MIGRATE_ON_STARTUP:
+        from app.db.migrations import run_migrations
+        await run_in_threadpool(run_migrations, engine)
+        if shard_router.enabled:
+            await run_in_threadpool(migrate_shards, shard_router.shard_map)
+    yield
+    # Here rather than atexit: uvicorn re-raises SIGTERM after shutting down,
+    # which would kill the process before atexit handlers could stop the pool
+    await run_in_threadpool(password_hasher.shutdown, True)
+    await async_engine.dispose()
+    await shard_router.dispose()
 
 # Initialize FastAPI app
-app = FastAPI(title="Mini Order Management Service", version="1.0.0")
-
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app = FastAPI(title="Mini Order Management Service", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -32,31 +43,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Prometheus metrics
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
-REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request duration')
+# Root span for every request; added after CORS so it also times that middleware
+app.add_middleware(TracingMiddleware)
+
+# Outermost: request metrics cover everything the app does for the request
+app.add_middleware(MetricsMiddleware)
 
 # Add Prometheus metrics endpoint
 metrics_app = make_asgi_app()
 app.mount("/metrics", metrics_app)
 
-# Middleware for metrics
-@app.middleware("http")
-async def metrics_middleware(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    duration = time.time() - start_time
-    
-    REQUEST_COUNT.labels(
-        method=request.method,
-        endpoint=request.url.path,
-        status=response.status_code
-    ).inc()
-    
-    REQUEST_DURATION.observe(duration)
-    
-    return response
-
 # Health check endpoint
 @app.get("/health")
 def health_check():
@@ -67,9 +63,10 @@ def health_check():
         "environment": settings.ENVIRONMENT
     }
 
-# Include routers
-app.include_router(auth_routes.router, prefix="/auth", tags=["authentication"])
-app.include_router(order_routes.router, prefix="/orders", tags=["orders"])
+# Include routers; each router sets its own prefix so route.path is the full
+# path template that request spans are named after
+app.include_router(auth_routes.router)
+app.include_router(order_routes.router)
 
 # Root endpoint
 @app.get("/")
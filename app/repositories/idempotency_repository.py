@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import IdempotencyKey
+from app.db.sharding import bucket_condition
+
+class IdempotencyRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get(self, user_id: int, key: str):
+        """(fingerprint, response, expires_at) of an unexpired key, or None"""
+        result = await self.db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.response, IdempotencyKey.expires_at)
+            .where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.expires_at > datetime.utcnow()
+            )
+        )
+        return result.first()
+    
+    async def claim(self, user_id: int, key: str, fingerprint: str, ttl: int) -> bool:
+        """Take the key in the caller's transaction; False if another request holds it unexpired.
+
+        The INSERT takes SQLite's write lock, so a concurrent claimer in another
+        process waits for this transaction and then sees the key as taken.
+        """
+        now = datetime.utcnow()
+        statement = sqlite_insert(IdempotencyKey).values(
+            user_id=user_id, key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=ttl)
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "response": None,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=IdempotencyKey.expires_at <= now
+        )
+        result = await self.db.execute(statement)
+        return result.rowcount == 1
+    
+    async def complete(self, user_id: int, key: str, response: bytes):
+        await self.db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(response=response)
+        )
+    
+    async def delete_expired(self) -> int:
+        result = await self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+        await self.db.commit()
+        return result.rowcount
+    
+    async def rows_after(self, after: tuple, limit: int, buckets: int, bucket: int):
+        """Unexpired keys of one user bucket after (user_id, key), in that order (for copying between shards)"""
+        result = await self.db.execute(
+            select(IdempotencyKey.user_id, IdempotencyKey.key, IdempotencyKey.fingerprint,
+                   IdempotencyKey.response, IdempotencyKey.expires_at)
+            .where(
+                tuple_(IdempotencyKey.user_id, IdempotencyKey.key) > tuple_(*after),
+                bucket_condition(IdempotencyKey.user_id, buckets, bucket),
+                IdempotencyKey.expires_at > datetime.utcnow()
+            )
+            .order_by(IdempotencyKey.user_id, IdempotencyKey.key)
+            .limit(limit)
+        )
+        return result.all()
+    
+    async def copy_rows(self, rows) -> None:
+        """Insert keys read from another database; a copy still waiting for its response takes the source's"""
+        if not rows:
+            return
+        statement = sqlite_insert(IdempotencyKey)
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "response": statement.excluded.response,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=IdempotencyKey.response.is_(None)
+        )
+        await self.db.execute(statement, [row._asdict() for row in rows])
+    
+    async def delete_bucket(self, buckets: int, bucket: int) -> int:
+        result = await self.db.execute(
+            delete(IdempotencyKey).where(bucket_condition(IdempotencyKey.user_id, buckets, bucket))
+        )
+        return result.rowcount
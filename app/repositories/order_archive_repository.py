@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import NamedTuple
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models import OrderArchive
+
+class CataloguedArchive(NamedTuple):
+    id: int
+    path: str
+    starts_at: datetime
+    ends_at: datetime
+
+# Each database's catalogue (keyed by its URL), re-read every ORDER_ARCHIVE_CATALOGUE_TTL
+# seconds. The archiver keeps archived rows in the table for longer than that, so a
+# process listing from a stale copy still finds them there.
+archive_catalogue = TTLCache("order_archives", 64, settings.ORDER_ARCHIVE_CATALOGUE_TTL)
+
+class OrderArchiveRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def catalogue(self) -> tuple[CataloguedArchive, ...]:
+        """Every archive file, newest first, from this process's copy of the catalogue"""
+        key = str(self.db.bind.url)
+        archives = archive_catalogue.get(key)
+        if archives is None:
+            result = await self.db.execute(
+                select(OrderArchive.id, OrderArchive.path, OrderArchive.starts_at, OrderArchive.ends_at)
+                .order_by(OrderArchive.starts_at.desc(), OrderArchive.id.desc())
+            )
+            archives = tuple(CataloguedArchive(*row) for row in result)
+            archive_catalogue.set(key, archives)
+        return archives
+
+    async def overlapping(self, created_from: datetime = None, created_to: datetime = None) -> list[CataloguedArchive]:
+        """Archive files that may hold orders created in [created_from, created_to), newest first"""
+        return [
+            archive for archive in await self.catalogue()
+            if (created_from is None or archive.ends_at > created_from)
+            and (created_to is None or archive.starts_at < created_to)
+        ]
+
+    async def boundary(self) -> datetime:
+        """End of the newest archived range; orders before it are no longer in the orders table"""
+        return await self.db.scalar(select(func.max(OrderArchive.ends_at)))
+
+    async def record(self, path: str, starts_at: datetime, ends_at: datetime, row_count: int) -> OrderArchive:
+        """Catalogue a written file, in the caller's transaction"""
+        archive = OrderArchive(path=path, starts_at=starts_at, ends_at=ends_at, row_count=row_count)
+        self.db.add(archive)
+        await self.db.flush()
+        return archive
@@ -1,23 +1,240 @@
-from sqlalchemy.orm import Session
+import heapq
+from datetime import datetime, timedelta
+from itertools import groupby, islice
+from sqlalchemy import delete, func, insert, select, and_, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from app.db.models import Order
-from app.schemas.order import OrderCreate
+from app.db.sharding import bucket_condition
+from app.repositories.order_archive_repository import OrderArchiveRepository
+from app.repositories.order_stats_repository import OrderStatsRepository
+from app.schemas.order import OrderCreate, OrderFilter
+from app.utils.order_archive import iter_archive, read_archive
+from app.utils.pagination import decode_cursor, to_utc_naive
+
+def listing_key(row):
+    return row.created_at, row.id
+
+def unique_rows(rows):
+    """Rows in listing order without repeats of the same order.
+
+    Until the archiver deletes the rows it archived (see ORDER_ARCHIVE_CATALOGUE_TTL),
+    and after a run that failed before deleting them, an order can be both in the
+    table and in a file, or in two files; equal keys make the copies adjacent.
+    """
+    return (next(copies) for _, copies in groupby(rows, key=lambda row: row.id))
+
+def archive_predicate(filters, cursor: tuple = None):
+    """A listing's or export's filters, and the listing cursor's (created_at, id), as a test on archived rows"""
+    created_from = to_utc_naive(filters.created_from) if filters.created_from is not None else None
+    created_to = to_utc_naive(filters.created_to) if filters.created_to is not None else None
+    
+    def matches(row) -> bool:
+        return ((filters.user_id is None or row.user_id == filters.user_id)
+                and (filters.success is None or row.success == filters.success)
+                and (created_from is None or row.created_at >= created_from)
+                and (created_to is None or row.created_at < created_to)
+                and (cursor is None or listing_key(row) < cursor))
+    return matches
 
 class OrderRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create_order(self, order: OrderCreate, user_id: int) -> Order:
+    async def create_order(self, order: OrderCreate, user_id: int, order_id: int = None) -> Order:
+        """Insert the order without committing; the service owns the transaction.
+
+        order_id is given on shards, where ids come from the allocator.
+        """
         db_order = Order(
+            id=order_id,
             user_id=user_id,
             success=order.success
         )
         self.db.add(db_order)
-        self.db.commit()
-        self.db.refresh(db_order)
+        await self.db.flush()
         return db_order
     
-    def get_user_orders(self, user_id: int) -> list[Order]:
-        return self.db.query(Order).filter(Order.user_id == user_id).all()
+    async def create_orders(self, orders: list[OrderCreate], user_id: int, order_ids: list[int] = None):
+        """Bulk INSERT ... RETURNING in the caller's transaction, rows in input order"""
+        values = [{"user_id": user_id, "success": order.success} for order in orders]
+        if order_ids is not None:
+            for row, order_id in zip(values, order_ids):
+                row["id"] = order_id
+        result = await self.db.execute(
+            insert(Order).returning(
+                Order.id, Order.user_id, Order.success, Order.created_at,
+                sort_by_parameter_order=True
+            ),
+            values
+        )
+        return result.all()
+    
+    def _filtered(self, query, filters):
+        """user_id, success and created_from/created_to of a listing or export filter"""
+        if filters.user_id is not None:
+            query = query.where(Order.user_id == filters.user_id)
+        if filters.success is not None:
+            query = query.where(Order.success == filters.success)
+        if filters.created_from is not None:
+            query = query.where(Order.created_at >= to_utc_naive(filters.created_from))
+        if filters.created_to is not None:
+            query = query.where(Order.created_at < to_utc_naive(filters.created_to))
+        return query
+    
+    async def list_orders(self, filters: OrderFilter, limit: int):
+        """One keyset page of (id, user_id, success, created_at) rows ordered by (created_at, id) descending.
+
+        The cursor becomes a range predicate on the ordering key, so the cost
+        of a page does not depend on how many pages precede it. Only the
+        columns are selected: rows skip the identity map and attribute
+        instrumentation that loading Order entities would cost.
+        """
+        query = self._filtered(select(Order.id, Order.user_id, Order.success, Order.created_at), filters)
+        if filters.cursor:
+            created_at, order_id = decode_cursor(filters.cursor)
+            query = query.where(or_(
+                Order.created_at < created_at,
+                and_(Order.created_at == created_at, Order.id < order_id)
+            ))
+        query = query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit)
+        result = await self.db.execute(query)
+        rows = result.all()
+        if len(rows) < limit:
+            rows = await self._with_archived(rows, filters, limit)
+        return rows
+    
+    async def _archives(self, filters, created_from: datetime, created_to: datetime):
+        """Archive files that can hold rows matching filters in [created_from, created_to), newest first.
+
+        The cached catalogue prunes the months outside the date range without
+        a query, so a page whose range or cursor stays after the archived
+        months costs nothing here. For a user or outcome filter, the
+        order_stats rollup (kept for archived months) then prunes the months
+        without a matching order, so their files are never opened.
+        """
+        archives = await OrderArchiveRepository(self.db).overlapping(created_from, created_to)
+        if not archives or (filters.user_id is None and filters.success is None):
+            return archives
+        # Only count the hours the archives cover, not the whole rollup
+        starts_at = min(archive.starts_at for archive in archives)
+        ends_at = max(archive.ends_at for archive in archives)
+        months = await OrderStatsRepository(self.db).active_months(
+            filters.user_id, filters.success,
+            starts_at if created_from is None else max(created_from, starts_at),
+            ends_at if created_to is None else min(created_to, ends_at)
+        )
+        return [archive for archive in archives if archive.starts_at in months]
+    
+    async def _with_archived(self, rows, filters: OrderFilter, limit: int):
+        """Complete a short page from the archive files whose months the filters and cursor reach.
+
+        Months are archived whole, so files are read newest month first and
+        the scan stops once the months read hold enough rows; months that
+        cannot match (see _archives) are skipped without opening their files.
+        """
+        created_from = to_utc_naive(filters.created_from) if filters.created_from is not None else None
+        created_to = to_utc_naive(filters.created_to) if filters.created_to is not None else None
+        cursor = decode_cursor(filters.cursor) if filters.cursor else None
+        if cursor is not None:
+            # Rows sharing the cursor's (second-precision) timestamp may still follow it
+            before = cursor[0] + timedelta(seconds=1)
+            created_to = before if created_to is None else min(created_to, before)
+        archives = await self._archives(filters, created_from, created_to)
+        if not archives:
+            return rows
+        
+        matches = archive_predicate(filters, cursor)
+        archived = []
+        for _, month in groupby(archives, key=lambda archive: archive.starts_at):
+            if len(archived) >= limit:
+                break
+            for archive in month:
+                archived.extend(await run_in_threadpool(read_archive, archive.path, matches, limit))
+        archived.sort(key=listing_key, reverse=True)
+        # Orders copied into an archived month after it was archived are still in the table until
+        # the archiver runs again, so the two sources are merged rather than concatenated
+        merged = heapq.merge(rows, archived, key=listing_key, reverse=True)
+        return list(islice(unique_rows(merged), limit))
+    
+    async def stream_orders(self, filters, batch_size: int):
+        """Every row matching an export filter, newest first, in batches read off one open cursor.
+
+        The rows are fetched from SQLite as the batches are consumed, so
+        memory stays at one batch however many rows match.
+        """
+        query = self._filtered(select(Order.id, Order.user_id, Order.success, Order.created_at), filters)
+        query = query.order_by(Order.created_at.desc(), Order.id.desc()).execution_options(yield_per=batch_size)
+        result = await self.db.stream(query)
+        try:
+            async for rows in result.partitions(batch_size):
+                yield rows
+        finally:
+            await result.close()
+    
+    async def stream_archived(self, filters, batch_size: int):
+        """Archived rows matching an export filter in batches, newest month first.
+
+        A month's files (more than one if orders reached it after it was
+        archived) are merged as they are read, a batch at a time in the
+        threadpool.
+        """
+        created_from = to_utc_naive(filters.created_from) if filters.created_from is not None else None
+        created_to = to_utc_naive(filters.created_to) if filters.created_to is not None else None
+        archives = await self._archives(filters, created_from, created_to)
+        if not archives:
+            return
+        # stream_orders already exported the archived rows the archiver has not deleted yet
+        boundary = max(archive.ends_at for archive in archives)
+        in_table = set(await self.db.scalars(self._filtered(select(Order.id), filters).where(Order.created_at < boundary)))
+        matches = archive_predicate(filters)
+        for _, month in groupby(archives, key=lambda archive: archive.starts_at):
+            rows = unique_rows(heapq.merge(*(iter_archive(archive.path) for archive in month),
+                                           key=listing_key, reverse=True))
+            rows = (row for row in rows if row.id not in in_table and matches(row))
+            while batch := await run_in_threadpool(list, islice(rows, batch_size)):
+                yield batch
+    
+    async def months_before(self, before: datetime) -> list[datetime]:
+        """Starts of the months that have orders created before `before`, oldest first"""
+        month = func.strftime("%Y-%m-01 00:00:00", Order.created_at)
+        result = await self.db.execute(
+            select(month).where(Order.created_at < before).group_by(month).order_by(month)
+        )
+        return [datetime.fromisoformat(value) for value in result.scalars()]
+    
+    async def rows_between(self, starts_at: datetime, ends_at: datetime, limit: int, after=None):
+        """Rows created in [starts_at, ends_at) in listing order, those past the (created_at, id) key `after`"""
+        query = select(Order.id, Order.user_id, Order.success, Order.created_at).where(
+            Order.created_at >= starts_at, Order.created_at < ends_at
+        )
+        if after is not None:
+            created_at, order_id = after
+            query = query.where(or_(
+                Order.created_at < created_at,
+                and_(Order.created_at == created_at, Order.id < order_id)
+            ))
+        result = await self.db.execute(query.order_by(Order.created_at.desc(), Order.id.desc()).limit(limit))
+        return result.all()
+    
+    async def delete_ids(self, order_ids: list[int]) -> int:
+        result = await self.db.execute(delete(Order).where(Order.id.in_(order_ids)))
+        return result.rowcount
+    
+    async def rows_after(self, after_id: int, limit: int, buckets: int = None, bucket: int = None):
+        """Full rows with id > after_id in id order, optionally of one user bucket (for copying between shards)"""
+        query = select(Order.id, Order.user_id, Order.success, Order.created_at).where(Order.id > after_id)
+        if buckets is not None:
+            query = query.where(bucket_condition(Order.user_id, buckets, bucket))
+        result = await self.db.execute(query.order_by(Order.id).limit(limit))
+        return result.all()
+    
+    async def copy_rows(self, rows) -> None:
+        """Insert rows read from another database, skipping ids already present"""
+        if rows:
+            await self.db.execute(sqlite_insert(Order).on_conflict_do_nothing(), [row._asdict() for row in rows])
     
-    def get_all_orders(self) -> list[Order]:
-        return self.db.query(Order).all()
+    async def delete_bucket(self, buckets: int, bucket: int) -> int:
+        result = await self.db.execute(delete(Order).where(bucket_condition(Order.user_id, buckets, bucket)))
+        return result.rowcount
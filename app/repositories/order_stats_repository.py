@@ -0,0 +1,125 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import Order, OrderStats
+from app.db.sharding import bucket_condition
+from app.schemas.order import OrderStatsFilter
+from app.utils.pagination import to_utc_naive
+
+def hour_bucket(created_at):
+    return to_utc_naive(created_at).replace(minute=0, second=0, microsecond=0)
+
+class OrderStatsRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def record(self, user_id: int, orders):
+        """Add (created_at, success) pairs to the rollup in the caller's transaction.
+
+        One UPSERT per distinct hour, so a batch usually costs a single statement.
+        """
+        totals, succeeded = Counter(), Counter()
+        for created_at, success in orders:
+            bucket = hour_bucket(created_at)
+            totals[bucket] += 1
+            succeeded[bucket] += bool(success)
+        
+        statement = sqlite_insert(OrderStats)
+        statement = statement.on_conflict_do_update(
+            index_elements=[OrderStats.user_id, OrderStats.bucket_start],
+            set_={
+                "total": OrderStats.total + statement.excluded.total,
+                "succeeded": OrderStats.succeeded + statement.excluded.succeeded,
+                "failed": OrderStats.failed + statement.excluded.failed,
+            }
+        )
+        await self.db.execute(statement, [
+            {
+                "user_id": user_id,
+                "bucket_start": bucket,
+                "total": total,
+                "succeeded": succeeded[bucket],
+                "failed": total - succeeded[bucket],
+            }
+            for bucket, total in totals.items()
+        ])
+    
+    def _filtered(self, query, filters: OrderStatsFilter):
+        if filters.user_id is not None:
+            query = query.where(OrderStats.user_id == filters.user_id)
+        if filters.created_from is not None:
+            query = query.where(OrderStats.bucket_start >= hour_bucket(filters.created_from))
+        if filters.created_to is not None:
+            query = query.where(OrderStats.bucket_start < to_utc_naive(filters.created_to))
+        return query
+    
+    def _sums(self):
+        return (
+            func.sum(OrderStats.total).label("total"),
+            func.sum(OrderStats.succeeded).label("succeeded"),
+            func.sum(OrderStats.failed).label("failed"),
+        )
+    
+    async def by_hour(self, filters: OrderStatsFilter):
+        query = self._filtered(select(OrderStats.bucket_start, *self._sums()), filters)
+        result = await self.db.execute(query.group_by(OrderStats.bucket_start).order_by(OrderStats.bucket_start))
+        return result.all()
+    
+    async def by_user(self, filters: OrderStatsFilter, limit: int):
+        """Sums of the first `limit` users with ids above filters.users_after, in id order"""
+        query = self._filtered(select(OrderStats.user_id, *self._sums()), filters)
+        if filters.users_after is not None:
+            query = query.where(OrderStats.user_id > filters.users_after)
+        result = await self.db.execute(query.group_by(OrderStats.user_id).order_by(OrderStats.user_id).limit(limit))
+        return result.all()
+    
+    async def active_months(self, user_id: int = None, success: bool = None,
+                            created_from: datetime = None, created_to: datetime = None) -> set[datetime]:
+        """Starts of the months holding orders of user_id with that outcome, created in [created_from, created_to)"""
+        month = func.strftime("%Y-%m-01 00:00:00", OrderStats.bucket_start)
+        count = {None: OrderStats.total, True: OrderStats.succeeded, False: OrderStats.failed}[success]
+        query = select(month).where(count > 0)
+        if user_id is not None:
+            query = query.where(OrderStats.user_id == user_id)
+        if created_from is not None:
+            query = query.where(OrderStats.bucket_start >= hour_bucket(created_from))
+        if created_to is not None:
+            query = query.where(OrderStats.bucket_start < created_to)
+        result = await self.db.execute(query.distinct())
+        return {datetime.fromisoformat(value) for value in result.scalars()}
+    
+    async def rebuild(self, buckets: int = None, bucket: int = None, since: datetime = None) -> int:
+        """Recompute the rollup from orders, in the caller's transaction.
+
+        With buckets/bucket, only the rows of that user bucket are rebuilt
+        (after its orders moved shards); returns the number of rollup rows.
+        With `since` (the archive boundary), hours before it are kept as they
+        are: their orders were archived and are no longer in the table.
+        """
+        hour = func.strftime("%Y-%m-%d %H:00:00", Order.created_at)
+        succeeded = func.sum(case((Order.success, 1), else_=0))
+        clear = delete(OrderStats)
+        source = select(Order.user_id, hour, func.count(), succeeded, func.count() - succeeded)
+        count = select(func.count()).select_from(OrderStats)
+        if buckets is not None:
+            clear = clear.where(bucket_condition(OrderStats.user_id, buckets, bucket))
+            source = source.where(bucket_condition(Order.user_id, buckets, bucket))
+            count = count.where(bucket_condition(OrderStats.user_id, buckets, bucket))
+        if since is not None:
+            clear = clear.where(OrderStats.bucket_start >= since)
+            source = source.where(Order.created_at >= since)
+        await self.db.execute(clear)
+        await self.db.execute(insert(OrderStats).from_select(
+            ["user_id", "bucket_start", "total", "succeeded", "failed"],
+            source.group_by(Order.user_id, hour)
+        ))
+        return await self.db.scalar(count)
+    
+    async def delete_bucket(self, buckets: int, bucket: int, since: datetime = None) -> int:
+        query = delete(OrderStats).where(bucket_condition(OrderStats.user_id, buckets, bucket))
+        if since is not None:
+            query = query.where(OrderStats.bucket_start >= since)
+        result = await self.db.execute(query)
+        return result.rowcount
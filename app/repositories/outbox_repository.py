@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import OutboxMessage
+
+class OutboxRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    def add(self, event_type: str, payload: dict) -> OutboxMessage:
+        """Stage a message; it is committed by the caller's transaction"""
+        message = OutboxMessage(event_type=event_type, payload=payload, status="pending", attempts=0)
+        self.db.add(message)
+        return message
+    
+    async def claim_batch(self, limit: int, lease_seconds: int) -> list[OutboxMessage]:
+        """Lease up to ``limit`` due messages in one UPDATE ... RETURNING.
+
+        Messages whose lease ran out (worker died mid-send) are claimable again.
+        """
+        now = datetime.utcnow()
+        due = (
+            select(OutboxMessage.id)
+            .where(or_(
+                and_(OutboxMessage.status == "pending", OutboxMessage.available_at <= now),
+                and_(OutboxMessage.status == "processing", OutboxMessage.locked_until < now)
+            ))
+            .order_by(OutboxMessage.id)
+            .limit(limit)
+        )
+        result = await self.db.scalars(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()))
+            .values(
+                status="processing",
+                locked_until=now + timedelta(seconds=lease_seconds),
+                attempts=OutboxMessage.attempts + 1
+            )
+            .returning(OutboxMessage)
+            .execution_options(synchronize_session=False)
+        )
+        messages = list(result.all())
+        await self.db.commit()
+        return messages
+    
+    async def mark_sent(self, message_id: int):
+        # Delivered messages are deleted so the outbox only holds pending and dead ones
+        await self.db.execute(delete(OutboxMessage).where(OutboxMessage.id == message_id))
+        await self.db.commit()
+    
+    async def mark_failed(self, message_id: int, error: str, retry_at: datetime = None):
+        """Reschedule for ``retry_at``, or dead-letter the message when it is None"""
+        await self.db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id)
+            .values(
+                status="pending" if retry_at else "dead",
+                available_at=retry_at or OutboxMessage.available_at,
+                locked_until=None,
+                last_error=error[:1000]
+            )
+        )
+        await self.db.commit()
+    
+    async def requeue_dead(self) -> int:
+        result = await self.db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.status == "dead")
+            .values(status="pending", attempts=0, available_at=datetime.utcnow())
+        )
+        await self.db.commit()
+        return result.rowcount
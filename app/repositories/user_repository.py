@@ -1,14 +1,13 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import User
 from app.schemas.auth import UserCreate
-from app.core.security import hash_password
 
 class UserRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def create_user(self, user: UserCreate) -> User:
-        hashed_password = hash_password(user.password)
+    async def create_user(self, user: UserCreate, hashed_password: str) -> User:
         db_user = User(
             username=user.username,
             email=user.email,
@@ -16,12 +15,17 @@ class UserRepository:
             role=user.role
         )
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
         return db_user
     
-    def get_user_by_username(self, username: str) -> User:
-        return self.db.query(User).filter(User.username == username).first()
+    async def get_user_by_username(self, username: str) -> User:
+        return await self.db.scalar(select(User).where(User.username == username))
     
-    def get_user_by_id(self, user_id: int) -> User:
-        return self.db.query(User).filter(User.id == user_id).first()
+    async def get_user_by_id(self, user_id: int) -> User:
+        return await self.db.scalar(select(User).where(User.id == user_id))
+    
+    async def update_password_hash(self, user: User, hashed_password: str) -> User:
+        user.hashed_password = hashed_password
+        await self.db.commit()
+        return user
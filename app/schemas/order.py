@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import List, Literal, Optional
 from datetime import datetime
+from app.core.config import settings
 
 class OrderCreate(BaseModel):
     success: bool
@@ -14,5 +15,71 @@ class OrderResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=settings.ORDERS_BATCH_MAX_SIZE)
+
+class OrderBatchItemResult(BaseModel):
+    index: int
+    order: OrderResponse
+
+class OrderBatchResponse(BaseModel):
+    results: List[OrderBatchItemResult]
+    succeeded: int
+    failed: int
+
+class OrderFilter(BaseModel):
+    """Query parameters for GET /orders (newest first, keyset paginated)"""
+    limit: int = Field(settings.ORDERS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ORDERS_PAGE_MAX_LIMIT)
+    cursor: Optional[str] = None
+    success: Optional[bool] = None
+    user_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+class OrderExportFilter(BaseModel):
+    """Query parameters for GET /orders/export (every matching order, streamed)"""
+    format: Literal["ndjson", "csv"] = "ndjson"
+    gzip: bool = False
+    success: Optional[bool] = None
+    user_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
 class OrderListResponse(BaseModel):
     orders: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+class OrderStatsFilter(BaseModel):
+    """Query parameters for GET /orders/stats; ranges are rounded to whole hours.
+
+    created_from defaults to ORDER_STATS_DEFAULT_WINDOW_HOURS before
+    created_to (or now). The per-user breakdown lists up to users_limit users
+    with ids above users_after.
+    """
+    user_id: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    users_limit: int = Field(settings.ORDER_STATS_USERS_DEFAULT_LIMIT, ge=1, le=settings.ORDER_STATS_USERS_MAX_LIMIT)
+    users_after: Optional[int] = None
+
+class OrderCounts(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    
+    @computed_field
+    @property
+    def success_rate(self) -> Optional[float]:
+        return self.succeeded / self.total if self.total else None
+
+class HourlyOrderStats(OrderCounts):
+    bucket_start: datetime
+
+class UserOrderStats(OrderCounts):
+    user_id: int
+
+class OrderStatsResponse(OrderCounts):
+    created_from: datetime
+    hourly: List[HourlyOrderStats]
+    users: List[UserOrderStats]
+    next_users_after: Optional[int] = None
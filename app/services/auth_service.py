@@ -1,35 +1,74 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.user_repository import UserRepository
 from app.schemas.auth import UserCreate, UserLogin
-from app.core.security import verify_password_hash, create_access_token, verify_token, validate_password
+from app.core.security import create_access_token, verify_token, validate_password, password_needs_rehash
+from app.core.password_hasher import PasswordHasherBusy, password_hasher
 from app.core.logger import log_action
+from app.services.principal_cache import Principal, principal_cache
+from app.db.session import session_router
 from fastapi import HTTPException, status
 
+def hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent password operations; retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+# Verified against when the username does not exist, so unknown and known
+# usernames take the same time to reject
+_dummy_hash = None
+
+async def _get_dummy_hash() -> str:
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await password_hasher.hash("dummy-password")
+    return _dummy_hash
+
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, read_db: AsyncSession = None):
         self.user_repo = UserRepository(db)
+        self.read_user_repo = UserRepository(read_db or db)
     
-    @log_action("register_user")
-    def register_user(self, user: UserCreate):
+    @log_action("register_user", stage="auth")
+    async def register_user(self, user: UserCreate):
         if not validate_password(user.password):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Password must be at least 8 characters with uppercase, lowercase, digit, and special character"
             )
         
-        existing_user = self.user_repo.get_user_by_username(user.username)
+        existing_user = await self.user_repo.get_user_by_username(user.username)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Username already registered"
             )
         
-        return self.user_repo.create_user(user)
+        try:
+            hashed_password = await password_hasher.hash(user.password)
+        except PasswordHasherBusy:
+            raise hashing_unavailable()
+        db_user = await self.user_repo.create_user(user, hashed_password)
+        await session_router.record_write(db_user.id)
+        return db_user
     
-    @log_action("authenticate_user")
-    def authenticate_user(self, user_login: UserLogin):
-        user = self.user_repo.get_user_by_username(user_login.username)
-        if not user or not verify_password_hash(user_login.password, user.hashed_password):
+    @log_action("authenticate_user", stage="auth")
+    async def authenticate_user(self, user_login: UserLogin):
+        user = await self.user_repo.get_user_by_username(user_login.username)
+        try:
+            if user:
+                verified = await password_hasher.verify(user_login.password, user.hashed_password)
+            else:
+                await password_hasher.verify(user_login.password, await _get_dummy_hash())
+                verified = False
+            if verified and password_needs_rehash(user.hashed_password):
+                # Legacy SHA-256 or outdated KDF parameters: upgrade while we have the password
+                await self.user_repo.update_password_hash(user, await password_hasher.hash(user_login.password))
+                await session_router.record_write(user.id)
+        except PasswordHasherBusy:
+            raise hashing_unavailable()
+        if not verified:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password"
@@ -48,13 +87,20 @@ class AuthService:
             }
         }
     
-    @log_action("get_current_user")
-    def get_current_user(self, token: str):
+    @log_action("get_current_user", stage="auth")
+    async def get_current_user(self, token: str) -> Principal:
+        cached = principal_cache.get(token)
+        if cached is not None:
+            return cached.principal
+        
         payload = verify_token(token)
-        user = self.user_repo.get_user_by_id(payload["user_id"])
+        user_repo = self.user_repo if await session_router.reads_from_primary(payload["user_id"]) else self.read_user_repo
+        user = await user_repo.get_user_by_id(payload["user_id"])
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
             )
-        return user
+        principal = Principal.from_user(user)
+        principal_cache.put(token, payload, principal)
+        return principal
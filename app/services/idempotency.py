@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from fastapi import HTTPException, status
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    body: bytes
+
+def fingerprint(payload: bytes) -> str:
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+class IdempotencyStore:
+    """Completed responses by (user_id, Idempotency-Key), with duplicate requests collapsed.
+
+    Lookups go to an in-memory LRU first and to the idempotency_keys table
+    (via `lookup`) on a miss. Requests with a key that is already executing
+    in this process wait for that execution instead of starting their own;
+    across processes, the key is claimed in the order's own transaction, so
+    only one request can commit it and the others replay its response.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache("idempotency", maxsize, ttl)
+        self._in_flight = {}
+
+    def remember(self, scope: tuple, stored: StoredResponse, expires_at: datetime = None):
+        ttl = (expires_at - datetime.utcnow()).total_seconds() if expires_at is not None else None
+        self._cache.set(scope, stored, ttl)
+
+    async def run(self, scope: tuple, request_fingerprint: str, lookup, execute) -> tuple[StoredResponse, bool]:
+        """(response, replayed): the stored response for scope, or the one `execute` produced.
+
+        `lookup()` returns (StoredResponse, expires_at) or None; `execute()`
+        returns a StoredResponse, or None if another process claimed the key
+        first (then the lookup is retried once that request has committed).
+        """
+        while True:
+            stored = self._cache.get(scope)
+            if stored is not None:
+                return self._checked(stored, request_fingerprint), True
+            leader = self._in_flight.get(scope)
+            if leader is None:
+                break
+            # Wait for the request already executing, then look again: it either stored a response or failed
+            await asyncio.shield(leader)
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[scope] = done
+        try:
+            found = await lookup()
+            if found is not None:
+                self.remember(scope, *found)
+                return self._checked(found[0], request_fingerprint), True
+            stored = await execute()
+            if stored is not None:
+                self.remember(scope, stored)
+                return stored, False
+            found = await lookup()
+            if found is None:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                                    detail="A request with this Idempotency-Key is still in progress")
+            self.remember(scope, *found)
+            return self._checked(found[0], request_fingerprint), True
+        finally:
+            del self._in_flight[scope]
+            done.set_result(None)
+
+    @staticmethod
+    def _checked(stored: StoredResponse, request_fingerprint: str) -> StoredResponse:
+        if stored.fingerprint != request_fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                                detail="Idempotency-Key was already used with a different request body")
+        return stored
+
+    def clear(self):
+        self._cache.clear()
+
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_KEY_TTL)
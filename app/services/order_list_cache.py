@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.logger import logger
+from app.utils.serialization import make_etag
+
+# Scope of admin listings, which change with every user's writes
+ALL_USERS = "all"
+
+@dataclass(frozen=True)
+class CachedPage:
+    version: int
+    etag: str
+    body: bytes
+
+class SQLiteListVersions:
+    """Write versions of the listing scopes in a SQLite file shared by every worker process on the host"""
+    BUMP = """
+        INSERT INTO order_list_versions (scope, version) VALUES (:scope, 1), (:all_users, 1)
+        ON CONFLICT (scope) DO UPDATE SET version = version + 1
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # A lost bump on power failure can only serve a page until its TTL, so skip fsync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"PRAGMA busy_timeout={settings.ORDER_LIST_CACHE_BUSY_TIMEOUT_MS}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS order_list_versions (scope TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            " WITHOUT ROWID"
+        )
+
+    def bump(self, user_id: int):
+        with self._lock:
+            self._conn.execute(self.BUMP, {"scope": str(user_id), "all_users": ALL_USERS})
+
+    def version(self, scope) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT version FROM order_list_versions WHERE scope = ?", (str(scope),)).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        self._conn.close()
+
+class OrderListCache:
+    """Encoded order pages keyed by (scope, query), valid while the scope's write version is unchanged.
+
+    Every committed order write takes the next number of a process-wide
+    sequence as the version of the writing user and of ALL_USERS. A page is
+    stored with its scope's version as read before the query ran, so a write
+    racing the query can only make the page look older than it is. Versions
+    of the least recently written users are forgotten beyond `max_users`;
+    a forgotten user's version reads as the highest version forgotten so far,
+    which is never older than the one it replaced.
+
+    With `shared_path` the versions are instead counted per scope in a file
+    every worker process reads (from the threadpool), so a write through one
+    worker invalidates the pages of all of them. Pages stay per process. If
+    the file cannot be read, the page is neither served from nor stored in
+    the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, max_users: int, shared_path: str = ""):
+        self._pages = TTLCache("order_list", maxsize, ttl)
+        self._shared = SQLiteListVersions(shared_path) if shared_path else None
+        self._user_versions = OrderedDict()
+        self._max_users = max_users
+        self._sequence = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    async def record_write(self, user_id: int):
+        if self._shared is not None:
+            try:
+                await run_in_threadpool(self._shared.bump, user_id)
+            except sqlite3.Error as e:
+                # Other workers serve their cached pages until ORDER_LIST_CACHE_TTL
+                logger.warning(f"Order list version of user {user_id} not shared: {e}")
+                self._pages.clear()
+            return
+        with self._lock:
+            self._sequence += 1
+            self._user_versions[user_id] = self._sequence
+            self._user_versions.move_to_end(user_id)
+            while len(self._user_versions) > self._max_users:
+                _, version = self._user_versions.popitem(last=False)
+                self._floor = max(self._floor, version)
+
+    async def version(self, scope) -> int:
+        """The scope's current version, None if it cannot be read"""
+        if self._shared is not None:
+            try:
+                return await run_in_threadpool(self._shared.version, scope)
+            except sqlite3.Error as e:
+                logger.warning(f"Order list version of {scope} unknown, not caching: {e}")
+                return None
+        with self._lock:
+            if scope == ALL_USERS:
+                return self._sequence
+            return self._user_versions.get(scope, self._floor)
+
+    async def get(self, scope, query: str) -> tuple[int, CachedPage]:
+        """The scope's current version, and the page cached for it (None if missing or stale)"""
+        version = await self.version(scope)
+        page = self._pages.get((scope, query)) if version is not None else None
+        return version, page if page is not None and page.version == version else None
+
+    def put(self, scope, query: str, version: int, body: bytes) -> CachedPage:
+        page = CachedPage(version, make_etag(body), body)
+        if version is not None:
+            self._pages.set((scope, query), page)
+        return page
+
+    def clear(self):
+        self._pages.clear()
+        with self._lock:
+            self._user_versions.clear()
+            self._floor = self._sequence
+
+    def stats(self) -> dict:
+        return self._pages.stats()
+
+order_list_cache = OrderListCache(
+    settings.ORDER_LIST_CACHE_SIZE, settings.ORDER_LIST_CACHE_TTL, settings.ORDER_LIST_CACHE_MAX_USERS,
+    shared_path=settings.ORDER_LIST_CACHE_VERSIONS_PATH
+)
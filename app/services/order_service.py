@@ -1,43 +1,326 @@
-from sqlalchemy.orm import Session
+import heapq
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.order_repository import OrderRepository
-from app.services.email_service import EmailService
-from app.schemas.order import OrderCreate
+from app.repositories.outbox_repository import OutboxRepository
+from app.repositories.order_stats_repository import OrderStatsRepository, hour_bucket
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.services.idempotency import StoredResponse, fingerprint, idempotency_store
+from app.services.order_list_cache import ALL_USERS, order_list_cache
+from app.services.principal_cache import Principal
+from app.db.session import session_router
+from app.db.sharding import order_ids, shard_router
+from app.schemas.order import OrderCreate, OrderBatchCreate, OrderBatchResponse, OrderExportFilter, OrderFilter, OrderStatsFilter, OrderStatsResponse
+from app.utils.pagination import encode_cursor, to_utc_naive
+from app.utils.serialization import (
+    EXPORT_CSV_HEADER, conditional_json_response, encode_order, encode_order_csv, encode_order_list,
+    encode_order_ndjson, json_response, make_etag
+)
+from app.core.config import settings
 from app.core.logger import log_action, logger
+from app.core.tracing import span
 from fastapi import HTTPException, status
-from fastapi import BackgroundTasks
+from fastapi.responses import StreamingResponse
+
+ORDER_SUCCEEDED = "order.succeeded"
+ORDER_FAILED = "order.failed"
+ORDER_BATCH = "order.batch"
+
+# GET /orders/export format -> (media type, download file name)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "orders.ndjson"),
+    "csv": ("text/csv; charset=utf-8", "orders.csv"),
+}
 
 class OrderService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession, read_db: AsyncSession = None):
+        self.db = db
         self.order_repo = OrderRepository(db)
+        self.stats_repo = OrderStatsRepository(db)
+        # Replica-backed repositories for reads that may lag the primary
+        self.read_order_repo = OrderRepository(read_db or db)
+        self.read_stats_repo = OrderStatsRepository(read_db or db)
+    
+    @asynccontextmanager
+    async def _orders_db(self, user_id: int):
+        """Session holding user_id's orders: the request's own, or one on the user's shard"""
+        if not shard_router.enabled:
+            yield self.db
+            return
+        async with shard_router.open_user_session(user_id) as db:
+            yield db
+    
+    async def _new_order_ids(self, count: int):
+        """Ids for sharded inserts; None lets the primary assign them"""
+        return await order_ids.allocate(count) if shard_router.enabled else None
     
     @log_action("create_order")
-    def create_order(self, order: OrderCreate, user_id: int, user_email: str, background_tasks: BackgroundTasks):
+    async def create_order(self, order: OrderCreate, user: Principal, idempotency_key: str = None):
+        """The new Order; with an Idempotency-Key, its encoded OrderResponse, replayed for repeats of the key"""
+        async with self._orders_db(user.id) as db:
+            if idempotency_key is None:
+                return await self._create_order(db, order, user)
+            
+            request_fingerprint = fingerprint(order.model_dump_json().encode())
+            
+            async def lookup():
+                row = await IdempotencyRepository(db).get(user.id, idempotency_key)
+                return None if row is None else (StoredResponse(row.fingerprint, row.response), row.expires_at)
+            
+            async def execute():
+                db_order = await self._create_order(db, order, user, idempotency_key, request_fingerprint)
+                return None if db_order is None else StoredResponse(request_fingerprint, encode_order(db_order))
+            
+            stored, replayed = await idempotency_store.run((user.id, idempotency_key), request_fingerprint, lookup, execute)
+            return json_response(stored.body, {"Idempotent-Replayed": "true"} if replayed else None)
+    
+    async def _create_order(self, db: AsyncSession, order: OrderCreate, user: Principal,
+                            idempotency_key: str = None, request_fingerprint: str = None):
+        """The committed Order, or None if another request claimed idempotency_key first"""
         try:
+            # Claim the key first: its INSERT takes the write lock, serializing duplicates
+            if idempotency_key is not None and not await IdempotencyRepository(db).claim(
+                user.id, idempotency_key, request_fingerprint, settings.IDEMPOTENCY_KEY_TTL
+            ):
+                await db.rollback()
+                return None
+            
             # Create order in database
-            db_order = self.order_repo.create_order(order, user_id)
+            ids = await self._new_order_ids(1)
+            db_order = await OrderRepository(db).create_order(order, user.id, ids[0] if ids else None)
+            await OrderStatsRepository(db).record(user.id, [(db_order.created_at, db_order.success)])
             
-            # Schedule email notification in background; errors won't block request
-            if order.success:
-                background_tasks.add_task(EmailService.send_success_email, user_email)
-            else:
+            # The notification is committed atomically with the order and
+            # delivered by the notification worker, outside this process
+            if not order.success:
                 # Explicitly log rollback intent for failed orders
                 logger.warning("Order creation marked as failed; rolling back side-effects and notifying user")
-                background_tasks.add_task(EmailService.send_failure_email, user_email)
-            
+            OutboxRepository(db).add(
+                ORDER_SUCCEEDED if order.success else ORDER_FAILED,
+                {
+                    "order_id": db_order.id,
+                    "user_id": user.id,
+                    "username": user.username,
+                    "to_email": user.email,
+                    "created_at": db_order.created_at.isoformat()
+                }
+            )
+            if idempotency_key is not None:
+                await IdempotencyRepository(db).complete(user.id, idempotency_key, encode_order(db_order))
+            await db.commit()
+            await session_router.record_write(user.id)
+            await order_list_cache.record_write(user.id)
             return db_order
         except Exception as e:
             # Explicitly log rollback on error path
             logger.error(f"Order creation encountered error; rolling back. Error: {str(e)}")
-            # Rollback is handled by SQLAlchemy session
+            await db.rollback()
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Order creation failed. Rolling back. Reason: {str(e)}"
             )
     
+    @log_action("create_orders_batch")
+    async def create_orders(self, batch: OrderBatchCreate, user: Principal) -> OrderBatchResponse:
+        """All orders in one transaction with a single summary notification"""
+        async with self._orders_db(user.id) as db:
+            rows = await self._create_orders(db, batch, user)
+        succeeded = sum(1 for row in rows if row.success)
+        return OrderBatchResponse(
+            results=[{"index": index, "order": row} for index, row in enumerate(rows)],
+            succeeded=succeeded,
+            failed=len(rows) - succeeded
+        )
+    
+    async def _create_orders(self, db: AsyncSession, batch: OrderBatchCreate, user: Principal):
+        try:
+            ids = await self._new_order_ids(len(batch.orders))
+            rows = await OrderRepository(db).create_orders(batch.orders, user.id, ids)
+            succeeded = sum(1 for row in rows if row.success)
+            await OrderStatsRepository(db).record(user.id, [(row.created_at, row.success) for row in rows])
+            OutboxRepository(db).add(
+                ORDER_BATCH,
+                {
+                    "order_ids": [row.id for row in rows],
+                    "user_id": user.id,
+                    "username": user.username,
+                    "to_email": user.email,
+                    "succeeded": succeeded,
+                    "failed": len(rows) - succeeded,
+                    "created_at": rows[0].created_at.isoformat()
+                }
+            )
+            await db.commit()
+            await session_router.record_write(user.id)
+            await order_list_cache.record_write(user.id)
+            return rows
+        except Exception as e:
+            logger.error(f"Batch order creation encountered error; rolling back. Error: {str(e)}")
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Batch order creation failed. Rolling back. Reason: {str(e)}"
+            )
+    
     @log_action("get_user_orders")
-    def get_user_orders(self, user_id: int):
-        return self.order_repo.get_user_orders(user_id)
+    async def get_user_orders(self, user_id: int, filters: OrderFilter, if_none_match: str = None):
+        return await self.get_all_orders(
+            filters.model_copy(update={"user_id": user_id}), requester_id=user_id,
+            if_none_match=if_none_match, scope=user_id
+        )
     
     @log_action("get_all_orders")
-    def get_all_orders(self):
-        return self.order_repo.get_all_orders()
+    async def get_all_orders(self, filters: OrderFilter, requester_id: int = None, if_none_match: str = None,
+                             scope=ALL_USERS):
+        """One page as an encoded OrderListResponse with an ETag, or 304 if the client's copy is current.
+
+        Pages read from the primary (or the shards) are cached until `scope`,
+        the listed user or ALL_USERS, writes again, so an unchanged poll costs
+        neither a query nor encoding. Pages read from a replica are not
+        cached: nothing bumps a version when a lagging replica catches up.
+        """
+        from_primary = shard_router.enabled or await session_router.reads_from_primary(requester_id)
+        query = filters.model_dump_json()
+        version, page = await order_list_cache.get(scope, query) if from_primary else (None, None)
+        if page is not None:
+            content, etag = page.body, page.etag
+        else:
+            content = await self._encode_page(filters, from_primary)
+            etag = order_list_cache.put(scope, query, version, content).etag if from_primary else make_etag(content)
+        return conditional_json_response(content, etag, if_none_match)
+    
+    async def _encode_page(self, filters: OrderFilter, from_primary: bool) -> bytes:
+        # Fetch one extra row to learn whether another page exists
+        if shard_router.enabled:
+            orders = await self._list_sharded_orders(filters, filters.limit + 1)
+        else:
+            order_repo = self.order_repo if from_primary else self.read_order_repo
+            orders = await order_repo.list_orders(filters, filters.limit + 1)
+        next_cursor = None
+        if len(orders) > filters.limit:
+            orders = orders[:filters.limit]
+            next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+        with span("encode_order_list", "serialization"):
+            return encode_order_list(orders, next_cursor)
+    
+    async def _list_sharded_orders(self, filters: OrderFilter, limit: int):
+        """One user's page from their shard, or every shard's page merged on (created_at, id)"""
+        if filters.user_id is not None:
+            async with shard_router.open_user_session(filters.user_id) as db:
+                return await OrderRepository(db).list_orders(filters, limit)
+        pages = await shard_router.scatter(lambda db: OrderRepository(db).list_orders(filters, limit))
+        with span("merge_shard_pages", "sharding"):
+            merged = heapq.merge(*pages, key=lambda row: (row.created_at, row.id), reverse=True)
+            return list(islice(merged, limit))
+    
+    @log_action("export_orders")
+    async def export_orders(self, filters: OrderExportFilter, requester_id: int = None) -> StreamingResponse:
+        """Every matching order as a streamed NDJSON or CSV download, optionally gzip-encoded"""
+        media_type, filename = EXPORT_FORMATS[filters.format]
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+        if filters.gzip:
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(self._export_body(filters, requester_id), media_type=media_type, headers=headers)
+    
+    async def _export_body(self, filters: OrderExportFilter, requester_id: int = None):
+        encode = encode_order_csv if filters.format == "csv" else encode_order_ndjson
+        # wbits=31: a gzip member, compressed chunk by chunk as the rows arrive
+        compressor = zlib.compressobj(settings.ORDER_EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if filters.gzip else None
+        chunk = EXPORT_CSV_HEADER if filters.format == "csv" else b""
+        async for rows in self._export_rows(filters, requester_id):
+            chunk += encode(rows)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+            chunk = b""
+        if compressor is not None:
+            yield compressor.compress(chunk) + compressor.flush()
+        elif chunk:
+            yield chunk
+    
+    async def _export_rows(self, filters: OrderExportFilter, requester_id: int = None):
+        """Batches of matching rows: each database's table newest first, then its archived months.
+
+        With sharding the shards are exported one after another, so the rows
+        are only ordered within each shard.
+        """
+        batch_size = settings.ORDER_EXPORT_BATCH_SIZE
+        if not shard_router.enabled:
+            order_repo = self.order_repo if await session_router.reads_from_primary(requester_id) else self.read_order_repo
+            async for rows in order_repo.stream_orders(filters, batch_size):
+                yield rows
+            async for rows in order_repo.stream_archived(filters, batch_size):
+                yield rows
+            return
+        shards = ([shard_router.shard_for(filters.user_id)] if filters.user_id is not None
+                  else range(shard_router.shard_count))
+        for shard in shards:
+            async with shard_router.open_shard_session(shard) as db:
+                async for rows in OrderRepository(db).stream_orders(filters, batch_size):
+                    yield rows
+                async for rows in OrderRepository(db).stream_archived(filters, batch_size):
+                    yield rows
+    
+    @log_action("get_order_stats")
+    async def get_order_stats(self, filters: OrderStatsFilter, requester_id: int = None) -> OrderStatsResponse:
+        """Totals, hourly and per-user counts read from the rollup, never from orders.
+
+        Without created_from only the last ORDER_STATS_DEFAULT_WINDOW_HOURS
+        are counted, and users are listed a page at a time, so the cost and
+        the response size do not grow with the history or the user count.
+        """
+        if filters.created_from is None:
+            window_end = to_utc_naive(filters.created_to) if filters.created_to is not None else datetime.utcnow()
+            filters = filters.model_copy(update={
+                "created_from": window_end - timedelta(hours=settings.ORDER_STATS_DEFAULT_WINDOW_HOURS)
+            })
+        # One extra user shows whether another page follows
+        users_limit = filters.users_limit + 1
+        if shard_router.enabled:
+            hourly, users = await self._sharded_stats(filters, users_limit)
+        else:
+            stats_repo = self.stats_repo if await session_router.reads_from_primary(requester_id) else self.read_stats_repo
+            hourly = [row._asdict() for row in await stats_repo.by_hour(filters)]
+            users = [row._asdict() for row in await stats_repo.by_user(filters, users_limit)]
+        next_users_after = None
+        if len(users) > filters.users_limit:
+            users = users[:filters.users_limit]
+            next_users_after = users[-1]["user_id"]
+        succeeded = sum(row["succeeded"] for row in hourly)
+        failed = sum(row["failed"] for row in hourly)
+        return OrderStatsResponse(
+            total=succeeded + failed,
+            succeeded=succeeded,
+            failed=failed,
+            created_from=hour_bucket(filters.created_from),
+            hourly=hourly,
+            users=users,
+            next_users_after=next_users_after
+        )
+    
+    async def _sharded_stats(self, filters: OrderStatsFilter, users_limit: int):
+        """Every shard's hourly and per-user rollups, summed per hour and per user"""
+        async def read(db):
+            stats_repo = OrderStatsRepository(db)
+            return await stats_repo.by_hour(filters), await stats_repo.by_user(filters, users_limit)
+        results = await shard_router.scatter(read)
+        return (
+            sum_counts((row for hourly, _ in results for row in hourly), "bucket_start"),
+            sum_counts((row for _, users in results for row in users), "user_id")[:users_limit],
+        )
+
+def sum_counts(rows, key: str) -> list[dict]:
+    """Add up total/succeeded/failed of rows sharing `key`, ordered by it"""
+    sums = {}
+    for row in rows:
+        entry = sums.get(getattr(row, key))
+        if entry is None:
+            sums[getattr(row, key)] = row._asdict()
+        else:
+            for field in ("total", "succeeded", "failed"):
+                entry[field] += getattr(row, field)
+    return [sums[value] for value in sorted(sums)]
@@ -0,0 +1,87 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import event
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.models import User
+
+@dataclass(frozen=True)
+class Principal:
+    """Detached snapshot of the authenticated user"""
+    id: int
+    username: str
+    email: str
+    role: str
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            created_at=user.created_at
+        )
+
+@dataclass(frozen=True)
+class CachedPrincipal:
+    claims: dict
+    principal: Principal
+
+class PrincipalCache:
+    """Token -> (decoded claims, Principal), so authenticated requests skip the user SELECT.
+
+    _tokens_by_user indexes the cached tokens for invalidate_user; tokens
+    leave it when the cache evicts or expires them, so it never holds more
+    than the cache does.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache("principal", maxsize, ttl, on_evict=self._forget)
+        self._tokens_by_user = {}
+        # Reentrant: set() under the lock may evict, which calls _forget
+        self._lock = threading.RLock()
+
+    def get(self, token: str) -> CachedPrincipal:
+        return self._cache.get(token)
+
+    def put(self, token: str, claims: dict, principal: Principal):
+        # Never outlive the token itself
+        ttl = claims["exp"] - time.time() if "exp" in claims else None
+        if ttl is not None and ttl <= 0:
+            return
+        with self._lock:
+            self._cache.set(token, CachedPrincipal(claims, principal), ttl)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+
+    def _forget(self, token: str, cached: CachedPrincipal):
+        with self._lock:
+            tokens = self._tokens_by_user.get(cached.principal.id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[cached.principal.id]
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            tokens = self._tokens_by_user.pop(user_id, ())
+        for token in tokens:
+            self._cache.delete(token)
+
+    def clear(self):
+        self._cache.clear()
+        with self._lock:
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
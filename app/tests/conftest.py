@@ -1,30 +1,54 @@
+import os
 import pytest
 import asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+# Rate limiting is exercised by its own tests (which enable it); elsewhere it
+# would turn the fixtures' repeated logins and order creation into 429s
+os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+# Listing versions stay in the test process; sharing them has its own tests
+os.environ.setdefault("ORDER_LIST_CACHE_VERSIONS_PATH", "")
+# Archive tests list right after archiving; the catalogue cache has its own test
+os.environ.setdefault("ORDER_ARCHIVE_CATALOGUE_TTL", "0")
+# Minimum bcrypt cost keeps fixture logins fast
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 from app.main import app
-from app.db.session import get_db
+from app.db.session import get_db, make_get_db, open_session, create_db_engine, create_async_db_engine, session_router
 from app.db.models import Base, User, Order
 from app.core.security import hash_password
+from app.core.rate_limit import rate_limiter
+from app.services.principal_cache import principal_cache
+from app.repositories.order_archive_repository import archive_catalogue
+from app.services.order_list_cache import order_list_cache
+from app.services.idempotency import idempotency_store
+from app.workers.notification_worker import NotificationWorker
 
 # Test database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+# TestClient runs every request on a fresh event loop, so async connections must not be pooled across them
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+override_get_db = make_get_db(TestingSessionLocal, TestingAsyncSessionLocal)
 
 app.dependency_overrides[get_db] = override_get_db
 
 @pytest.fixture(scope="function")
 def setup_database():
     Base.metadata.create_all(bind=engine)
+    principal_cache.clear()
+    order_list_cache.clear()
+    archive_catalogue.clear()
+    idempotency_store.clear()
+    rate_limiter.reset()
+    session_router.reset()
     yield
     Base.metadata.drop_all(bind=engine)
 
@@ -85,3 +109,14 @@ def admin_token(client, admin_user):
 def user_token(client, regular_user):
     response = client.post("/auth/login", json={"username": "user1", "password": "User123"})
     return response.json()["access_token"]
+
+@pytest.fixture
+def drain_outbox():
+    """Run one notification worker batch against the test database"""
+    def drain(**worker_options):
+        worker = NotificationWorker(
+            session_scope=lambda: open_session(TestingSessionLocal, TestingAsyncSessionLocal),
+            **worker_options
+        )
+        return asyncio.run(worker.run_once())
+    return drain
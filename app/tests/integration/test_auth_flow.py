@@ -42,3 +42,79 @@ class TestAuthFlow:
         })
         assert response.status_code == 400
         assert "Password must be at least 8 characters" in response.json()["detail"]
+
+    def test_current_user_is_served_from_principal_cache(self, client, admin_token, monkeypatch):
+        from app.repositories.user_repository import UserRepository
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+        async def fail_lookup(self, user_id):
+            raise AssertionError("user lookup should be cached")
+        monkeypatch.setattr(UserRepository, "get_user_by_id", fail_lookup)
+        response = client.get("/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == "admin"
+
+    def test_principal_cache_invalidated_on_user_change(self, client, admin_token):
+        from app.tests.conftest import TestingSessionLocal
+        from app.db.models import User
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.get("/auth/me", headers=headers).json()["email"] == "admin@test.com"
+
+        db = TestingSessionLocal()
+        try:
+            db.query(User).filter(User.username == "admin").one().email = "root@test.com"
+            db.commit()
+        finally:
+            db.close()
+
+        assert client.get("/auth/me", headers=headers).json()["email"] == "root@test.com"
+
+    def test_register_stores_bcrypt_hash(self, client, setup_database):
+        from app.tests.conftest import TestingSessionLocal
+        from app.db.models import User
+        response = client.post("/auth/register", json={
+            "username": "newuser", "email": "new@test.com", "password": "Secret123!", "role": "user"
+        })
+        assert response.status_code == 200
+
+        db = TestingSessionLocal()
+        try:
+            assert db.query(User).filter(User.username == "newuser").one().hashed_password.startswith("$2b$04$")
+        finally:
+            db.close()
+        assert client.post("/auth/login", json={"username": "newuser", "password": "Secret123!"}).status_code == 200
+
+    def test_legacy_sha256_hash_upgraded_on_login(self, client, setup_database):
+        import hashlib
+        from app.tests.conftest import TestingSessionLocal
+        from app.db.models import User
+        db = TestingSessionLocal()
+        try:
+            db.add(User(username="legacy", email="legacy@test.com", role="user",
+                        hashed_password=hashlib.sha256(b"Legacy123!").hexdigest()))
+            db.commit()
+        finally:
+            db.close()
+
+        assert client.post("/auth/login", json={"username": "legacy", "password": "wrong"}).status_code == 401
+        assert client.post("/auth/login", json={"username": "legacy", "password": "Legacy123!"}).status_code == 200
+
+        db = TestingSessionLocal()
+        try:
+            assert db.query(User).filter(User.username == "legacy").one().hashed_password.startswith("$2b$")
+        finally:
+            db.close()
+        assert client.post("/auth/login", json={"username": "legacy", "password": "Legacy123!"}).status_code == 200
+
+    def test_unknown_user_rejected(self, client, setup_database):
+        response = client.post("/auth/login", json={"username": "nobody", "password": "Whatever1!"})
+        assert response.status_code == 401
+
+    def test_login_rejected_when_hash_queue_full(self, client, admin_user, monkeypatch):
+        from app.core.password_hasher import PasswordHasher
+        from app.services import auth_service
+        monkeypatch.setattr(auth_service, "password_hasher", PasswordHasher("thread", workers=1, max_pending=0))
+        response = client.post("/auth/login", json={"username": "admin", "password": "Admin123"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
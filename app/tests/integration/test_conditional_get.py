@@ -0,0 +1,48 @@
+from app.repositories.order_repository import OrderRepository
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user
+
+
+def get_orders(client, token, etag=None):
+    headers = {"Authorization": f"Bearer {token}"}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get("/orders/", headers=headers)
+
+class TestConditionalGet:
+    def test_unchanged_poll_is_not_modified(self, client, user_token):
+        client.post("/orders/create", headers={"Authorization": f"Bearer {user_token}"}, json={"success": True})
+        first = get_orders(client, user_token)
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        second = get_orders(client, user_token, first.headers["etag"])
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == first.headers["etag"]
+
+    def test_new_order_changes_the_etag(self, client, user_token):
+        etag = get_orders(client, user_token).headers["etag"]
+        client.post("/orders/create", headers={"Authorization": f"Bearer {user_token}"}, json={"success": True})
+        response = get_orders(client, user_token, etag)
+        assert response.status_code == 200
+        assert len(response.json()["orders"]) == 1
+        assert response.headers["etag"] != etag
+
+    def test_cached_poll_skips_the_query(self, client, admin_token, user_token, monkeypatch):
+        calls = []
+        list_orders = OrderRepository.list_orders
+        async def counting_list_orders(self, filters, limit):
+            calls.append(filters.user_id)
+            return await list_orders(self, filters, limit)
+        monkeypatch.setattr(OrderRepository, "list_orders", counting_list_orders)
+
+        get_orders(client, user_token)
+        get_orders(client, user_token)
+        get_orders(client, admin_token)
+        assert len(calls) == 2
+
+        # Another user's order invalidates admin listings but not this user's
+        client.post("/orders/create", headers={"Authorization": f"Bearer {admin_token}"}, json={"success": True})
+        get_orders(client, user_token)
+        assert len(get_orders(client, admin_token).json()["orders"]) == 1
+        assert len(calls) == 3
@@ -0,0 +1,77 @@
+import asyncio
+import httpx
+from app.db.models import IdempotencyKey, Order, OutboxMessage
+from app.main import app
+from app.repositories.order_repository import OrderRepository
+from app.services.idempotency import idempotency_store
+from app.workers.prune_idempotency_keys import prune_idempotency_keys
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user, TestingSessionLocal, TestingAsyncSessionLocal
+from app.db.session import open_session
+
+
+def create_order(client, token, key, success=True):
+    return client.post("/orders/create", json={"success": success},
+                       headers={"Authorization": f"Bearer {token}", "Idempotency-Key": key})
+
+def count(model):
+    db = TestingSessionLocal()
+    try:
+        return db.query(model).count()
+    finally:
+        db.close()
+
+class TestIdempotency:
+    def test_retry_replays_the_first_response(self, client, user_token):
+        first = create_order(client, user_token, "retry-1")
+        second = create_order(client, user_token, "retry-1")
+        assert first.status_code == second.status_code == 200
+        assert second.json() == first.json()
+        assert "idempotent-replayed" not in first.headers
+        assert second.headers["idempotent-replayed"] == "true"
+        assert count(Order) == 1
+        assert count(OutboxMessage) == 1
+
+    def test_replay_from_the_table_skips_the_repository(self, client, user_token, monkeypatch):
+        first = create_order(client, user_token, "retry-2")
+        idempotency_store.clear()
+        def fail(*args, **kwargs):
+            raise AssertionError("order created twice")
+        monkeypatch.setattr(OrderRepository, "create_order", fail)
+        assert create_order(client, user_token, "retry-2").json() == first.json()
+
+    def test_key_reused_with_another_body_is_rejected(self, client, user_token):
+        create_order(client, user_token, "retry-3", success=True)
+        response = create_order(client, user_token, "retry-3", success=False)
+        assert response.status_code == 422
+        assert count(Order) == 1
+
+    def test_keys_are_per_user(self, client, admin_token, user_token):
+        assert create_order(client, admin_token, "shared").json()["id"] != create_order(client, user_token, "shared").json()["id"]
+        assert count(Order) == 2
+
+    def test_concurrent_duplicates_execute_once(self, user_token):
+        async def burst():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+                return await asyncio.gather(*(
+                    http.post("/orders/create", json={"success": True},
+                              headers={"Authorization": f"Bearer {user_token}", "Idempotency-Key": "burst"})
+                    for _ in range(5)
+                ))
+        responses = asyncio.run(burst())
+        assert {response.status_code for response in responses} == {200}
+        assert len({response.json()["id"] for response in responses}) == 1
+        assert sum("idempotent-replayed" in response.headers for response in responses) == 4
+        assert count(Order) == 1
+
+    def test_expired_keys_are_pruned(self, client, user_token, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "IDEMPOTENCY_KEY_TTL", 0)
+        create_order(client, user_token, "old")
+        scope = lambda: open_session(TestingSessionLocal, TestingAsyncSessionLocal)
+        assert asyncio.run(prune_idempotency_keys(scope)) == 1
+        assert count(IdempotencyKey) == 0
+
+        # An expired key starts a new order
+        idempotency_store.clear()
+        create_order(client, user_token, "old")
+        assert count(Order) == 2
@@ -0,0 +1,34 @@
+from prometheus_client import REGISTRY
+from app.tests.conftest import client, admin_token, admin_user
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+class TestMetrics:
+    def test_requests_labelled_by_route_template(self, client, admin_token):
+        labels = {"method": "GET", "endpoint": "/orders/", "status": "200"}
+        before = sample("http_requests_total", **labels)
+        for limit in (1, 2, 3):
+            response = client.get(f"/orders/?limit={limit}", headers={"Authorization": f"Bearer {admin_token}"})
+            assert response.status_code == 200
+        assert sample("http_requests_total", **labels) == before + 3
+
+    def test_unmatched_paths_share_one_label(self, client):
+        labels = {"method": "GET", "endpoint": "<unmatched>", "status": "404"}
+        before = sample("http_requests_total", **labels)
+        client.get("/wp-admin/setup-config.php")
+        client.get("/.env")
+        assert sample("http_requests_total", **labels) == before + 2
+        assert sample("http_requests_total", method="GET", endpoint="/.env", status="404") == 0
+
+    def test_duration_size_and_in_progress(self, client):
+        labels = {"method": "GET", "endpoint": "/health"}
+        count_before = sample("http_request_duration_seconds_count", **labels)
+        size_before = sample("http_response_size_bytes_sum", **labels)
+
+        response = client.get("/health")
+
+        assert sample("http_request_duration_seconds_count", **labels) == count_before + 1
+        assert sample("http_response_size_bytes_sum", **labels) == size_before + len(response.content)
+        assert sample("http_requests_in_progress", method="GET") == 0
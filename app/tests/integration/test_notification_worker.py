@@ -0,0 +1,51 @@
+import pytest
+from app.tests.conftest import TestingSessionLocal
+from app.db.models import OutboxMessage
+from app.services import email_service as email_module
+
+
+def create_order(client, token, success=True):
+    response = client.post(
+        "/orders/create",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"success": success}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+def outbox_rows():
+    db = TestingSessionLocal()
+    try:
+        return db.query(OutboxMessage).all()
+    finally:
+        db.close()
+
+class TestNotificationWorker:
+    def test_outbox_written_with_order(self, client, admin_token):
+        order = create_order(client, admin_token)
+        rows = outbox_rows()
+        assert len(rows) == 1
+        assert rows[0].event_type == "order.succeeded"
+        assert rows[0].payload["order_id"] == order["id"]
+        assert rows[0].payload["to_email"] == "admin@test.com"
+
+    def test_delivered_message_is_removed(self, client, admin_token, monkeypatch, drain_outbox):
+        monkeypatch.setattr(email_module.EmailService, "send_success_email", lambda *args: None)
+        create_order(client, admin_token)
+        assert drain_outbox() == 1
+        assert outbox_rows() == []
+
+    def test_failed_delivery_is_retried_then_dead_lettered(self, client, admin_token, monkeypatch, drain_outbox):
+        def broken_smtp(*args):
+            raise Exception("relay unavailable")
+        monkeypatch.setattr(email_module.EmailService, "send_failure_email", broken_smtp)
+        create_order(client, admin_token, success=False)
+
+        assert drain_outbox(max_attempts=2, backoff_base=0) == 1
+        row = outbox_rows()[0]
+        assert (row.status, row.attempts, row.last_error) == ("pending", 1, "relay unavailable")
+
+        assert drain_outbox(max_attempts=2, backoff_base=0) == 1
+        row = outbox_rows()[0]
+        assert (row.status, row.attempts) == ("dead", 2)
+        assert drain_outbox(max_attempts=2, backoff_base=0) == 0
@@ -0,0 +1,195 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import event, func
+from app.core.cache import TTLCache
+from app.db.models import Order, OrderArchive, OrderStats
+from app.db.session import open_session
+from app.repositories import order_archive_repository, order_repository
+from app.services.order_list_cache import order_list_cache
+from app.workers.archive_orders import archive_cutoff, archive_month, archive_orders, delete_archived
+from app.workers.rebuild_order_stats import rebuild_order_stats
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user, TestingSessionLocal, TestingAsyncSessionLocal, async_engine
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+# Two orders each in January and May (archived with three months kept), three in October
+CREATED_AT = [
+    datetime(2026, 1, 5, 8, 0, 0), datetime(2026, 1, 20, 9, 30, 0),
+    datetime(2026, 5, 2, 10, 0, 0), datetime(2026, 5, 2, 10, 0, 0),
+    datetime(2026, 10, 1, 0, 0, 0), datetime(2026, 10, 10, 14, 0, 0), datetime(2026, 10, 18, 11, 0, 0),
+]
+
+def session_scope():
+    return open_session(TestingSessionLocal, TestingAsyncSessionLocal)
+
+def create_dated_orders(client, admin_token, user_token):
+    """Orders alternating between the two users, backdated to CREATED_AT, with rebuilt rollups"""
+    ids = []
+    for index, created_at in enumerate(CREATED_AT):
+        token = admin_token if index % 2 else user_token
+        response = client.post("/orders/create", headers={"Authorization": f"Bearer {token}"},
+                               json={"success": index % 3 != 0})
+        ids.append(response.json()["id"])
+    db = TestingSessionLocal()
+    try:
+        for order_id, created_at in zip(ids, CREATED_AT):
+            db.query(Order).filter(Order.id == order_id).update({"created_at": created_at})
+        db.commit()
+    finally:
+        db.close()
+    asyncio.run(rebuild_order_stats(session_scope))
+    order_list_cache.clear()
+    return ids
+
+def list_all(client, token, page_size: int, **params) -> list[dict]:
+    orders, cursor = [], None
+    while True:
+        query = {"limit": page_size, **params, **({"cursor": cursor} if cursor else {})}
+        data = client.get("/orders/", headers={"Authorization": f"Bearer {token}"}, params=query).json()
+        orders.extend(data["orders"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            return orders
+
+def table_count(model) -> int:
+    db = TestingSessionLocal()
+    try:
+        return db.query(func.count()).select_from(model).scalar()
+    finally:
+        db.close()
+
+def export(client, token, **params) -> list[dict]:
+    response = client.get("/orders/export", headers={"Authorization": f"Bearer {token}"}, params=params)
+    return response.text.splitlines()
+
+class TestOrderArchive:
+    def test_cutoff_keeps_whole_months(self):
+        assert archive_cutoff(NOW, 3) == datetime(2026, 7, 1)
+        assert archive_cutoff(datetime(2026, 2, 28, 23, 59), 2) == datetime(2025, 12, 1)
+        assert archive_cutoff(NOW, 0) == datetime(2026, 10, 1)
+
+    def test_listings_span_archived_months(self, client, admin_token, user_token, regular_user, tmp_path):
+        create_dated_orders(client, admin_token, user_token)
+        everything = list_all(client, admin_token, 50)
+        own = list_all(client, user_token, 50)
+
+        archived = asyncio.run(archive_orders(session_scope, str(tmp_path), months=3, now=NOW))
+        assert archived == 4
+        assert table_count(Order) == 3
+        assert table_count(OrderArchive) == 2
+        assert len(list(tmp_path.glob("orders-2026-01-*.csv.gz"))) == 1
+        order_list_cache.clear()
+
+        assert list_all(client, admin_token, 50) == everything
+        for page_size in (1, 2, 3):
+            assert list_all(client, admin_token, page_size) == everything
+        assert list_all(client, user_token, 2) == own
+        assert list_all(client, admin_token, 2, success=False) == [o for o in everything if not o["success"]]
+        assert list_all(client, admin_token, 1, user_id=regular_user.id) == own
+
+        may = list_all(client, admin_token, 1, created_from="2026-05-01T00:00:00Z", created_to="2026-06-01T00:00:00Z")
+        assert [o["created_at"][:19] for o in may] == ["2026-05-02T10:00:00"] * 2
+        assert may == [o for o in everything if o["created_at"].startswith("2026-05")]
+
+    def test_archiving_keeps_stats(self, client, admin_token, user_token, tmp_path):
+        create_dated_orders(client, admin_token, user_token)
+        def stats():
+            return client.get("/orders/stats", headers={"Authorization": f"Bearer {admin_token}"},
+                              params={"created_from": "2026-01-01T00:00:00Z"}).json()
+        before = stats()
+        assert before["total"] == len(CREATED_AT)
+
+        asyncio.run(archive_orders(session_scope, str(tmp_path), months=3, now=NOW))
+        assert stats() == before
+        # A rebuild only recounts the hours after the archive boundary
+        rollups = table_count(OrderStats)
+        asyncio.run(rebuild_order_stats(session_scope))
+        assert table_count(OrderStats) == rollups
+        assert stats() == before
+
+    def test_late_orders_are_archived_as_another_file(self, client, admin_token, user_token, tmp_path):
+        ids = create_dated_orders(client, admin_token, user_token)
+        asyncio.run(archive_orders(session_scope, str(tmp_path), months=3, now=NOW))
+        everything = list_all(client, admin_token, 50)
+
+        # An order landing in January after it was archived is listed in place until the next run
+        db = TestingSessionLocal()
+        try:
+            db.query(Order).filter(Order.id == ids[-1]).update({"created_at": datetime(2026, 1, 10)})
+            db.commit()
+        finally:
+            db.close()
+        order_list_cache.clear()
+        moved = [o for o in everything if o["id"] == ids[-1]][0]
+        moved["created_at"] = "2026-01-10T00:00:00" + moved["created_at"][19:]
+        expected = sorted(everything, key=lambda o: (o["created_at"], o["id"]), reverse=True)
+        assert list_all(client, admin_token, 2) == expected
+
+        assert asyncio.run(archive_orders(session_scope, str(tmp_path), months=3, now=NOW)) == 1
+        assert len(list(tmp_path.glob("orders-2026-01-*.csv.gz"))) == 2
+        order_list_cache.clear()
+        assert list_all(client, admin_token, 2) == expected
+
+    def test_months_without_matching_orders_are_not_opened(self, client, admin_token, user_token, regular_user,
+                                                          tmp_path, monkeypatch):
+        create_dated_orders(client, admin_token, user_token)
+        asyncio.run(archive_orders(session_scope, str(tmp_path), months=3, now=NOW))
+        opened = []
+
+        def recording(read):
+            def wrapper(path, *args, **kwargs):
+                opened.append(path.rsplit("orders-", 1)[1][:7])
+                return read(path, *args, **kwargs)
+            return wrapper
+        monkeypatch.setattr(order_repository, "read_archive", recording(order_repository.read_archive))
+        monkeypatch.setattr(order_repository, "iter_archive", recording(order_repository.iter_archive))
+
+        # A user with no archived orders
+        assert list_all(client, admin_token, 50, user_id=regular_user.id + 100) == []
+        assert export(client, admin_token, user_id=regular_user.id + 100) == []
+        assert opened == []
+
+        # The user's only successful archived order is in May; January is skipped
+        own = list_all(client, user_token, 50, success=True)
+        assert [o["created_at"][:7] for o in own] == ["2026-10", "2026-05"]
+        assert len(export(client, admin_token, user_id=regular_user.id, success=True)) == 2
+        assert opened == ["2026-05", "2026-05"]
+
+    def test_rows_awaiting_deletion_are_listed_once(self, client, admin_token, user_token, tmp_path):
+        create_dated_orders(client, admin_token, user_token)
+        everything = list_all(client, admin_token, 50)
+        exported = export(client, admin_token)
+
+        # Catalogued, but still in the table while the archiver lets processes re-read the catalogue
+        archived = asyncio.run(archive_month(session_scope, str(tmp_path), datetime(2026, 1, 1)))
+        assert len(archived) == 2 and table_count(Order) == len(CREATED_AT)
+        order_list_cache.clear()
+        for page_size in (1, 3, 50):
+            assert list_all(client, admin_token, page_size) == everything
+        assert export(client, admin_token) == exported
+
+        asyncio.run(delete_archived(session_scope, archived))
+        order_list_cache.clear()
+        assert list_all(client, admin_token, 50) == everything
+        assert export(client, admin_token) == exported
+
+    def test_pages_after_the_archived_months_query_no_archive_tables(self, client, admin_token, user_token,
+                                                                    tmp_path, monkeypatch):
+        create_dated_orders(client, admin_token, user_token)
+        asyncio.run(archive_orders(session_scope, str(tmp_path), months=3, now=NOW))
+        monkeypatch.setattr(order_archive_repository, "archive_catalogue", TTLCache("order_archives", 8, 60))
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+        try:
+            assert len(list_all(client, user_token, 50)) == 4
+            assert any("order_archives" in statement for statement in statements)
+
+            statements.clear()
+            recent = list_all(client, user_token, 50, created_from="2026-07-01T00:00:00Z")
+            assert [o["created_at"][:7] for o in recent] == ["2026-10", "2026-10"]
+            assert statements and not any("order_archives" in statement or "order_stats" in statement
+                                          for statement in statements)
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,95 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+from app.core.config import settings
+from app.db.models import Order
+from app.db.session import open_session
+from app.workers.archive_orders import archive_orders
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user, TestingSessionLocal, TestingAsyncSessionLocal
+
+
+def create_orders(client, token, *outcomes):
+    for success in outcomes:
+        response = client.post("/orders/create", headers={"Authorization": f"Bearer {token}"}, json={"success": success})
+        assert response.status_code == 200
+
+def export(client, token, **params):
+    return client.get("/orders/export", headers={"Authorization": f"Bearer {token}"}, params=params)
+
+def raw_export(client, token, **params) -> tuple[dict, bytes]:
+    """Headers and the body as sent, before any Content-Encoding is undone"""
+    with client.stream("GET", "/orders/export", headers={"Authorization": f"Bearer {token}"}, params=params) as response:
+        return response.headers, b"".join(response.iter_raw())
+
+def listing(client, token, **params) -> list[dict]:
+    response = client.get("/orders/", headers={"Authorization": f"Bearer {token}"}, params={"limit": 500, **params})
+    return response.json()["orders"]
+
+def ndjson(content: bytes) -> list[dict]:
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+class TestOrderExport:
+    def test_ndjson_matches_listing(self, client, admin_token, user_token, monkeypatch):
+        monkeypatch.setattr(settings, "ORDER_EXPORT_BATCH_SIZE", 2)
+        create_orders(client, admin_token, True, False, True)
+        create_orders(client, user_token, True, False)
+        response = export(client, admin_token)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["content-disposition"] == 'attachment; filename="orders.ndjson"'
+        assert ndjson(response.content) == listing(client, admin_token)
+
+        filtered = export(client, admin_token, success=False)
+        assert ndjson(filtered.content) == listing(client, admin_token, success=False)
+
+    def test_csv_export(self, client, admin_token, user_token, regular_user):
+        create_orders(client, admin_token, True)
+        create_orders(client, user_token, True, False)
+        response = export(client, admin_token, format="csv", user_id=regular_user.id)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/csv; charset=utf-8"
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        expected = listing(client, admin_token, user_id=regular_user.id)
+        assert [row["id"] for row in rows] == [str(order["id"]) for order in expected]
+        assert [row["success"] for row in rows] == ["false", "true"]
+        assert [row["created_at"] for row in rows] == [order["created_at"] for order in expected]
+
+    def test_gzip_export(self, client, admin_token):
+        create_orders(client, admin_token, True, False)
+        plain = export(client, admin_token, format="csv").content
+        headers, raw = raw_export(client, admin_token, format="csv", gzip=True)
+        assert headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == plain
+
+    def test_empty_export(self, client, admin_token):
+        assert export(client, admin_token).content == b""
+        assert export(client, admin_token, format="csv").text == "id,user_id,success,created_at\r\n"
+        assert gzip.decompress(raw_export(client, admin_token, gzip=True)[1]) == b""
+
+    def test_includes_archived_orders(self, client, admin_token, tmp_path):
+        create_orders(client, admin_token, True, False, True)
+        db = TestingSessionLocal()
+        try:
+            oldest = db.query(Order).order_by(Order.id).first()
+            oldest.created_at = datetime(2020, 3, 1, 12, 0, 0)
+            db.commit()
+        finally:
+            db.close()
+        everything = listing(client, admin_token)
+        archived = asyncio.run(archive_orders(lambda: open_session(TestingSessionLocal, TestingAsyncSessionLocal),
+                                              str(tmp_path), months=3))
+        assert archived == 1
+        assert ndjson(export(client, admin_token).content) == everything
+        assert ndjson(export(client, admin_token, created_to="2021-01-01T00:00:00Z").content) == everything[-1:]
+
+    def test_sync_sessions_stream_too(self, client, admin_token, monkeypatch):
+        create_orders(client, admin_token, True, False, True)
+        monkeypatch.setattr(settings, "DB_ASYNC", False)
+        monkeypatch.setattr(settings, "ORDER_EXPORT_BATCH_SIZE", 2)
+        assert ndjson(export(client, admin_token).content) == listing(client, admin_token)
+
+    def test_export_requires_admin(self, client, user_token):
+        assert export(client, user_token).status_code == 403
@@ -1,5 +1,9 @@
+import base64
+import json
+from datetime import timedelta, timezone
 import pytest
 from fastapi.testclient import TestClient
+from app.utils.pagination import decode_cursor
 from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user
 
 
@@ -36,8 +40,8 @@ class TestOrderFlow:
         assert "user_id" in data
         assert "created_at" in data
 
-    def test_background_email_task_invoked_on_success(self, client, admin_token, monkeypatch):
-        # Arrange: monkeypatch EmailService to capture background task invocation
+    def test_success_email_delivered_by_worker(self, client, admin_token, monkeypatch, drain_outbox):
+        # Arrange: monkeypatch EmailService to capture the worker's delivery
         from app.services import email_service as email_module
         success_recorder = DummyCallRecorder()
         failure_recorder = DummyCallRecorder()
@@ -52,14 +56,15 @@ class TestOrderFlow:
         )
         assert response.status_code == 200
 
-        # BackgroundTasks in TestClient execute after response by Starlette's TestClient
-        # Validate that our recorder was scheduled and executed
+        # Nothing is sent in-process; the notification waits in the outbox
+        assert len(success_recorder.calls) == 0
+        assert drain_outbox() == 1
         assert len(success_recorder.calls) == 1
         # First arg is the email string
         assert isinstance(success_recorder.calls[0][0][0], str)
         assert len(failure_recorder.calls) == 0
 
-    def test_background_email_task_invoked_on_failure(self, client, admin_token, monkeypatch):
+    def test_failure_email_delivered_by_worker(self, client, admin_token, monkeypatch, drain_outbox):
         from app.services import email_service as email_module
         success_recorder = DummyCallRecorder()
         failure_recorder = DummyCallRecorder()
@@ -73,6 +78,7 @@ class TestOrderFlow:
         )
         assert response.status_code == 200
 
+        assert drain_outbox() == 1
         assert len(failure_recorder.calls) == 1
         assert isinstance(failure_recorder.calls[0][0][0], str)
         assert len(success_recorder.calls) == 0
@@ -115,3 +121,90 @@ class TestOrderFlow:
         assert response.status_code == 200
         data = response.json()
         assert data["success"] == False
+
+    def test_get_orders_keyset_pagination(self, client, admin_token, monkeypatch):
+        from app.services import email_service as email_module
+        monkeypatch.setattr(email_module.EmailService, "send_success_email", DummyCallRecorder())
+        monkeypatch.setattr(email_module.EmailService, "send_failure_email", DummyCallRecorder())
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        for success in (True, False, True, True, False):
+            client.post("/orders/create", headers=headers, json={"success": success})
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = client.get("/orders/", headers=headers, params=params).json()
+            assert len(data["orders"]) <= 2
+            seen.extend(order["id"] for order in data["orders"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        assert len(seen) == 5
+        assert seen == sorted(seen, reverse=True)
+
+        response = client.get("/orders/", headers=headers, params={"success": False})
+        assert [order["success"] for order in response.json()["orders"]] == [False, False]
+
+    def test_get_orders_invalid_cursor(self, client, admin_token):
+        response = client.get(
+            "/orders/",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+
+    def test_get_orders_cursor_with_utc_offset(self, client, admin_token):
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        for success in (True, False, True):
+            client.post("/orders/create", headers=headers, json={"success": success})
+        params = {"limit": 2, "created_to": "2999-01-01T00:00:00Z"}
+        first = client.get("/orders/", headers=headers, params=params).json()
+        expected = client.get("/orders/", headers=headers, params={**params, "cursor": first["next_cursor"]}).json()
+
+        # The same position, written in +05:00
+        created_at, order_id = decode_cursor(first["next_cursor"])
+        local = created_at.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=5)))
+        raw = json.dumps([local.isoformat(), order_id]).encode()
+        cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+        response = client.get("/orders/", headers=headers, params={**params, "cursor": cursor})
+        assert response.status_code == 200
+        assert response.json() == expected
+
+    def test_get_orders_user_cannot_filter_other_users(self, client, user_token):
+        response = client.get(
+            "/orders/",
+            headers={"Authorization": f"Bearer {user_token}"},
+            params={"user_id": 999}
+        )
+        assert response.status_code == 403
+
+    def test_create_orders_batch(self, client, admin_token, monkeypatch, drain_outbox):
+        from app.services import email_service as email_module
+        summary_recorder = DummyCallRecorder()
+        monkeypatch.setattr(email_module.EmailService, "send_batch_summary_email", summary_recorder)
+
+        response = client.post(
+            "/orders/batch",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"orders": [{"success": True}, {"success": False}, {"success": True}]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["index"] for item in data["results"]] == [0, 1, 2]
+        assert [item["order"]["success"] for item in data["results"]] == [True, False, True]
+        assert (data["succeeded"], data["failed"]) == (2, 1)
+
+        # One aggregate notification for the whole batch
+        assert drain_outbox() == 1
+        assert summary_recorder.calls[0][0][2:4] == (2, 1)
+
+    def test_create_orders_batch_rejects_empty_batch(self, client, admin_token):
+        response = client.post(
+            "/orders/batch",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"orders": []}
+        )
+        assert response.status_code == 422
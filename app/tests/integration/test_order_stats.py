@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime
+from app.db.models import OrderStats
+from app.workers.rebuild_order_stats import rebuild_order_stats
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user, TestingSessionLocal, TestingAsyncSessionLocal
+from app.db.session import open_session
+
+
+def create_orders(client, token, *outcomes):
+    for success in outcomes:
+        response = client.post("/orders/create", headers={"Authorization": f"Bearer {token}"}, json={"success": success})
+        assert response.status_code == 200
+
+class TestOrderStats:
+    def test_stats_follow_order_creation(self, client, admin_token, user_token, admin_user, regular_user):
+        create_orders(client, admin_token, True, False)
+        create_orders(client, user_token, True, True)
+        response = client.post(
+            "/orders/batch",
+            headers={"Authorization": f"Bearer {user_token}"},
+            json={"orders": [{"success": True}, {"success": False}, {"success": False}]}
+        )
+        assert response.status_code == 200
+
+        response = client.get("/orders/stats", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["total"], data["succeeded"], data["failed"]) == (7, 4, 3)
+        assert data["success_rate"] == 4 / 7
+        assert sum(bucket["total"] for bucket in data["hourly"]) == 7
+        assert all(bucket["bucket_start"].endswith(":00:00") for bucket in data["hourly"])
+        users = {row["user_id"]: row for row in data["users"]}
+        assert (users[admin_user.id]["succeeded"], users[admin_user.id]["failed"]) == (1, 1)
+        assert (users[regular_user.id]["succeeded"], users[regular_user.id]["failed"]) == (3, 2)
+
+        response = client.get(f"/orders/stats?user_id={regular_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.json()["total"] == 5
+
+    def test_stats_require_admin(self, client, user_token):
+        response = client.get("/orders/stats", headers={"Authorization": f"Bearer {user_token}"})
+        assert response.status_code == 403
+
+    def test_empty_range_has_no_success_rate(self, client, admin_token):
+        response = client.get("/orders/stats?created_to=2000-01-01T00:00:00Z", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.json() == {"total": 0, "succeeded": 0, "failed": 0, "success_rate": None,
+                                   "created_from": "1999-12-25T00:00:00", "hourly": [], "users": [],
+                                   "next_users_after": None}
+
+    def test_default_window_and_user_pages(self, client, admin_token, user_token, admin_user, regular_user):
+        create_orders(client, admin_token, True)
+        create_orders(client, user_token, False)
+        db = TestingSessionLocal()
+        try:
+            old = OrderStats(user_id=regular_user.id, bucket_start=datetime(2020, 1, 1, 0, 0, 0),
+                             total=5, succeeded=5, failed=0)
+            db.add(old)
+            db.commit()
+        finally:
+            db.close()
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        # Hours older than the default window are not counted
+        first = client.get("/orders/stats?users_limit=1", headers=headers).json()
+        assert first["total"] == 2
+        assert [row["user_id"] for row in first["users"]] == [admin_user.id]
+        assert first["next_users_after"] == admin_user.id
+        second = client.get(f"/orders/stats?users_limit=1&users_after={admin_user.id}", headers=headers).json()
+        assert [row["user_id"] for row in second["users"]] == [regular_user.id]
+        assert second["next_users_after"] is None
+
+        everything = client.get("/orders/stats?created_from=2019-01-01T00:00:00Z", headers=headers).json()
+        assert everything["total"] == 7
+        assert everything["created_from"] == "2019-01-01T00:00:00"
+
+    def test_rebuild_matches_incremental_rollup(self, client, admin_token, user_token):
+        create_orders(client, admin_token, True, True, False)
+        create_orders(client, user_token, False)
+
+        def snapshot():
+            db = TestingSessionLocal()
+            try:
+                return sorted(
+                    (row.user_id, row.bucket_start, row.total, row.succeeded, row.failed)
+                    for row in db.query(OrderStats).all()
+                )
+            finally:
+                db.close()
+
+        incremental = snapshot()
+        db = TestingSessionLocal()
+        try:
+            db.query(OrderStats).delete()
+            db.commit()
+        finally:
+            db.close()
+
+        rows = asyncio.run(rebuild_order_stats(lambda: open_session(TestingSessionLocal, TestingAsyncSessionLocal)))
+        assert rows == len(incremental)
+        assert snapshot() == incremental
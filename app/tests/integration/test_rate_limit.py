@@ -0,0 +1,46 @@
+import pytest
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import RateLimitRule
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user
+
+
+@pytest.fixture
+def limits_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_REQUESTS", 5)
+    monkeypatch.setattr(settings, "RATE_LIMIT_WINDOW", 60)
+
+class TestRateLimit:
+    def test_login_limited_after_default_burst(self, client, admin_user, limits_enabled):
+        credentials = {"username": "admin", "password": "Admin123"}
+        for _ in range(5):
+            assert client.post("/auth/login", json=credentials).status_code == 200
+
+        response = client.post("/auth/login", json=credentials)
+        assert response.status_code == 429
+        assert response.json()["detail"] == "Rate limit exceeded"
+        assert 1 <= int(response.headers["Retry-After"]) <= 12
+
+    def test_buckets_are_per_user_and_per_route(self, client, admin_token, user_token, limits_enabled):
+        for _ in range(5):
+            assert client.get("/orders/", headers={"Authorization": f"Bearer {admin_token}"}).status_code == 200
+        assert client.get("/orders/", headers={"Authorization": f"Bearer {admin_token}"}).status_code == 429
+
+        # Another user, and another route for the same user, are unaffected
+        assert client.get("/orders/", headers={"Authorization": f"Bearer {user_token}"}).status_code == 200
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {admin_token}"}).status_code == 200
+
+    def test_route_override(self, client, admin_token, limits_enabled, monkeypatch):
+        monkeypatch.setitem(rate_limit.ROUTE_RULES, "POST /orders/create", RateLimitRule(1, 60))
+        monkeypatch.setitem(rate_limit.ROUTE_RULES, "GET /orders/", RateLimitRule(0, 60))
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        assert client.post("/orders/create", headers=headers, json={"success": True}).status_code == 200
+        assert client.post("/orders/create", headers=headers, json={"success": True}).status_code == 429
+        for _ in range(10):
+            assert client.get("/orders/", headers=headers).status_code == 200
+
+    def test_health_is_not_limited(self, client, limits_enabled):
+        for _ in range(10):
+            assert client.get("/health").status_code == 200
@@ -0,0 +1,65 @@
+import sqlite3
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.db.session import SessionRouter, create_db_engine, create_async_db_engine, session_router
+from app.tests.conftest import client, admin_token, admin_user
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """A replica whose contents only change when replicate() is called"""
+    path = tmp_path / "replica.db"
+    url = f"sqlite:///{path}"
+    engine = create_db_engine(url, read_only=True)
+    async_engine = create_async_db_engine(url, read_only=True, poolclass=NullPool)
+    router = SessionRouter(
+        [(sessionmaker(bind=engine), async_sessionmaker(async_engine, expire_on_commit=False))],
+        sticky_seconds=60,
+        shared_path=str(tmp_path / "recent_writes.db")
+    )
+    for name in ("replicas", "sticky_seconds", "_recent_writers", "_shared"):
+        monkeypatch.setattr(session_router, name, getattr(router, name))
+
+    def replicate():
+        source, target = sqlite3.connect("./test.db"), sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+    yield replicate
+    router._shared.close()
+    engine.dispose()
+
+def list_order_ids(client, token):
+    response = client.get("/orders/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    return [order["id"] for order in response.json()["orders"]]
+
+class TestReadReplicas:
+    def test_reads_go_to_replica_except_right_after_a_write(self, client, admin_token, replica):
+        replica()
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        order_id = client.post("/orders/create", headers=headers, json={"success": True}).json()["id"]
+
+        # The writer reads its own order from the primary...
+        assert list_order_ids(client, admin_token) == [order_id]
+
+        # ...even when another worker, which never saw the write, serves the read...
+        session_router._recent_writers.clear()
+        assert list_order_ids(client, admin_token) == [order_id]
+
+        # ...other reads use the replica, which has not caught up yet
+        session_router.reset()
+        assert list_order_ids(client, admin_token) == []
+
+        replica()
+        assert list_order_ids(client, admin_token) == [order_id]
+
+    def test_current_user_loaded_from_replica(self, client, admin_token, replica):
+        from app.services.principal_cache import principal_cache
+        replica()
+        principal_cache.clear()
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.json()["username"] == "admin"
@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+import pytest
+from sqlalchemy.pool import NullPool
+from app.db.sharding import ShardMap, ShardRouter, migrate_shards, order_ids, shard_router
+from app.services.idempotency import idempotency_store
+from app.workers.rebalance_shards import move_bucket
+from app.tests.conftest import client, admin_token, user_token, admin_user, regular_user, engine
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    """Two shard databases; admin (id 1) lands on shard 1, user1 (id 2) on shard 0"""
+    paths = [tmp_path / f"orders-{shard}.db" for shard in range(2)]
+    shard_map = ShardMap([f"sqlite:///{path}" for path in paths], buckets=16)
+    migrate_shards(shard_map)
+    shard_map.save(str(tmp_path / "shards.json"))
+    router = ShardRouter(str(tmp_path / "shards.json"), check_interval=0, poolclass=NullPool)
+    for name, value in vars(router).items():
+        monkeypatch.setattr(shard_router, name, value)
+    monkeypatch.setattr(order_ids, "engine", engine)
+    order_ids.reset()
+    yield paths
+    asyncio.run(shard_router.dispose())
+    order_ids.reset()
+
+def order_ids_on(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT id FROM orders")}
+
+def create_order(client, token, success=True):
+    response = client.post("/orders/create", headers={"Authorization": f"Bearer {token}"}, json={"success": success})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def idempotency_keys_on(path):
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT key FROM idempotency_keys")}
+
+def list_orders(client, token, query=""):
+    response = client.get(f"/orders/{query}", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    return response.json()
+
+class TestSharding:
+    def test_orders_are_written_to_the_owning_shard(self, client, admin_token, user_token, shards):
+        admin_orders = [create_order(client, admin_token) for _ in range(2)]
+        response = client.post("/orders/batch", headers={"Authorization": f"Bearer {user_token}"},
+                               json={"orders": [{"success": True}, {"success": False}]})
+        assert response.status_code == 200
+        user_orders = [result["order"]["id"] for result in response.json()["results"]]
+
+        assert order_ids_on(shards[1]) == set(admin_orders)
+        assert order_ids_on(shards[0]) == set(user_orders)
+        assert order_ids_on("./test.db") == set()
+        assert [order["id"] for order in list_orders(client, user_token)["orders"]] == sorted(user_orders, reverse=True)
+
+    def test_admin_listing_merges_shards_in_order(self, client, admin_token, user_token, shards):
+        created = [create_order(client, token) for token in (admin_token, user_token) * 3]
+        assert len(set(created)) == 6
+
+        first = list_orders(client, admin_token, "?limit=4")
+        second = list_orders(client, admin_token, f"?limit=4&cursor={first['next_cursor']}")
+        pages = first["orders"] + second["orders"]
+        assert second["next_cursor"] is None
+        assert [order["id"] for order in pages] == sorted(created, reverse=True)
+        keys = [(order["created_at"], order["id"]) for order in pages]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_stats_are_summed_across_shards(self, client, admin_token, user_token, admin_user, regular_user, shards):
+        create_order(client, admin_token, True)
+        create_order(client, user_token, False)
+        create_order(client, user_token, True)
+        data = client.get("/orders/stats", headers={"Authorization": f"Bearer {admin_token}"}).json()
+        assert (data["total"], data["succeeded"], data["failed"]) == (3, 2, 1)
+        assert sum(bucket["total"] for bucket in data["hourly"]) == 3
+        assert {row["user_id"]: row["total"] for row in data["users"]} == {admin_user.id: 1, regular_user.id: 2}
+
+    def test_moving_a_bucket_keeps_the_users_orders(self, client, admin_token, user_token, admin_user, regular_user, shards):
+        user_orders = {create_order(client, user_token) for _ in range(3)}
+        copied = asyncio.run(move_bucket(shard_router, regular_user.id % 16, 1, settle=0))
+
+        assert copied == 3
+        assert order_ids_on(shards[0]) == set()
+        assert order_ids_on(shards[1]) == user_orders
+        user_orders.add(create_order(client, user_token))
+        assert order_ids_on(shards[1]) == user_orders
+        assert {order["id"] for order in list_orders(client, user_token)["orders"]} == user_orders
+        data = client.get(f"/orders/stats?user_id={regular_user.id}", headers={"Authorization": f"Bearer {admin_token}"}).json()
+        assert data["total"] == 4
+
+    def test_retrying_a_key_after_a_move_replays_the_order(self, client, user_token, regular_user, shards):
+        headers = {"Authorization": f"Bearer {user_token}", "Idempotency-Key": "move-retry"}
+        first = client.post("/orders/create", headers=headers, json={"success": True})
+        assert first.status_code == 200
+        asyncio.run(move_bucket(shard_router, regular_user.id % 16, 1, settle=0))
+        assert idempotency_keys_on(shards[0]) == set()
+        assert idempotency_keys_on(shards[1]) == {"move-retry"}
+
+        # Another process, which never saw the first request, serves the retry
+        idempotency_store.clear()
+        retry = client.post("/orders/create", headers=headers, json={"success": True})
+        assert retry.status_code == 200
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.json() == first.json()
+        assert order_ids_on(shards[1]) == {first.json()["id"]}
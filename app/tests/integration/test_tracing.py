@@ -0,0 +1,60 @@
+import pytest
+from app.core import tracing
+from app.tests.conftest import client, admin_token, admin_user
+
+
+class SpanCollector:
+    def __init__(self):
+        self.spans = []
+    def submit(self, span):
+        self.spans.append(span)
+
+@pytest.fixture
+def collected_spans(monkeypatch):
+    collector = SpanCollector()
+    monkeypatch.setattr(tracing, "_exporter", collector)
+    return collector.spans
+
+class TestTracing:
+    def test_create_order_spans_cover_every_stage(self, client, admin_token, collected_spans):
+        response = client.post(
+            "/orders/create",
+            headers={"Authorization": f"Bearer {admin_token}"},
+            json={"success": True}
+        )
+        assert response.status_code == 200
+
+        root = [s for s in collected_spans if s.stage == "request"][-1]
+        assert root.name == "POST /orders/create"
+        assert root.attributes["http.status_code"] == 200
+        trace = [s for s in collected_spans if s.trace_id == root.trace_id]
+        by_id = {s.span_id: s for s in trace}
+        assert {"request", "route", "auth", "service", "db", "serialization"} <= {s.stage for s in trace}
+
+        # Statements run by the service are its children, not the route's
+        insert = next(s for s in trace if s.stage == "db" and s.name == "INSERT")
+        assert by_id[insert.parent_id].stage == "service"
+        route = next(s for s in trace if s.stage == "route")
+        assert route.parent_id == root.span_id
+        assert route.name == "POST /orders/create"
+        assert all(s.duration_ns <= root.duration_ns for s in trace)
+
+    def test_incoming_traceparent_is_continued(self, client, collected_spans):
+        trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+        client.get("/health", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+        root = [s for s in collected_spans if s.stage == "request"][-1]
+        assert root.trace_id == trace_id
+        assert root.parent_id == parent_id
+
+    def test_unmatched_path_uses_fixed_name(self, client, collected_spans):
+        client.get("/no/such/path/12345")
+        root = [s for s in collected_spans if s.stage == "request"][-1]
+        assert root.name == "GET <unmatched>"
+
+    def test_unknown_methods_share_one_name(self, client, collected_spans):
+        for method in ("X0SCAN", "X1SCAN"):
+            client.request(method, "/no/such/path")
+        roots = [s for s in collected_spans if s.stage == "request"][-2:]
+        assert {s.name for s in roots} == {"OTHER <unmatched>"}
+        assert {s.attributes["http.method"] for s in roots} == {"OTHER"}
@@ -0,0 +1,248 @@
+"""Load-test harness: a real uvicorn server driven by concurrent httpx clients.
+
+LoadServer starts the app in a uvicorn subprocess against a throwaway SQLite
+database prepared by init_db.py (migrations plus the admin user). run_load
+keeps `concurrency` clients issuing requests back to back for a fixed
+duration and summarize() reduces what they saw to throughput and latency
+percentiles. Results are stored as JSON baselines and compare() reports
+every metric that got worse than a baseline by more than a threshold.
+"""
+import asyncio
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+ADMIN = {"username": "admin", "password": "Admin123"}
+
+# Metrics compared against a baseline; True means higher is better
+METRICS = {
+    "rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+
+class LoadServer:
+    """uvicorn serving app.main:app on a free local port, for use as a context manager"""
+
+    def __init__(self, workers: int = 1, env: dict = None, startup_timeout: float = 30):
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self.workdir = tempfile.mkdtemp(prefix="loadtest-")
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(self.workdir, 'load.db')}",
+            "RATE_LIMIT_ENABLED": "False",
+            "RATE_LIMIT_SQLITE_PATH": os.path.join(self.workdir, "rate_limits.db"),
+            "LOG_FILE": os.path.join(self.workdir, "app.log"),
+            "LOG_LEVEL": "WARNING",
+            **(env or {}),
+        }
+        self.process = None
+
+    def start(self):
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "init_db.py")],
+            cwd=ROOT, env=self.env, check=True, stdout=subprocess.DEVNULL
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--workers", str(self.workers), "--no-access-log", "--log-level", "warning"],
+            cwd=ROOT, env=self.env, start_new_session=True
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.base_url}/health", timeout=1).status_code == 200:
+                    return self
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"uvicorn did not become healthy within {self.startup_timeout}s")
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        # uvicorn workers and password hashing processes share its session
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@dataclass
+class Context:
+    """State shared by a scenario's requests: an admin token and seeded orders"""
+    token: str
+    headers: dict = field(default_factory=dict)
+
+async def prepare(client: httpx.AsyncClient, seed_orders: int = 200) -> Context:
+    response = await client.post("/auth/login", json=ADMIN)
+    response.raise_for_status()
+    token = response.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for offset in range(0, seed_orders, 100):
+        batch = [{"success": i % 10 != 0} for i in range(min(100, seed_orders - offset))]
+        (await client.post("/orders/batch", json={"orders": batch}, headers=headers)).raise_for_status()
+    return Context(token, headers)
+
+async def login(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.post("/auth/login", json=ADMIN)
+
+async def create_order(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.post("/orders/create", json={"success": True}, headers=ctx.headers)
+
+async def list_orders(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get("/orders/", params={"limit": 50}, headers=ctx.headers)
+
+async def me(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    return await client.get("/auth/me", headers=ctx.headers)
+
+MIXED = [(list_orders, 60), (create_order, 25), (me, 10), (login, 5)]
+
+async def mixed(client: httpx.AsyncClient, ctx: Context) -> httpx.Response:
+    request = random.choices([request for request, _ in MIXED], weights=[weight for _, weight in MIXED])[0]
+    return await request(client, ctx)
+
+SCENARIOS = {
+    "login": login,
+    "create_order": create_order,
+    "list_orders": list_orders,
+    "mixed": mixed,
+}
+
+async def run_load(base_url: str, scenario: str, concurrency: int, duration: float, warmup: float = 1.0) -> dict:
+    """Closed-loop load: each client sends its next request as soon as the last completes"""
+    request = SCENARIOS[scenario]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        ctx = await prepare(client)
+        latencies, statuses = [], {}
+        measuring = False
+        stop_at = time.monotonic() + warmup + duration
+
+        async def worker():
+            while time.monotonic() < stop_at:
+                began = time.perf_counter()
+                try:
+                    status = (await request(client, ctx)).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                if measuring:
+                    latencies.append(time.perf_counter() - began)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        await asyncio.sleep(warmup)
+        measuring = True
+        began = time.perf_counter()
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - began
+    return summarize(scenario, concurrency, latencies, statuses, elapsed)
+
+def percentile(ordered: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def summarize(scenario: str, concurrency: int, latencies: list, statuses: dict, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": len(ordered),
+        "errors": errors,
+        "error_rate": errors / len(ordered) if ordered else 0.0,
+        "rps": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+def environment() -> dict:
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def save_baseline(path: str, results: list, key=None):
+    """Merge result dicts into the baseline file, keyed by key(result) (scenario and concurrency by default).
+
+    benchmarks/microbench.py keeps its baselines in the same format.
+    """
+    key = key or baseline_key
+    baseline = load_baseline(path)
+    baseline["environment"] = environment()
+    for result in results:
+        baseline["results"][key(result)] = result
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"environment": {}, "results": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def baseline_key(result: dict) -> str:
+    return f"{result['scenario']}@{result['concurrency']}"
+
+def compare(result: dict, baseline: dict, threshold: float = 0.2, error_margin: float = 0.01) -> list[str]:
+    """Human-readable regressions of result against its baseline entry, empty if none or no baseline"""
+    previous = baseline.get("results", {}).get(baseline_key(result))
+    if previous is None:
+        return []
+    regressions = []
+    for metric, higher_is_better in METRICS.items():
+        old, new = previous[metric], result[metric]
+        if not old:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append(f"{baseline_key(result)} {metric}: {old:.2f} -> {new:.2f} ({change:+.0%})")
+    if result["error_rate"] > previous["error_rate"] + error_margin:
+        regressions.append(
+            f"{baseline_key(result)} error_rate: {previous['error_rate']:.2%} -> {result['error_rate']:.2%}"
+        )
+    return regressions
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Load test against a local uvicorn server.
+
+Runs each scenario (login, create_order, list_orders, mixed) at each
+concurrency for --duration seconds after a --warmup, and prints requests/s
+and p50/p95/p99 latency. With --baseline FILE results are compared against
+the file and the run exits with status 1 if any metric regressed by more than
+--threshold; --save writes the results into the file instead.
+
+    python -m app.tests.load.run --scenario mixed --concurrency 8 32 --duration 20
+    python -m app.tests.load.run --baseline app/tests/load/baselines/local.json --save
+    python -m app.tests.load.run --baseline app/tests/load/baselines/local.json --threshold 0.15
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from app.tests.load.harness import SCENARIOS, LoadServer, compare, load_baseline, run_load, save_baseline
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16])
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra server environment, e.g. --env BCRYPT_ROUNDS=10")
+    parser.add_argument("--baseline", help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    env = dict(item.split("=", 1) for item in args.env)
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    results, regressions = [], []
+    with LoadServer(workers=args.workers, env=env) as server:
+        for scenario in args.scenario:
+            for concurrency in args.concurrency:
+                result = asyncio.run(run_load(server.base_url, scenario, concurrency, args.duration, args.warmup))
+                results.append(result)
+                print(f"{scenario:<13} c={concurrency:<4} {result['rps']:8.1f} req/s   "
+                      f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                      f"p99 {result['p99_ms']:7.1f} ms   errors {result['errors']}/{result['requests']}")
+                if not args.save:
+                    regressions.extend(compare(result, baseline, args.threshold))
+
+    if args.save and args.baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+import os
 import pytest
 import asyncio
 import time
 from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
 from app.tests.conftest import client, admin_token
+from app.tests.load.harness import LoadServer, baseline_key, compare, load_baseline, run_load, save_baseline, summarize
 
 class TestLoadTesting:
     def test_light_concurrent_order_creation(self, client, admin_token):
@@ -22,3 +24,38 @@ class TestLoadTesting:
 
         assert all(results)
         assert len(results) == 3
+
+class TestLoadHarness:
+    def test_percentiles_and_errors(self):
+        result = summarize("list_orders", 4, [i / 1000 for i in range(1, 101)], {200: 98, 500: 1, "ReadTimeout": 1}, 2.0)
+        assert result["rps"] == 50
+        assert (result["p50_ms"], result["p95_ms"], result["p99_ms"]) == pytest.approx((50, 95, 99))
+        assert result["errors"] == 2
+
+    def test_compare_flags_only_regressions_beyond_threshold(self):
+        previous = summarize("mixed", 8, [0.010] * 100, {200: 100}, 1.0)
+        baseline = {"results": {baseline_key(previous): previous}}
+        assert compare(summarize("mixed", 8, [0.011] * 100, {200: 100}, 1.05), baseline, threshold=0.2) == []
+        regressions = compare(summarize("mixed", 8, [0.015] * 100, {200: 90, 503: 10}, 1.5), baseline, threshold=0.2)
+        assert [line.split()[1] for line in regressions] == ["rps:", "p50_ms:", "p95_ms:", "p99_ms:", "error_rate:"]
+        # No baseline entry for this concurrency: nothing to compare against
+        assert compare(summarize("mixed", 16, [1.0], {200: 1}, 1.0), baseline) == []
+
+    def test_baseline_round_trip(self, tmp_path):
+        path = str(tmp_path / "baseline.json")
+        result = summarize("login", 2, [0.2, 0.3], {200: 2}, 1.0)
+        save_baseline(path, [result])
+        saved = load_baseline(path)
+        assert saved["results"]["login@2"] == result
+        assert saved["environment"]["cpus"]
+
+    def test_live_server_scenarios(self):
+        """Short run of each request-level scenario against uvicorn; set LOAD_BASELINE to also gate on a baseline"""
+        baseline = load_baseline(os.environ["LOAD_BASELINE"]) if os.getenv("LOAD_BASELINE") else {}
+        with LoadServer(env={"BCRYPT_ROUNDS": "4"}) as server:
+            for scenario in ("create_order", "list_orders", "mixed"):
+                result = asyncio.run(run_load(server.base_url, scenario, concurrency=4, duration=1, warmup=0.2))
+                assert result["requests"] > 0
+                assert result["errors"] == 0, result["statuses"]
+                assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+                assert compare(result, baseline) == []
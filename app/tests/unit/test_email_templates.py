@@ -0,0 +1,25 @@
+from email import message_from_bytes, policy
+from app.core.email_templates import EmailTemplateEngine
+
+class TestEmailTemplates:
+    def render(self, **fields):
+        engine = EmailTemplateEngine("shop@test.com")
+        raw = engine.render("order_success", "user@test.com", **fields)
+        return message_from_bytes(raw, policy=policy.default)
+
+    def test_message_has_text_and_html_parts(self):
+        msg = self.render(username="alice", order_id=42, created_at="2025-10-07 05:58 UTC")
+        assert msg["To"] == "user@test.com"
+        assert msg["From"] == "shop@test.com"
+        assert msg["Subject"] == "Order Successful"
+        text = msg.get_body(preferencelist=("plain",)).get_content()
+        html = msg.get_body(preferencelist=("html",)).get_content()
+        assert "Hi alice," in text and "Order #42" in text
+        assert "Hi alice," in html and "2025-10-07 05:58 UTC" in html
+
+    def test_html_fields_are_escaped(self):
+        msg = self.render(username="<b>eve</b>", order_id=1, created_at="now")
+        html = msg.get_body(preferencelist=("html",)).get_content()
+        text = msg.get_body(preferencelist=("plain",)).get_content()
+        assert "&lt;b&gt;eve&lt;/b&gt;" in html
+        assert "<b>eve</b>" in text
@@ -0,0 +1,35 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.services.idempotency import IdempotencyStore, StoredResponse
+
+STORED = StoredResponse("fp", b'{"id":1}')
+
+class TestIdempotencyStore:
+    def test_lost_claim_replays_the_winner(self):
+        store = IdempotencyStore(maxsize=10, ttl=60)
+        lookups = iter([None, (STORED, None)])
+        async def lookup():
+            return next(lookups)
+        async def execute():
+            return None  # another process committed the key first
+        assert asyncio.run(store.run((1, "k"), "fp", lookup, execute)) == (STORED, True)
+
+    def test_followers_retry_after_a_failed_leader(self):
+        store = IdempotencyStore(maxsize=10, ttl=60)
+        executions = []
+        async def lookup():
+            return None
+        async def execute():
+            executions.append(None)
+            await asyncio.sleep(0.01)
+            if len(executions) == 1:
+                raise HTTPException(status_code=500)
+            return STORED
+        async def burst():
+            return await asyncio.gather(*(store.run((1, "k"), "fp", lookup, execute) for _ in range(3)),
+                                        return_exceptions=True)
+        results = asyncio.run(burst())
+        assert isinstance(results[0], HTTPException)
+        assert results[1:] == [(STORED, False), (STORED, True)]
+        assert len(executions) == 2
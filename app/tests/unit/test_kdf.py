@@ -0,0 +1,56 @@
+import asyncio
+import hashlib
+import pytest
+from app.core import kdf
+from app.core.config import settings
+from app.core.kdf import BcryptKDF, ScryptKDF, LegacySHA256
+from app.core.password_hasher import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.mark.parametrize("scheme", [BcryptKDF(rounds=4), ScryptKDF(n=2 ** 10)])
+def test_round_trip(scheme):
+    hashed = scheme.hash("Secret123!")
+    assert scheme.identify(hashed)
+    assert scheme.verify("Secret123!", hashed)
+    assert not scheme.verify("secret123!", hashed)
+    assert scheme.hash("Secret123!") != hashed  # salted
+
+def test_needs_rehash_on_parameter_change():
+    assert BcryptKDF(rounds=5).needs_rehash(BcryptKDF(rounds=4).hash("pw"))
+    assert not BcryptKDF(rounds=4).needs_rehash(BcryptKDF(rounds=4).hash("pw"))
+    assert ScryptKDF(n=2 ** 11).needs_rehash(ScryptKDF(n=2 ** 10).hash("pw"))
+
+def test_bcrypt_long_passwords_truncated_like_classic_bcrypt():
+    scheme = BcryptKDF(rounds=4)
+    hashed = scheme.hash("x" * 100)
+    assert scheme.verify("x" * 72 + "y", hashed)
+
+def test_legacy_sha256_verified_and_always_rehashed(monkeypatch):
+    legacy = hashlib.sha256(b"Admin123").hexdigest()
+    assert isinstance(kdf.identify(legacy), LegacySHA256)
+    assert kdf.verify_password("Admin123", legacy)
+    assert not kdf.verify_password("admin123", legacy)
+    assert kdf.needs_rehash(legacy)
+
+def test_switching_kdf_flags_existing_hashes(monkeypatch):
+    bcrypt_hash = kdf.hash_password("pw")
+    monkeypatch.setattr(settings, "PASSWORD_KDF", "scrypt")
+    assert kdf.needs_rehash(bcrypt_hash)
+    assert kdf.verify_password("pw", bcrypt_hash)
+
+def test_unknown_hash_format_never_verifies():
+    assert not kdf.verify_password("pw", "not-a-hash")
+
+def test_process_pool_hashes_with_parent_parameters():
+    hasher = PasswordHasher("process", workers=1)
+    try:
+        hashed = asyncio.run(hasher.hash("Secret123!"))
+        assert hashed.startswith(f"$2b${settings.BCRYPT_ROUNDS:02d}$")
+        assert asyncio.run(hasher.verify("Secret123!", hashed))
+    finally:
+        hasher.shutdown()
+
+def test_full_queue_rejected_immediately():
+    hasher = PasswordHasher("thread", workers=1, max_pending=0)
+    with pytest.raises(PasswordHasherBusy):
+        asyncio.run(hasher.hash("pw"))
@@ -0,0 +1,50 @@
+import json
+import logging
+import pytest
+from app.core import logger as logger_module
+from app.core.config import settings
+from app.core.logger import JsonFormatter, log_action
+
+@log_action("unit_action")
+def succeed():
+    return "ok"
+
+@log_action("unit_action")
+def fail():
+    raise ValueError("boom")
+
+def messages(caplog):
+    return [record.getMessage() for record in caplog.records if record.name == "app.core.logger"]
+
+class TestLogAction:
+    def test_completion_logged_with_duration(self, caplog):
+        with caplog.at_level(logging.INFO):
+            assert succeed() == "ok"
+        record = [r for r in caplog.records if r.getMessage().startswith("Completed unit_action")][0]
+        assert record.action == "unit_action"
+        assert record.duration_ms >= 0
+
+    def test_timings_switch_keeps_errors(self, caplog, monkeypatch):
+        monkeypatch.setattr(settings, "LOG_ACTION_TIMINGS", False)
+        with caplog.at_level(logging.DEBUG):
+            succeed()
+            with pytest.raises(ValueError):
+                fail()
+        logged = messages(caplog)
+        assert not any(m.startswith(("Starting", "Completed")) for m in logged)
+        assert any(m.startswith("Failed unit_action") for m in logged)
+
+    def test_sample_rate_zero_suppresses_timings(self, caplog, monkeypatch):
+        monkeypatch.setitem(logger_module.SAMPLE_RATES, "unit_action", 0.0)
+        with caplog.at_level(logging.INFO):
+            for _ in range(20):
+                succeed()
+        assert messages(caplog) == []
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.LogRecord("app", logging.INFO, __file__, 1, "Completed %s", ("x",), None)
+        record.action = "x"
+        entry = json.loads(JsonFormatter().format(record))
+        assert entry["message"] == "Completed x"
+        assert entry["action"] == "x"
+        assert entry["level"] == "INFO"
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app.db.migrations import run_migrations, load_migrations
+from app.db.session import create_db_engine
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    run_migrations(engine, target=1)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'u', 'u@test.com', 'x')"))
+        conn.execute(text("INSERT INTO orders (user_id, success) VALUES (1, 1)"))
+    yield engine
+    engine.dispose()
+
+class TestMigrations:
+    def test_upgrade_adds_foreign_key_and_indexes(self, legacy_engine):
+        applied = run_migrations(legacy_engine)
+        assert applied == [m.VERSION for m in load_migrations()][1:]
+
+        inspector = inspect(legacy_engine)
+        assert inspector.get_foreign_keys("orders")[0]["referred_table"] == "users"
+        indexes = {index["name"] for index in inspector.get_indexes("orders")}
+        assert {"ix_orders_user_id_created_at_id", "ix_orders_success_created_at"} <= indexes
+        with legacy_engine.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM orders")).scalar() == 1
+
+    def test_upgrade_is_idempotent(self, legacy_engine):
+        run_migrations(legacy_engine)
+        assert run_migrations(legacy_engine) == []
+
+    def test_upgrade_backfills_order_stats(self, legacy_engine):
+        run_migrations(legacy_engine)
+        with legacy_engine.connect() as conn:
+            rows = conn.execute(text("SELECT user_id, bucket_start, total, succeeded, failed FROM order_stats")).all()
+        assert len(rows) == 1
+        user_id, bucket_start, total, succeeded, failed = rows[0]
+        assert (user_id, total, succeeded, failed) == (1, 1, 1, 0)
+        assert bucket_start.endswith(":00:00")
+
+    def test_upgrade_keeps_orphaned_orders(self, tmp_path, caplog):
+        # The application's engines enforce foreign keys; the legacy schema did not have one
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'orphans.db'}", foreign_keys=True)
+        try:
+            run_migrations(engine, target=1)
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO orders (user_id, success) VALUES (42, 1)"))
+            run_migrations(engine)
+            assert "reference missing users (user_id 42)" in caplog.text
+            with engine.connect() as conn:
+                assert conn.execute(text("SELECT user_id FROM orders")).scalar() == 42
+                assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+                with pytest.raises(Exception, match="FOREIGN KEY"):
+                    conn.execute(text("INSERT INTO orders (user_id, success) VALUES (43, 1)"))
+        finally:
+            engine.dispose()
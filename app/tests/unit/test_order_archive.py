@@ -0,0 +1,42 @@
+from datetime import datetime
+import pytest
+from app.utils.order_archive import ArchiveWriter, ArchivedOrder, next_month, read_archive
+
+ROWS = [
+    ArchivedOrder(7, 2, True, datetime(2026, 3, 31, 23, 59, 59)),
+    ArchivedOrder(5, 1, False, datetime(2026, 3, 14, 12, 0, 0)),
+    ArchivedOrder(4, 2, True, datetime(2026, 3, 1, 0, 0, 0)),
+]
+
+class TestOrderArchiveFiles:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "nested" / "orders-2026-03.csv.gz")
+        writer = ArchiveWriter(path)
+        writer.write(ROWS[:1])
+        writer.write(ROWS[1:])
+        writer.commit()
+        assert writer.rows == 3
+        assert read_archive(path) == ROWS
+        assert list(tmp_path.joinpath("nested").iterdir()) == [tmp_path / "nested" / "orders-2026-03.csv.gz"]
+
+    def test_filter_and_limit(self, tmp_path):
+        path = str(tmp_path / "orders.csv.gz")
+        writer = ArchiveWriter(path)
+        writer.write(ROWS)
+        writer.commit()
+        assert read_archive(path, lambda row: row.user_id == 2) == [ROWS[0], ROWS[2]]
+        assert read_archive(path, limit=2) == ROWS[:2]
+        assert read_archive(path, limit=0) == []
+
+    def test_abort_leaves_no_file(self, tmp_path):
+        writer = ArchiveWriter(str(tmp_path / "orders.csv.gz"))
+        writer.write(ROWS)
+        writer.abort()
+        assert list(tmp_path.iterdir()) == []
+
+    @pytest.mark.parametrize("value, expected", [
+        (datetime(2026, 3, 14, 12, 30), datetime(2026, 4, 1)),
+        (datetime(2026, 12, 1), datetime(2027, 1, 1)),
+    ])
+    def test_next_month(self, value, expected):
+        assert next_month(value) == expected
@@ -0,0 +1,57 @@
+import asyncio
+from app.services.order_list_cache import ALL_USERS, OrderListCache
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+class TestOrderListCache:
+    def test_page_is_reused_until_its_scope_writes(self):
+        cache = OrderListCache(maxsize=10, ttl=60, max_users=10)
+        version, page = run(cache.get(1, "q"))
+        assert page is None
+        cache.put(1, "q", version, b"[]")
+        assert run(cache.get(1, "q"))[1].body == b"[]"
+
+        run(cache.record_write(2))
+        assert run(cache.get(1, "q"))[1] is not None
+        assert run(cache.get(ALL_USERS, "q"))[0] == 1
+
+        run(cache.record_write(1))
+        assert run(cache.get(1, "q"))[1] is None
+
+    def test_forgotten_users_never_look_older(self):
+        cache = OrderListCache(maxsize=10, ttl=60, max_users=2)
+        run(cache.record_write(1))
+        version, _ = run(cache.get(1, "q"))
+        cache.put(1, "q", version, b"[1]")
+        run(cache.record_write(1))
+        run(cache.record_write(2))
+        run(cache.record_write(3))
+        # User 1's version was evicted; it must not read as the cached one
+        assert run(cache.version(1)) == 2
+        assert run(cache.get(1, "q"))[1] is None
+
+    def test_writes_through_another_process_invalidate_pages(self, tmp_path):
+        path = str(tmp_path / "order_list_versions.db")
+        reader = OrderListCache(maxsize=10, ttl=60, max_users=10, shared_path=path)
+        writer = OrderListCache(maxsize=10, ttl=60, max_users=10, shared_path=path)
+        for scope in (1, ALL_USERS):
+            version, _ = run(reader.get(scope, "q"))
+            reader.put(scope, "q", version, b"[]")
+        run(writer.record_write(2))
+        assert run(reader.get(1, "q"))[1] is not None
+        assert run(reader.get(ALL_USERS, "q"))[1] is None
+
+        run(writer.record_write(1))
+        assert run(reader.get(1, "q"))[1] is None
+        reader._shared.close()
+        writer._shared.close()
+
+    def test_unreadable_versions_bypass_the_cache(self, tmp_path):
+        cache = OrderListCache(maxsize=10, ttl=60, max_users=10, shared_path=str(tmp_path / "versions.db"))
+        cache._shared.close()
+        version, page = run(cache.get(1, "q"))
+        assert (version, page) == (None, None)
+        cache.put(1, "q", version, b"[]")
+        assert run(cache.get(1, "q"))[1] is None
+        run(cache.record_write(1))
@@ -0,0 +1,30 @@
+import time
+from app.services.principal_cache import Principal, PrincipalCache
+
+def principal(user_id: int) -> Principal:
+    return Principal(id=user_id, username=f"user{user_id}", email=f"user{user_id}@test.com", role="user", created_at=None)
+
+class TestPrincipalCache:
+    def test_user_index_follows_lru_eviction(self):
+        cache = PrincipalCache(maxsize=2, ttl=60)
+        for login in range(100):
+            cache.put(f"token-{login}", {"exp": time.time() + 60}, principal(login % 3))
+        assert sum(len(tokens) for tokens in cache._tokens_by_user.values()) == 2
+        assert cache.get("token-99") is not None and cache.get("token-98") is not None
+
+    def test_user_index_follows_expiry(self):
+        cache = PrincipalCache(maxsize=10, ttl=60)
+        cache.put("short", {"exp": time.time() + 0.01}, principal(1))
+        time.sleep(0.02)
+        assert cache.get("short") is None
+        assert cache._tokens_by_user == {}
+
+    def test_invalidate_user(self):
+        cache = PrincipalCache(maxsize=10, ttl=60)
+        cache.put("a", {}, principal(1))
+        cache.put("b", {}, principal(1))
+        cache.put("c", {}, principal(2))
+        cache.invalidate_user(1)
+        assert cache.get("a") is None and cache.get("b") is None
+        assert cache.get("c") is not None
+        assert set(cache._tokens_by_user) == {2}
@@ -0,0 +1,96 @@
+import asyncio
+import inspect
+import sqlite3
+import time
+from types import SimpleNamespace
+from fastapi import Request
+from app.core import rate_limit as rate_limit_module
+from app.core.config import settings
+from app.core.rate_limit import MemoryBucketStore, RateLimiter, SQLiteBucketStore, parse_rules, rate_limit, RateLimitRule
+
+
+def test_parse_rules():
+    assert parse_rules("POST /auth/login=10/60, GET /orders/=0/1") == {
+        "POST /auth/login": RateLimitRule(10, 60.0),
+        "GET /orders/": RateLimitRule(0, 1.0),
+    }
+
+def test_memory_bucket_refills():
+    store = MemoryBucketStore()
+    assert [store.take("k", 2, 1.0, 100.0)[0] for _ in range(3)] == [True, True, False]
+    assert store.take("k", 2, 1.0, 101.0)[0] is True
+    assert store.take("k", 2, 1.0, 101.0)[0] is False
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryBucketStore(max_keys=2)
+    store.take("a", 1, 1.0, 0.0)
+    store.take("b", 1, 1.0, 0.0)
+    store.take("a", 1, 1.0, 0.0)
+    store.take("c", 1, 1.0, 0.0)
+    # "b" was evicted and starts with a full bucket; "a" was kept
+    assert store.take("a", 1, 1.0, 0.0)[0] is False
+    assert store.take("b", 1, 1.0, 0.0)[0] is True
+
+def test_sqlite_buckets_shared_between_stores(tmp_path):
+    # Two stores on one file stand in for two worker processes
+    path = str(tmp_path / "limits.db")
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    try:
+        assert first.take("k", 3, 0.5, 100.0) == (True, 2.0)
+        assert second.take("k", 3, 0.5, 100.0) == (True, 1.0)
+        assert first.take("k", 3, 0.5, 100.0) == (True, 0.0)
+        assert second.take("k", 3, 0.5, 100.0) == (False, 0.0)
+        # 0.5 tokens per second: one more request after two seconds
+        assert first.take("k", 3, 0.5, 102.0) == (True, 0.0)
+        # Capped at capacity however long the bucket sits idle
+        assert second.take("k", 3, 0.5, 10000.0) == (True, 2.0)
+    finally:
+        first.close()
+        second.close()
+
+def test_sqlite_store_fails_open_when_locked(tmp_path):
+    path = str(tmp_path / "limits.db")
+    store = SQLiteBucketStore(path)
+    holder = sqlite3.connect(path, isolation_level=None)
+    try:
+        holder.execute("BEGIN IMMEDIATE")
+        began = time.perf_counter()
+        assert store.take("k", 3, 0.5, 100.0) == (True, 3.0)
+        assert time.perf_counter() - began < 1
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+        store.close()
+
+def test_only_the_sqlite_store_is_offloaded(tmp_path, monkeypatch):
+    offloaded = []
+    async def record(func, *args):
+        offloaded.append(args)
+        return func(*args)
+    monkeypatch.setattr(rate_limit_module, "run_in_threadpool", record)
+    memory = RateLimiter(MemoryBucketStore)
+    sqlite_store = SQLiteBucketStore(str(tmp_path / "limits.db"))
+    on_disk = RateLimiter(lambda: sqlite_store)
+    try:
+        # The first check opens the store, so it is offloaded whatever the backend
+        asyncio.run(memory.acheck("GET /x", "a"))
+        asyncio.run(memory.acheck("GET /x", "a"))
+        assert offloaded == [("GET /x", "a")]
+        asyncio.run(on_disk.acheck("GET /x", "b"))
+        asyncio.run(on_disk.acheck("GET /x", "b"))
+        assert offloaded[1:] == [("GET /x", "b"), ("GET /x", "b")]
+    finally:
+        sqlite_store.close()
+
+def test_unlimited_route_skips_the_store(monkeypatch):
+    def no_store():
+        raise AssertionError("store opened for an unlimited route")
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit_module, "rate_limiter", RateLimiter(no_store))
+    monkeypatch.setitem(rate_limit_module.ROUTE_RULES, "GET /orders/", RateLimitRule(0, 60))
+    request = Request({
+        "type": "http", "method": "GET", "headers": [],
+        "route": SimpleNamespace(path_format="/orders/"),
+    })
+    assert inspect.iscoroutinefunction(rate_limit)
+    assert asyncio.run(rate_limit(request)) is None
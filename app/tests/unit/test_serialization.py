@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.schemas.order import OrderListResponse
+from app.utils import serialization
+from app.utils.serialization import encode_order_list
+
+ROWS = [
+    (3, 1, True, datetime(2025, 10, 7, 5, 58, 36)),
+    (2, 7, False, datetime(2025, 10, 7, 5, 58, 36, 120000)),
+    (1, 7, True, datetime(2025, 1, 1, tzinfo=timezone.utc)),
+    (4, 2, False, datetime(2025, 1, 1, 12, tzinfo=timezone(timedelta(hours=5, minutes=30)))),
+]
+
+def pydantic_bytes(rows, next_cursor):
+    orders = [dict(zip(("id", "user_id", "success", "created_at"), row)) for row in rows]
+    return OrderListResponse(orders=orders, next_cursor=next_cursor).model_dump_json().encode()
+
+@pytest.mark.parametrize("next_cursor", [None, "WyIyMDI1LTEwLTA3VDA1OjU4OjM2IiwzXQ"])
+def test_order_list_matches_pydantic(next_cursor):
+    assert encode_order_list(ROWS, next_cursor) == pydantic_bytes(ROWS, next_cursor)
+
+def test_empty_order_list():
+    assert encode_order_list([], None) == b'{"orders":[],"next_cursor":null}'
+
+def test_stdlib_fallback_matches_pydantic(monkeypatch):
+    monkeypatch.setattr(serialization, "dumps", serialization._stdlib_dumps)
+    assert encode_order_list(ROWS, None) == pydantic_bytes(ROWS, None)
+
+def test_export_encodings_match_listing():
+    listed = json.loads(encode_order_list(ROWS, None))["orders"]
+    lines = serialization.encode_order_ndjson(ROWS).decode().splitlines()
+    assert [json.loads(line) for line in lines] == listed
+    rows = list(csv.DictReader(io.StringIO((serialization.EXPORT_CSV_HEADER + serialization.encode_order_csv(ROWS)).decode())))
+    assert [row["created_at"] for row in rows] == [order["created_at"] for order in listed]
+    assert [row["success"] for row in rows] == ["true", "false", "true", "false"]
+
+class TestConditionalResponses:
+    def test_etag_matching(self):
+        etag = serialization.make_etag(b'{"orders":[]}')
+        assert serialization.etag_matches(etag, etag)
+        assert serialization.etag_matches(f'"other", W/{etag}', etag)
+        assert serialization.etag_matches("*", etag)
+        assert not serialization.etag_matches('"other"', etag)
+        assert not serialization.etag_matches(None, etag)
+
+    def test_not_modified_has_no_body(self):
+        etag = serialization.make_etag(b"{}")
+        response = serialization.conditional_json_response(b"{}", etag, etag)
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == etag
@@ -0,0 +1,90 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.db import session as session_module
+from app.db.session import SessionRouter, create_db_engine, create_async_db_engine
+
+PRAGMAS = ("journal_mode", "synchronous", "busy_timeout", "foreign_keys")
+
+class TestSQLiteTuning:
+    def test_sync_connections_get_pragmas(self, tmp_path):
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+        with engine.connect() as conn:
+            values = [conn.execute(text(f"PRAGMA {name}")).scalar() for name in PRAGMAS]
+        engine.dispose()
+        # synchronous=NORMAL reads back as 1
+        assert values == ["wal", 1, 5000, 1]
+
+    def test_async_connections_get_pragmas(self, tmp_path):
+        async def read_pragmas():
+            engine = create_async_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+            async with engine.connect() as conn:
+                values = [(await conn.execute(text(f"PRAGMA {name}"))).scalar() for name in PRAGMAS]
+            await engine.dispose()
+            return values
+        assert asyncio.run(read_pragmas()) == ["wal", 1, 5000, 1]
+
+    def test_pool_is_sized_from_settings(self, tmp_path):
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+        assert engine.pool.size() == 5
+        engine.dispose()
+
+class TestSessionRouter:
+    def test_without_replicas_everything_reads_from_primary(self):
+        router = SessionRouter([], sticky_seconds=5)
+        asyncio.run(router.record_write(1))
+        assert asyncio.run(router.reads_from_primary(None))
+        assert asyncio.run(router.reads_from_primary(2))
+
+    def test_recent_writers_stick_to_primary_until_window_passes(self):
+        router = SessionRouter([("replica", "async replica")], sticky_seconds=0.05)
+        assert not asyncio.run(router.reads_from_primary(1))
+        asyncio.run(router.record_write(1))
+        assert asyncio.run(router.reads_from_primary(1))
+        assert not asyncio.run(router.reads_from_primary(2))
+        assert not asyncio.run(router.reads_from_primary(None))
+        time.sleep(0.06)
+        assert not asyncio.run(router.reads_from_primary(1))
+
+    def test_workers_share_recent_writers(self, tmp_path):
+        path = str(tmp_path / "recent_writes.db")
+        writer = SessionRouter([("replica", "async replica")], sticky_seconds=0.2, shared_path=path)
+        other = SessionRouter([("replica", "async replica")], sticky_seconds=0.2, shared_path=path)
+        asyncio.run(writer.record_write(1))
+        assert asyncio.run(other.reads_from_primary(1))
+        assert not asyncio.run(other.reads_from_primary(2))
+        time.sleep(0.25)
+        assert not asyncio.run(other.reads_from_primary(1))
+        writer._shared.close()
+        other._shared.close()
+
+    def test_unreadable_shared_marks_fall_back_to_primary(self, tmp_path):
+        router = SessionRouter([("replica", "async replica")], sticky_seconds=5,
+                               shared_path=str(tmp_path / "recent_writes.db"))
+        router._shared.close()
+        asyncio.run(router.record_write(1))
+        assert asyncio.run(router.reads_from_primary(1))
+        assert asyncio.run(router.reads_from_primary(2))
+
+    def test_replicas_used_round_robin(self, monkeypatch):
+        opened = []
+        monkeypatch.setattr(session_module, "open_session", lambda sync, async_: opened.append(sync))
+        router = SessionRouter([("a", "async a"), ("b", "async b")], sticky_seconds=5)
+        for _ in range(4):
+            router.open_replica_session()
+        assert opened == ["a", "b", "a", "b"]
+
+    def test_replica_connections_reject_writes(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'replica.db'}"
+        primary = create_db_engine(url)
+        with primary.begin() as conn:
+            conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        replica = create_db_engine(url, read_only=True)
+        with replica.connect() as conn:
+            assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 0
+            with pytest.raises(OperationalError, match="readonly"):
+                conn.execute(text("INSERT INTO t VALUES (1)"))
+        replica.dispose()
+        primary.dispose()
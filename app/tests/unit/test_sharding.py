@@ -0,0 +1,60 @@
+import asyncio
+import os
+import pytest
+from sqlalchemy import text
+from app.db.migrations import run_migrations
+from app.db.session import create_db_engine
+from app.db.sharding import OrderIdAllocator, ShardMap, ShardRouter
+from app.workers.rebalance_shards import plan_rebalance
+
+class TestShardMap:
+    def test_buckets_spread_round_robin_by_default(self):
+        shard_map = ShardMap(["sqlite:///a.db", "sqlite:///b.db"], buckets=8)
+        assert shard_map.assignments == [0, 1, 0, 1, 0, 1, 0, 1]
+        assert shard_map.shard_for(13) == 1
+        assert shard_map.bucket_for(13) == 5
+
+    def test_rejects_assignments_outside_the_map(self):
+        with pytest.raises(ValueError):
+            ShardMap(["sqlite:///a.db"], buckets=2, assignments=[0, 1])
+        with pytest.raises(ValueError):
+            ShardMap(["sqlite:///a.db"], buckets=2, assignments=[0])
+
+    def test_router_picks_up_a_replaced_map(self, tmp_path):
+        path = str(tmp_path / "shards.json")
+        ShardMap(["sqlite:///a.db", "sqlite:///b.db"], buckets=4).save(path)
+        router = ShardRouter(path, check_interval=0)
+        assert router.shard_for(1) == 1
+
+        ShardMap(["sqlite:///a.db", "sqlite:///b.db"], buckets=4, assignments=[0, 0, 0, 1]).save(path)
+        assert router.shard_for(1) == 0
+        assert not os.path.exists(f"{path}.tmp")
+
+    def test_plan_rebalance_evens_out_buckets(self):
+        shard_map = ShardMap(["a", "b", "c"], buckets=8, assignments=[0, 1, 0, 1, 0, 1, 0, 1])
+        moves = plan_rebalance(shard_map)
+        for bucket, source, target in moves:
+            assert shard_map.assignments[bucket] == source
+            shard_map.assignments[bucket] = target
+        assert sorted(len(shard_map.buckets_of(shard)) for shard in range(3)) == [2, 3, 3]
+        assert len(moves) == 2
+
+class TestOrderIdAllocator:
+    @pytest.fixture
+    def primary(self, tmp_path):
+        engine = create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+        run_migrations(engine)
+        yield engine
+        engine.dispose()
+
+    def test_ids_are_unique_across_allocators(self, primary):
+        first, second = OrderIdAllocator(primary, 3), OrderIdAllocator(primary, 3)
+        ids = asyncio.run(first.allocate(4)) + asyncio.run(second.allocate(2)) + asyncio.run(first.allocate(2))
+        assert len(set(ids)) == 8
+        assert ids[:4] == [1, 2, 3, 4]
+
+    def test_skips_ids_used_on_the_primary(self, primary):
+        with primary.begin() as conn:
+            conn.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'u', 'u@test.com', 'x')"))
+            conn.execute(text("INSERT INTO orders (id, user_id, success) VALUES (41, 1, 1)"))
+        assert asyncio.run(OrderIdAllocator(primary, 10).allocate(1)) == [42]
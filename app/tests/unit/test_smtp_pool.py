@@ -0,0 +1,73 @@
+import smtplib
+import pytest
+from app.core.smtp_pool import SMTPConnectionPool
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.closed = False
+        self.alive = True
+        self.fail_next_send = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected()
+        return (250, b"OK")
+
+    def sendmail(self, from_addr, to_addrs, msg, mail_options=()):
+        if self.fail_next_send:
+            self.fail_next_send = False
+            raise smtplib.SMTPServerDisconnected("connection dropped")
+        self.sent.append(msg)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def pool():
+    FakeSMTP.instances = []
+    return SMTPConnectionPool("smtp.test", 25, username="u", password="p", max_size=2,
+                              idle_timeout=60, healthcheck_interval=0, connection_factory=FakeSMTP)
+
+def send(pool, msg):
+    pool.sendmail("shop@test", ["customer@test"], msg)
+
+class TestSMTPConnectionPool:
+    def test_connection_is_reused(self, pool):
+        send(pool, "one")
+        send(pool, "two")
+        assert len(FakeSMTP.instances) == 1
+        assert FakeSMTP.instances[0].sent == ["one", "two"]
+
+    def test_dead_idle_connection_is_replaced(self, pool):
+        send(pool, "one")
+        FakeSMTP.instances[0].alive = False
+        send(pool, "two")
+        assert len(FakeSMTP.instances) == 2
+        assert FakeSMTP.instances[1].sent == ["two"]
+
+    def test_send_retries_on_disconnect(self, pool):
+        send(pool, "one")
+        FakeSMTP.instances[0].fail_next_send = True
+        send(pool, "two")
+        assert FakeSMTP.instances[0].closed
+        assert FakeSMTP.instances[1].sent == ["two"]
+
+    def test_idle_timeout_closes_connection(self, pool):
+        pool.idle_timeout = 0
+        send(pool, "one")
+        send(pool, "two")
+        assert FakeSMTP.instances[0].closed
+        assert len(FakeSMTP.instances) == 2
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect
+from app import main
+from app.core.config import settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def test_import_does_no_io_and_defers_jose(tmp_path):
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'app.db'}",
+        "LOG_FILE": str(tmp_path / "logs" / "app.log"),
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, threading, app.main; "
+                               "print('jose' in sys.modules, threading.active_count())"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    assert output == ["False", "1"]
+    assert not (tmp_path / "app.db").exists()
+    assert not (tmp_path / "logs").exists()
+
+def test_lifespan_migrates_when_enabled(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(main, "engine", engine)
+    monkeypatch.setattr(main, "configure_logging", lambda: None)
+    monkeypatch.setattr(main, "configure_tracing", lambda: None)
+
+    with TestClient(main.app):
+        assert inspect(engine).get_table_names() == []
+
+    monkeypatch.setattr(settings, "DB_MIGRATE_ON_STARTUP", True)
+    with TestClient(main.app):
+        assert {"users", "orders", "schema_version"} <= set(inspect(engine).get_table_names())
+    engine.dispose()
@@ -0,0 +1,40 @@
+import json
+from app.core.tracing import FileSpanWriter, SpanExporter, span, to_otlp_request
+
+
+def test_nested_spans_link_and_track_child_time():
+    with span("outer", "service") as outer:
+        with span("inner", "db") as inner:
+            pass
+    assert inner.parent_id == outer.span_id
+    assert inner.trace_id == outer.trace_id
+    assert outer.child_ns == inner.duration_ns
+    assert outer.duration_ns >= inner.duration_ns
+
+def test_error_is_recorded_on_span():
+    try:
+        with span("failing", "service") as failing:
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert failing.error == "ValueError: boom"
+    encoded = to_otlp_request([failing], "svc")["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert encoded["status"] == {"code": 2, "message": "ValueError: boom"}
+
+def test_otlp_encoding(tmp_path):
+    with span("outer", "service", retries=2) as outer:
+        with span("inner", "db"):
+            pass
+    exporter = SpanExporter(FileSpanWriter(tmp_path / "traces.jsonl"), "svc", interval=0.05)
+    exporter.submit(outer)
+    exporter.shutdown()
+
+    request = json.loads((tmp_path / "traces.jsonl").read_text().splitlines()[0])
+    resource = request["resourceSpans"][0]
+    assert resource["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "svc"}}]
+    encoded = resource["scopeSpans"][0]["spans"][0]
+    assert encoded["traceId"] == outer.trace_id and len(encoded["traceId"]) == 32
+    assert encoded["spanId"] == outer.span_id and "parentSpanId" not in encoded
+    assert int(encoded["endTimeUnixNano"]) - int(encoded["startTimeUnixNano"]) == outer.duration_ns
+    assert {"key": "retries", "value": {"intValue": "2"}} in encoded["attributes"]
+    assert {"key": "app.stage", "value": {"stringValue": "service"}} in encoded["attributes"]
@@ -0,0 +1,79 @@
+"""
+Order archive files: gzip CSV of (id, user_id, success, created_at) rows.
+
+Rows are written in listing order, (created_at, id) descending, so a reader
+looking for the newest rows of a page can stop as soon as it has enough.
+Files are written next to their final path and renamed into place, so a
+reader never sees a partial file.
+"""
+
+import csv
+import gzip
+import io
+import os
+from itertools import islice
+from datetime import datetime
+from typing import Callable, Iterable, NamedTuple, Optional
+
+COLUMNS = ("id", "user_id", "success", "created_at")
+
+class ArchivedOrder(NamedTuple):
+    id: int
+    user_id: int
+    success: bool
+    created_at: datetime
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def next_month(value: datetime) -> datetime:
+    start = month_start(value)
+    return start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+
+class ArchiveWriter:
+    """Appends rows to a new archive file; `commit()` moves it to `path`"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._temp_path = f"{path}.tmp"
+        self._raw = open(self._temp_path, "wb")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", mtime=0)
+        self._text = io.TextIOWrapper(self._gzip, encoding="utf-8", newline="")
+        self._csv = csv.writer(self._text)
+        self._csv.writerow(COLUMNS)
+
+    def write(self, rows: Iterable):
+        for order_id, user_id, success, created_at in rows:
+            self._csv.writerow((order_id, user_id, int(success), created_at.isoformat(sep=" ")))
+            self.rows += 1
+
+    def commit(self):
+        self._text.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        self._text.close()
+        self._raw.close()
+        os.remove(self._temp_path)
+
+def iter_archive(path: str):
+    """Rows of an archive file in file order, read as they are consumed"""
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for order_id, user_id, success, created_at in reader:
+            yield ArchivedOrder(int(order_id), int(user_id), success == "1", datetime.fromisoformat(created_at))
+
+def read_archive(path: str, predicate: Optional[Callable[[ArchivedOrder], bool]] = None,
+                 limit: Optional[int] = None) -> list[ArchivedOrder]:
+    """Rows of an archive file in file order, those matching predicate, at most limit"""
+    if limit is not None and limit <= 0:
+        return []
+    return list(islice(filter(predicate, iter_archive(path)), limit))
@@ -0,0 +1,27 @@
+import base64
+import json
+from datetime import datetime, timezone
+from fastapi import HTTPException, status
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalise a datetime to naive UTC, the form timestamps are stored in"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def encode_cursor(created_at: datetime, order_id: int) -> str:
+    """Opaque keyset cursor pointing just past (created_at, id)"""
+    raw = json.dumps([to_utc_naive(created_at).isoformat(), order_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """(created_at as naive UTC, id) of a cursor; a hand-built cursor may carry an offset"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return to_utc_naive(datetime.fromisoformat(created_at)), int(order_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
@@ -0,0 +1,98 @@
+"""JSON encoding for hot listing endpoints.
+
+Returning ORM objects through a response_model validates every row twice
+(into the schema, then again against response_model) before rendering. The
+encoders here write plain column tuples straight to bytes that are identical
+to what FastAPI renders for the corresponding schema: compact separators,
+keys in field order, datetimes in pydantic's ISO 8601 form.
+
+orjson is used when installed; the standard library produces the same bytes,
+only slower.
+"""
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+def _default(value):
+    if isinstance(value, datetime):
+        # pydantic writes UTC as "Z"; other offsets and naive values match isoformat()
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# One encoder for every call: json.dumps builds a new one whenever options are passed
+_stdlib_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=_default)
+
+def _stdlib_dumps(value) -> bytes:
+    return _stdlib_encoder.encode(value).encode("utf-8")
+
+def _orjson_dumps(value) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+
+dumps = _orjson_dumps if orjson is not None else _stdlib_dumps
+
+def encode_order_list(rows, next_cursor) -> bytes:
+    """OrderListResponse bytes from (id, user_id, success, created_at) rows"""
+    return dumps({
+        "orders": [
+            {"id": order_id, "user_id": user_id, "success": success, "created_at": created_at}
+            for order_id, user_id, success, created_at in rows
+        ],
+        "next_cursor": next_cursor
+    })
+
+EXPORT_CSV_HEADER = b"id,user_id,success,created_at\r\n"
+
+def encode_order_ndjson(rows) -> bytes:
+    """One OrderResponse object per line from (id, user_id, success, created_at) rows"""
+    return b"".join(
+        dumps({"id": order_id, "user_id": user_id, "success": success, "created_at": created_at}) + b"\n"
+        for order_id, user_id, success, created_at in rows
+    )
+
+def encode_order_csv(rows) -> bytes:
+    """CSV lines (after EXPORT_CSV_HEADER) with the values as the JSON encoders write them"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        (order_id, user_id, "true" if success else "false", _default(created_at))
+        for order_id, user_id, success, created_at in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+def encode_order(order) -> bytes:
+    """OrderResponse bytes from an Order (or any object with its four attributes)"""
+    return dumps({"id": order.id, "user_id": order.user_id, "success": order.success, "created_at": order.created_at})
+
+def json_response(content: bytes, headers: dict = None) -> Response:
+    """Already-encoded JSON; FastAPI skips response_model handling for Response objects"""
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def make_etag(content: bytes) -> str:
+    """Strong entity tag for an encoded body"""
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header covers etag (weak comparison, as RFC 9110 requires here)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def conditional_json_response(content: bytes, etag: str, if_none_match: str = None) -> Response:
+    """json_response with an ETag, or 304 Not Modified without a body if the client already has it.
+
+    The body is per user, so shared caches must not store it, and clients
+    revalidate on every use.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(content, headers)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Move cold orders out of the orders table into compressed archive files.
+
+Every whole month before the last ORDER_ARCHIVE_AFTER_MONTHS (the current
+month always stays) is written to a gzip CSV file under ORDER_ARCHIVE_DIR
+and catalogued in order_archives. The archived rows are deleted from orders
+once --settle seconds have passed, so every process has re-read the
+catalogue (ORDER_ARCHIVE_CATALOGUE_TTL) and lists them from the files
+instead. Listings read archived months back from the files once a page
+reaches them, and only the files of the months a date range covers. The
+order_stats rollups of archived months are kept, so stats do not change.
+Orders that reach an archived month later are archived as another file for
+that month on the next run. --vacuum compacts the database files afterwards
+to give the freed pages back to the filesystem.
+
+With order sharding enabled, each shard archives its own orders into a
+shard-N subdirectory. Run it periodically, e.g. daily from cron:
+
+    python -m app.workers.archive_orders
+    python -m app.workers.archive_orders --months 6 --vacuum
+"""
+
+import argparse
+import asyncio
+import os
+from datetime import datetime
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.logger import configure_logging, logger
+from app.db.session import SessionLocal, AsyncSessionLocal, create_db_engine, open_session
+from app.db.sharding import shard_router
+from app.repositories.order_archive_repository import OrderArchiveRepository
+from app.repositories.order_repository import OrderRepository
+from app.utils.order_archive import ArchiveWriter, month_start, next_month
+
+ARCHIVE_BATCH_SIZE = 5000
+DELETE_BATCH_SIZE = 500
+
+def default_session_scope():
+    return open_session(SessionLocal, AsyncSessionLocal)
+
+def archive_cutoff(now: datetime, months: int) -> datetime:
+    """Start of the oldest month kept in the orders table"""
+    start = month_start(now)
+    index = start.year * 12 + start.month - 1 - months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+def default_settle() -> float:
+    """Seconds for every process to re-read the archive catalogue"""
+    ttl = settings.ORDER_ARCHIVE_CATALOGUE_TTL
+    return 2 * ttl + 1 if ttl > 0 else 0
+
+async def archive_month(session_scope, archive_dir: str, starts_at: datetime) -> list[int]:
+    """Write the orders of the month starting at starts_at to a catalogued file; returns their ids.
+
+    The rows stay in the table until delete_archived; listings skip the copies.
+    """
+    ends_at = next_month(starts_at)
+    path = os.path.abspath(os.path.join(
+        archive_dir, f"orders-{starts_at:%Y-%m}-{datetime.utcnow():%Y%m%dT%H%M%S%f}.csv.gz"
+    ))
+    async with session_scope() as db:
+        order_repo = OrderRepository(db)
+        writer = await run_in_threadpool(ArchiveWriter, path)
+        order_ids, after = [], None
+        try:
+            while True:
+                rows = await order_repo.rows_between(starts_at, ends_at, ARCHIVE_BATCH_SIZE, after)
+                if not rows:
+                    break
+                await run_in_threadpool(writer.write, rows)
+                order_ids.extend(row.id for row in rows)
+                after = (rows[-1].created_at, rows[-1].id)
+        except BaseException:
+            await run_in_threadpool(writer.abort)
+            raise
+        if not order_ids:
+            await run_in_threadpool(writer.abort)
+            return []
+        await run_in_threadpool(writer.commit)
+        await OrderArchiveRepository(db).record(path, starts_at, ends_at, len(order_ids))
+        await db.commit()
+    logger.info(f"Archived {len(order_ids)} orders of {starts_at:%Y-%m} to {path}")
+    return order_ids
+
+async def delete_archived(session_scope, order_ids: list[int]):
+    """Delete archived rows from the table, in one transaction"""
+    async with session_scope() as db:
+        order_repo = OrderRepository(db)
+        for start in range(0, len(order_ids), DELETE_BATCH_SIZE):
+            await order_repo.delete_ids(order_ids[start:start + DELETE_BATCH_SIZE])
+        await db.commit()
+
+async def archive_orders(session_scope=default_session_scope, archive_dir: str = settings.ORDER_ARCHIVE_DIR,
+                         months: int = settings.ORDER_ARCHIVE_AFTER_MONTHS, now: datetime = None,
+                         settle: float = None) -> int:
+    cutoff = archive_cutoff(now or datetime.utcnow(), months)
+    async with session_scope() as db:
+        month_starts = await OrderRepository(db).months_before(cutoff)
+    archived = []
+    for starts_at in month_starts:
+        archived.extend(await archive_month(session_scope, archive_dir, starts_at))
+    if archived:
+        # Only the rows written to the files are deleted; any created meanwhile wait for the next run
+        await asyncio.sleep(default_settle() if settle is None else settle)
+        await delete_archived(session_scope, archived)
+    return len(archived)
+
+def vacuum_database(url: str):
+    """Rewrite the database file without its free pages (needs as much free disk space as the file)"""
+    vacuum_engine = create_db_engine(url)
+    try:
+        with vacuum_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM"))
+            connection.execute(text("PRAGMA optimize"))
+    finally:
+        vacuum_engine.dispose()
+
+async def archive_all(archive_dir: str, months: int, vacuum: bool = False, settle: float = None) -> int:
+    if not shard_router.enabled:
+        archived = await archive_orders(archive_dir=archive_dir, months=months, settle=settle)
+        urls = [settings.DATABASE_URL]
+    else:
+        archived = 0
+        for shard in range(shard_router.shard_count):
+            archived += await archive_orders(lambda: shard_router.open_shard_session(shard),
+                                             os.path.join(archive_dir, f"shard-{shard}"), months, settle=settle)
+        urls = list(shard_router.shard_map.shards)
+        await shard_router.dispose()
+    if vacuum:
+        for url in urls:
+            await run_in_threadpool(vacuum_database, url)
+            logger.info(f"Vacuumed {url}")
+    return archived
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=settings.ORDER_ARCHIVE_DIR, help="directory for the archive files")
+    parser.add_argument("--months", type=int, default=settings.ORDER_ARCHIVE_AFTER_MONTHS,
+                        help="whole months to keep in the orders table besides the current one")
+    parser.add_argument("--vacuum", action="store_true", help="compact the database files afterwards")
+    parser.add_argument("--settle", type=float, default=default_settle(),
+                        help="seconds to wait for every process to re-read the catalogue before deleting archived rows")
+    args = parser.parse_args()
+    configure_logging()
+    print(f"Archived {asyncio.run(archive_all(args.dir, args.months, args.vacuum, args.settle))} orders")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Notification worker: drains the order outbox and sends the emails.
+
+Runs as its own process so email latency and SMTP failures never touch the
+API workers, and undelivered messages survive restarts.
+
+    python -m app.workers.notification_worker            # run forever
+    python -m app.workers.notification_worker --once     # drain one batch
+    python -m app.workers.notification_worker --requeue-dead
+    python -m app.workers.notification_worker --shard 1  # one worker per order shard
+"""
+
+import argparse
+import asyncio
+import random
+import signal
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.logger import configure_logging, logger
+from app.core.tracing import configure_tracing
+from app.core.email_templates import get_template_engine
+from app.db.session import SessionLocal, AsyncSessionLocal, open_session
+from app.db.sharding import shard_router
+from app.repositories.outbox_repository import OutboxRepository
+from app.services.email_service import EmailService
+from app.services.order_service import ORDER_SUCCEEDED, ORDER_FAILED, ORDER_BATCH
+
+def send_order_succeeded(payload: dict):
+    EmailService.send_success_email(payload["to_email"], payload["username"], payload["order_id"], payload["created_at"])
+
+def send_order_failed(payload: dict):
+    EmailService.send_failure_email(payload["to_email"], payload["username"], payload["order_id"], payload["created_at"])
+
+def send_order_batch(payload: dict):
+    EmailService.send_batch_summary_email(
+        payload["to_email"], payload["username"], payload["succeeded"], payload["failed"], payload["created_at"]
+    )
+
+HANDLERS = {
+    ORDER_SUCCEEDED: send_order_succeeded,
+    ORDER_FAILED: send_order_failed,
+    ORDER_BATCH: send_order_batch,
+}
+
+def default_session_scope():
+    return open_session(SessionLocal, AsyncSessionLocal)
+
+class NotificationWorker:
+    def __init__(self, session_scope=default_session_scope, batch_size: int = None, concurrency: int = None,
+                 max_attempts: int = None, backoff_base: float = None, backoff_max: float = None):
+        self.session_scope = session_scope
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.concurrency = concurrency or settings.OUTBOX_CONCURRENCY
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self.backoff_base = settings.OUTBOX_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = settings.OUTBOX_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._stopping = asyncio.Event()
+
+    def retry_delay(self, attempts: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+
+    async def _deliver(self, message, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            try:
+                handler = HANDLERS[message.event_type]
+                # Handlers are blocking (pooled SMTP); keep them off the event loop
+                await asyncio.to_thread(handler, message.payload)
+            except Exception as e:
+                if message.attempts >= self.max_attempts:
+                    logger.error(f"Dead-lettering outbox message {message.id} after {message.attempts} attempts: {e}")
+                    retry_at = None
+                else:
+                    retry_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(message.attempts))
+                    logger.warning(f"Outbox message {message.id} failed (attempt {message.attempts}); retrying at {retry_at}: {e}")
+                async with self.session_scope() as db:
+                    await OutboxRepository(db).mark_failed(message.id, str(e), retry_at)
+                return False
+            async with self.session_scope() as db:
+                await OutboxRepository(db).mark_sent(message.id)
+            return True
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch; returns the number of messages claimed"""
+        async with self.session_scope() as db:
+            messages = await OutboxRepository(db).claim_batch(self.batch_size, settings.OUTBOX_LEASE_SECONDS)
+        if messages:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(*(self._deliver(message, semaphore) for message in messages))
+            logger.info(f"Outbox batch: {sum(results)} sent, {len(results) - sum(results)} failed")
+        return len(messages)
+
+    async def run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                logger.error(f"Outbox batch failed: {e}")
+                claimed = 0
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopping.set()
+
+async def requeue_dead(session_scope=default_session_scope) -> int:
+    async with session_scope() as db:
+        return await OutboxRepository(db).requeue_dead()
+
+async def _main(args):
+    session_scope = default_session_scope
+    if args.shard is not None:
+        # Orders, and so their outbox messages, live on the shard
+        session_scope = lambda: shard_router.open_shard_session(args.shard)
+    if args.requeue_dead:
+        print(f"Requeued {await requeue_dead(session_scope)} dead-lettered messages")
+        return
+    worker = NotificationWorker(session_scope)
+    # Compile the email templates before the first batch arrives
+    get_template_engine()
+    if args.once:
+        print(f"Processed {await worker.run_once()} messages")
+        return
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    logger.info("Notification worker started")
+    await worker.run()
+    logger.info("Notification worker stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued order notifications")
+    parser.add_argument("--once", action="store_true", help="process a single batch and exit")
+    parser.add_argument("--requeue-dead", action="store_true", help="move dead-lettered messages back to pending")
+    parser.add_argument("--shard", type=int, help="drain this order shard's outbox instead of the primary's")
+    args = parser.parse_args()
+    configure_logging()
+    configure_tracing()
+    asyncio.run(_main(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Delete expired Idempotency-Key records (older than IDEMPOTENCY_KEY_TTL).
+
+Expired keys are already ignored and can be reused; pruning only keeps the
+idempotency_keys table small. Run it periodically, e.g. hourly from cron:
+
+    python -m app.workers.prune_idempotency_keys
+"""
+
+import argparse
+import asyncio
+from app.core.logger import configure_logging, logger
+from app.db.session import SessionLocal, AsyncSessionLocal, open_session
+from app.db.sharding import shard_router
+from app.repositories.idempotency_repository import IdempotencyRepository
+
+def default_session_scope():
+    return open_session(SessionLocal, AsyncSessionLocal)
+
+async def prune_idempotency_keys(session_scope=default_session_scope) -> int:
+    async with session_scope() as db:
+        deleted = await IdempotencyRepository(db).delete_expired()
+    logger.info(f"Pruned {deleted} expired idempotency keys")
+    return deleted
+
+async def prune_all() -> int:
+    # Keys are stored with the orders they created, so on the shards when sharded
+    if not shard_router.enabled:
+        return await prune_idempotency_keys()
+    deleted = 0
+    for shard in range(shard_router.shard_count):
+        deleted += await prune_idempotency_keys(lambda: shard_router.open_shard_session(shard))
+    await shard_router.dispose()
+    return deleted
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete expired idempotency keys")
+    parser.parse_args()
+    configure_logging()
+    print(f"Pruned {asyncio.run(prune_all())} expired idempotency keys")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Manage the order shard map: create it, add shards and move user buckets.
+
+Moving a bucket copies its orders and unexpired idempotency keys to the new
+shard while the old one still takes writes, switches the bucket in the map,
+waits --settle seconds for every process to pick up the new map
+(ORDER_SHARD_MAP_CHECK_INTERVAL), copies the orders and keys written in the
+meantime, rebuilds the bucket's order_stats on the new shard and deletes the
+bucket from the old one. Pending notifications stay
+in the old shard's outbox and are sent by that shard's worker. Archived
+months (app/workers/archive_orders.py) are not moved: their files and
+order_stats rows stay with the shard that archived them, so a moved user's
+own listings and stats no longer include them.
+
+Splitting a shard is adding one and rebalancing onto it:
+
+    python -m app.workers.rebalance_shards init sqlite:///./orders-0.db sqlite:///./orders-1.db
+    python -m app.workers.rebalance_shards import      # copy the primary's orders into the shards
+    python -m app.workers.rebalance_shards status
+    python -m app.workers.rebalance_shards add-shard sqlite:///./orders-2.db
+    python -m app.workers.rebalance_shards rebalance [--dry-run]
+    python -m app.workers.rebalance_shards move BUCKET SHARD
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from collections import defaultdict
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.core.logger import configure_logging, logger
+from app.db.models import Order
+from app.db.session import SessionLocal, AsyncSessionLocal, open_session
+from app.db.sharding import DEFAULT_BUCKETS, ShardMap, ShardRouter, migrate_shards
+from app.repositories.idempotency_repository import IdempotencyRepository
+from app.repositories.order_archive_repository import OrderArchiveRepository
+from app.repositories.order_repository import OrderRepository
+from app.repositories.order_stats_repository import OrderStatsRepository
+
+COPY_BATCH_SIZE = 5000
+
+def plan_rebalance(shard_map: ShardMap) -> list[tuple[int, int, int]]:
+    """(bucket, source, target) moves that leave every shard within one bucket of the others"""
+    count = len(shard_map.shards)
+    owned = [shard_map.buckets_of(shard) for shard in range(count)]
+    quota = [shard_map.buckets // count + (1 if shard < shard_map.buckets % count else 0) for shard in range(count)]
+    surplus = [bucket for shard in range(count) for bucket in owned[shard][quota[shard]:]]
+    moves = []
+    for shard in range(count):
+        for _ in range(quota[shard] - len(owned[shard])):
+            bucket = surplus.pop()
+            moves.append((bucket, shard_map.assignments[bucket], shard))
+    return moves
+
+async def copy_bucket(router: ShardRouter, source: int, target: int, bucket: int) -> int:
+    """Copy one bucket's orders and idempotency keys from source to target shard, in batches; returns orders read"""
+    buckets = router.shard_map.buckets
+    copied, after_id = 0, 0
+    async with router.open_shard_session(source) as source_db, router.open_shard_session(target) as target_db:
+        while True:
+            rows = await OrderRepository(source_db).rows_after(after_id, COPY_BATCH_SIZE, buckets, bucket)
+            if not rows:
+                break
+            await OrderRepository(target_db).copy_rows(rows)
+            await target_db.commit()
+            copied += len(rows)
+            after_id = rows[-1].id
+        # Without its key a retry on the new shard would create the order again
+        after_key = (-1, "")
+        while True:
+            rows = await IdempotencyRepository(source_db).rows_after(after_key, COPY_BATCH_SIZE, buckets, bucket)
+            if not rows:
+                return copied
+            await IdempotencyRepository(target_db).copy_rows(rows)
+            await target_db.commit()
+            after_key = (rows[-1].user_id, rows[-1].key)
+
+async def move_bucket(router: ShardRouter, bucket: int, target: int, settle: float) -> int:
+    shard_map = router.shard_map
+    source = shard_map.assignments[bucket]
+    if source == target:
+        return 0
+    await copy_bucket(router, source, target, bucket)
+
+    assignments = list(shard_map.assignments)
+    assignments[bucket] = target
+    ShardMap(shard_map.shards, shard_map.buckets, assignments).save(router.path)
+    # Processes still on the old map keep writing to the source until they
+    # reload it; their ids need not be higher, so the whole bucket is re-read
+    await asyncio.sleep(settle)
+    moved = await copy_bucket(router, source, target, bucket)
+
+    async with router.open_shard_session(target) as db:
+        since = await OrderArchiveRepository(db).boundary()
+        await OrderStatsRepository(db).rebuild(shard_map.buckets, bucket, since)
+        await db.commit()
+    async with router.open_shard_session(source) as db:
+        # Archived months stay on the source shard, files and rollups alike
+        since = await OrderArchiveRepository(db).boundary()
+        await OrderRepository(db).delete_bucket(shard_map.buckets, bucket)
+        await IdempotencyRepository(db).delete_bucket(shard_map.buckets, bucket)
+        await OrderStatsRepository(db).delete_bucket(shard_map.buckets, bucket, since)
+        await db.commit()
+    logger.info(f"Moved bucket {bucket} from shard {source} to shard {target} ({moved} orders)")
+    return moved
+
+async def import_primary(router: ShardRouter) -> int:
+    """Copy every order on the primary into its owning shard and rebuild the shards' rollups"""
+    imported, after_id = 0, 0
+    async with open_session(SessionLocal, AsyncSessionLocal) as primary_db:
+        while True:
+            rows = await OrderRepository(primary_db).rows_after(after_id, COPY_BATCH_SIZE)
+            if not rows:
+                break
+            by_shard = defaultdict(list)
+            for row in rows:
+                by_shard[router.shard_for(row.user_id)].append(row)
+            for shard, shard_rows in by_shard.items():
+                async with router.open_shard_session(shard) as db:
+                    await OrderRepository(db).copy_rows(shard_rows)
+                    await db.commit()
+            imported += len(rows)
+            after_id = rows[-1].id
+    for shard in range(router.shard_count):
+        async with router.open_shard_session(shard) as db:
+            await OrderStatsRepository(db).rebuild()
+            await db.commit()
+    return imported
+
+async def shard_order_counts(router: ShardRouter) -> list[int]:
+    return await router.scatter(lambda db: db.scalar(select(func.count()).select_from(Order)))
+
+async def _main(args):
+    if args.command == "init":
+        if os.path.exists(args.map) and not args.force:
+            sys.exit(f"{args.map} already exists (use --force to overwrite)")
+        shard_map = ShardMap(args.urls, args.buckets)
+        migrate_shards(shard_map)
+        shard_map.save(args.map)
+        print(f"Wrote {args.map}: {len(args.urls)} shards, {args.buckets} buckets")
+        return
+
+    router = ShardRouter(args.map, check_interval=0)
+    if args.command == "add-shard":
+        shard_map = router.shard_map
+        migrate_shards(ShardMap([args.url]))
+        ShardMap(shard_map.shards + [args.url], shard_map.buckets, shard_map.assignments).save(args.map)
+        print(f"Added shard {len(shard_map.shards)}: {args.url} (run rebalance to give it buckets)")
+    elif args.command == "status":
+        counts = await shard_order_counts(router)
+        for shard, url in enumerate(router.shard_map.shards):
+            print(f"shard {shard}: {len(router.shard_map.buckets_of(shard)):4d} buckets {counts[shard]:10d} orders  {url}")
+    elif args.command == "import":
+        print(f"Imported {await import_primary(router)} orders from the primary")
+    elif args.command == "move":
+        if not 0 <= args.shard < router.shard_count:
+            sys.exit(f"No shard {args.shard}")
+        print(f"Moved {await move_bucket(router, args.bucket, args.shard, args.settle)} orders")
+    elif args.command == "rebalance":
+        moves = plan_rebalance(router.shard_map)
+        for bucket, source, target in moves:
+            print(f"bucket {bucket}: shard {source} -> shard {target}")
+            if not args.dry_run:
+                await move_bucket(router, bucket, target, args.settle)
+        print(f"{len(moves)} buckets {'to move' if args.dry_run else 'moved'}")
+    await router.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--map", default=settings.ORDER_SHARD_MAP or "./order_shards.json", help="shard map file")
+    parser.add_argument("--settle", type=float, default=2 * settings.ORDER_SHARD_MAP_CHECK_INTERVAL + 1,
+                        help="seconds to wait for every process to reload the map after a bucket moves")
+    commands = parser.add_subparsers(dest="command", required=True)
+    init = commands.add_parser("init", help="create the shard map and migrate the shards")
+    init.add_argument("urls", nargs="+")
+    init.add_argument("--buckets", type=int, default=DEFAULT_BUCKETS)
+    init.add_argument("--force", action="store_true")
+    commands.add_parser("import", help="copy the primary's orders into their shards")
+    commands.add_parser("status", help="buckets and orders per shard")
+    add_shard = commands.add_parser("add-shard", help="append an empty shard to the map")
+    add_shard.add_argument("url")
+    move = commands.add_parser("move", help="move one bucket to another shard")
+    move.add_argument("bucket", type=int)
+    move.add_argument("shard", type=int)
+    rebalance = commands.add_parser("rebalance", help="even out the buckets per shard")
+    rebalance.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(_main(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild the order_stats rollup from the orders table.
+
+The rollup is maintained incrementally as orders are created; run this to
+backfill it (e.g. after importing orders directly) or to repair drift.
+The rebuild runs in one transaction, so readers never see a partial rollup.
+Hours of archived months (app/workers/archive_orders.py) are left alone:
+their orders are no longer in the table to recount.
+With order sharding enabled, each shard's rollup is rebuilt in turn.
+
+    python -m app.workers.rebuild_order_stats
+"""
+
+import argparse
+import asyncio
+from app.core.logger import configure_logging, logger
+from app.db.session import SessionLocal, AsyncSessionLocal, open_session
+from app.db.sharding import shard_router
+from app.repositories.order_archive_repository import OrderArchiveRepository
+from app.repositories.order_stats_repository import OrderStatsRepository
+
+def default_session_scope():
+    return open_session(SessionLocal, AsyncSessionLocal)
+
+async def rebuild_order_stats(session_scope=default_session_scope) -> int:
+    async with session_scope() as db:
+        since = await OrderArchiveRepository(db).boundary()
+        rows = await OrderStatsRepository(db).rebuild(since=since)
+        await db.commit()
+    logger.info(f"Rebuilt order_stats: {rows} rows")
+    return rows
+
+async def rebuild_all() -> int:
+    if not shard_router.enabled:
+        return await rebuild_order_stats()
+    rows = 0
+    for shard in range(shard_router.shard_count):
+        rows += await rebuild_order_stats(lambda: shard_router.open_shard_session(shard))
+    await shard_router.dispose()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the order_stats rollup from orders")
+    parser.parse_args()
+    configure_logging()
+    print(f"Rebuilt order_stats: {asyncio.run(rebuild_all())} rows")
+
+if __name__ == "__main__":
+    main()
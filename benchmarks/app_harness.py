@@ -0,0 +1,39 @@
+"""
+In-process application for benchmarks: a throwaway SQLite database, an
+admin user and a bearer token, driven through httpx's ASGI transport.
+"""
+
+import os
+import tempfile
+
+def prepare_app(db_path: str = None):
+    """Returns (app, token). Must run before anything imports app.core.config."""
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "False")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    from app.core.security import create_access_token, hash_password
+    from app.db.migrations import run_migrations
+    from app.db.models import User
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        user = User(username="bench", email="bench@example.com", hashed_password=hash_password("Bench123!"), role="admin")
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": user.username, "user_id": user.id, "role": user.role})
+    finally:
+        db.close()
+    return app, token
+
+def client_for(app, token: str):
+    import httpx
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {token}"}
+    )
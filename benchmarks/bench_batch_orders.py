@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Per-order cost of N x POST /orders/create vs one POST /orders/batch.
+
+    python -m benchmarks.bench_batch_orders --orders 1000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.app_harness import prepare_app, client_for
+
+async def run(orders: int):
+    app, token = prepare_app()
+    async with client_for(app, token) as client:
+        await client.post("/orders/create", json={"success": True})  # warm up
+
+        began = time.perf_counter()
+        for i in range(orders):
+            response = await client.post("/orders/create", json={"success": i % 10 != 0})
+            response.raise_for_status()
+        single = time.perf_counter() - began
+
+        began = time.perf_counter()
+        response = await client.post("/orders/batch", json={"orders": [{"success": i % 10 != 0} for i in range(orders)]})
+        response.raise_for_status()
+        batch = time.perf_counter() - began
+
+    print(f"single creates: {orders / single:9.0f} orders/s   {single / orders * 1e6:9.1f} us/order")
+    print(f"one batch:      {orders / batch:9.0f} orders/s   {batch / orders * 1e6:9.1f} us/order")
+    print(f"speedup x{single / batch:.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.orders))
+
+if __name__ == "__main__":
+    main()
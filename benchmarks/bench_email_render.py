@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Email rendering cost: per-message MIME construction vs precompiled templates.
+
+"inline" rebuilds the message the way EmailService used to (string literal
+body, MIMEMultipart + MIMEText, serialised per message); "compiled" renders
+through EmailTemplateEngine, which only fills in the per-message fields.
+
+    python -m benchmarks.bench_email_render --messages 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from app.core.email_templates import TEMPLATE_DIR, EmailTemplateEngine
+
+FIELDS = {"username": "alice", "order_id": 123456, "created_at": "2025-10-07 05:58 UTC"}
+
+def inline(messages: int):
+    html_source = (TEMPLATE_DIR / "order_success.html").read_text(encoding="utf-8")
+    text_source = (TEMPLATE_DIR / "order_success.txt").read_text(encoding="utf-8")
+    for i in range(messages):
+        body = html_source
+        text = text_source
+        for name, value in FIELDS.items():
+            body = body.replace("{{ %s }}" % name, str(value))
+            text = text.replace("{{ %s }}" % name, str(value))
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = "Order Successful"
+        msg["From"] = "shop@example.com"
+        msg["To"] = f"user{i}@example.com"
+        msg.attach(MIMEText(text, "plain"))
+        msg.attach(MIMEText(body, "html"))
+        msg.as_bytes()
+
+def compiled(messages: int):
+    engine = EmailTemplateEngine("shop@example.com")
+    for i in range(messages):
+        engine.render("order_success", f"user{i}@example.com", **FIELDS)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+
+    began = time.perf_counter()
+    EmailTemplateEngine("shop@example.com")
+    print(f"template load + compile: {(time.perf_counter() - began) * 1000:.2f} ms")
+
+    rates = {}
+    for name, render in (("inline", inline), ("compiled", compiled)):
+        began = time.perf_counter()
+        render(args.messages)
+        elapsed = time.perf_counter() - began
+        rates[name] = args.messages / elapsed
+        print(f"{name:<9} {rates[name]:10.0f} msg/s   {elapsed / args.messages * 1e6:8.1f} us/msg")
+    print(f"speedup x{rates['compiled'] / rates['inline']:.1f}")
+
+if __name__ == "__main__":
+    main()
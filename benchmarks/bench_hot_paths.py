@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the security and schema functions on the request path.
+
+  security.*   JWT creation and verification, password policy check, and
+               password hashing with the configured KDF and cost
+  auth.*       AuthService.get_current_user with the principal cache hit
+               and missed (JWT decode plus the user SELECT)
+  schema.*     pydantic validation and JSON rendering of OrderResponse
+               and Token
+
+Compare against a stored baseline to judge a change to JWT handling or the
+schemas; the run exits with status 1 if any median got slower by more than
+--threshold:
+
+    python -m benchmarks.bench_hot_paths --baseline benchmarks/baselines/hot_paths.json --save
+    python -m benchmarks.bench_hot_paths --baseline benchmarks/baselines/hot_paths.json --threshold 0.1
+    python -m benchmarks.bench_hot_paths --filter security.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.app_harness import prepare_app
+from benchmarks.microbench import compare, format_result, load_baseline, measure, save_baseline
+
+def build_suite(token: str) -> dict:
+    """Benchmark name -> zero-argument callable (sync or async)"""
+    from app.core.security import create_access_token, hash_password, validate_password, verify_token
+    from app.db.session import AsyncSessionLocal
+    from app.schemas.auth import Token
+    from app.schemas.order import OrderResponse
+    from app.services.auth_service import AuthService
+    from app.services.principal_cache import principal_cache
+
+    claims = {"sub": "bench", "user_id": 1, "role": "admin"}
+    order = SimpleNamespace(id=42, user_id=1, success=True, created_at=datetime(2025, 10, 7, 5, 58, 36))
+    order_model = OrderResponse.model_validate(order)
+    login_response = {
+        "access_token": token,
+        "token_type": "bearer",
+        "user_info": {"id": 1, "username": "bench", "email": "bench@example.com", "role": "admin",
+                      "created_at": datetime(2025, 10, 7, 5, 58, 36)},
+    }
+    token_model = Token.model_validate(login_response)
+
+    async def current_user_cached():
+        async with AsyncSessionLocal() as db:
+            await AuthService(db).get_current_user(token)
+
+    async def current_user_uncached():
+        principal_cache.clear()
+        async with AsyncSessionLocal() as db:
+            await AuthService(db).get_current_user(token)
+
+    return {
+        "security.create_access_token": lambda: create_access_token(claims),
+        "security.verify_token": lambda: verify_token(token),
+        "security.validate_password": lambda: validate_password("Bench123!"),
+        "security.hash_password": lambda: hash_password("Bench123!"),
+        "auth.get_current_user[cached]": current_user_cached,
+        "auth.get_current_user[uncached]": current_user_uncached,
+        "schema.OrderResponse.validate": lambda: OrderResponse.model_validate(order),
+        "schema.OrderResponse.dump_json": order_model.model_dump_json,
+        "schema.Token.validate": lambda: Token.model_validate(login_response),
+        "schema.Token.dump_json": token_model.model_dump_json,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only benchmarks whose name contains this")
+    parser.add_argument("--warmup", type=float, default=0.2, help="seconds")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="seconds per repeat")
+    parser.add_argument("--baseline", help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative slowdown of the median")
+    args = parser.parse_args()
+
+    app, token = prepare_app()
+    from app.core.config import settings
+
+    suite = {name: func for name, func in build_suite(token).items() if args.filter in name}
+    baseline = load_baseline(args.baseline) if args.baseline and not args.save else {}
+    print(f"{settings.PASSWORD_KDF} (bcrypt rounds={settings.BCRYPT_ROUNDS}), {os.cpu_count()} CPUs")
+
+    loop = asyncio.new_event_loop()
+    results, regressions = [], []
+    try:
+        for name, func in suite.items():
+            result = measure(name, func, args.warmup, args.repeat, args.min_time, loop)
+            results.append(result)
+            change, regressed = compare(result, baseline, args.threshold)
+            line = format_result(result)
+            if change is not None:
+                line += f"  {change:+6.1%} vs baseline" + ("  REGRESSION" if regressed else "")
+            if regressed:
+                regressions.append(name)
+            print(line)
+    finally:
+        loop.close()
+
+    if args.save and args.baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Login throughput under concurrency, and what a login burst does to other requests.
+
+Runs --concurrency clients logging in back to back while a probe requests
+/health every 10 ms, once per password hashing executor:
+
+  inline   KDF runs on the event loop (what hashing in the handler would do)
+  thread   default-style thread pool
+  process  the dedicated process pool used in production
+
+    python -m benchmarks.bench_login --logins 200 --concurrency 16 --rounds 12
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.app_harness import prepare_app, client_for
+
+async def run(app, token: str, logins: int, concurrency: int):
+    remaining = logins
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async with client_for(app, token) as client:
+        async def login_worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.post("/auth/login", json={"username": "bench", "password": "Bench123!"})
+                assert response.status_code == 200, response.text
+
+        async def probe():
+            while not done.is_set():
+                began = time.perf_counter()
+                await client.get("/health")
+                probe_latencies.append(time.perf_counter() - began)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        began = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - began
+        done.set()
+        await probe_task
+    return elapsed, probe_latencies
+
+async def compare(app, token: str, args):
+    # One event loop throughout: the app's async connection pool is bound to it
+    from app.core.password_hasher import PasswordHasher
+    from app.services import auth_service
+
+    for executor in ("inline", "thread", "process"):
+        hasher = PasswordHasher(executor, args.workers, max_pending=args.concurrency * 2)
+        auth_service.password_hasher = hasher
+        try:
+            await run(app, token, args.workers, args.workers)  # start workers
+            elapsed, probes = await run(app, token, args.logins, args.concurrency)
+        finally:
+            hasher.shutdown()
+        probes.sort()
+        p99 = probes[min(len(probes) - 1, int(len(probes) * 0.99))] * 1000
+        print(f"{executor:<8} {args.logins / elapsed:7.1f} logins/s   /health during burst: "
+              f"p50 {statistics.median(probes) * 1000:7.1f} ms  p99 {p99:7.1f} ms  ({len(probes)} probes)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    app, token = prepare_app()
+
+    print(f"bcrypt rounds={args.rounds}, {args.logins} logins, concurrency {args.concurrency}, "
+          f"{args.workers} workers, {os.cpu_count()} CPUs")
+    asyncio.run(compare(app, token, args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of the HTTP metrics middleware.
+
+Drives a one-route FastAPI app directly through its ASGI interface (no
+network, no HTTP client) so the difference between variants is the
+middleware itself:
+
+  none         no metrics middleware
+  basehttp     the previous @app.middleware("http") implementation
+  asgi         app.core.metrics.MetricsMiddleware
+
+    python -m benchmarks.bench_metrics_middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from app.core.metrics import MetricsMiddleware
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id, "name": "widget"}
+
+    if variant == "basehttp":
+        registry = CollectorRegistry()
+        request_count = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'], registry=registry)
+        request_duration = Histogram('http_request_duration_seconds', 'HTTP request duration', registry=registry)
+
+        @app.middleware("http")
+        async def metrics_middleware(request: Request, call_next):
+            start_time = time.time()
+            response = await call_next(request)
+            duration = time.time() - start_time
+            request_count.labels(method=request.method, endpoint=request.url.path, status=response.status_code).inc()
+            request_duration.observe(duration)
+            return response
+    elif variant == "asgi":
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def drive(app, requests: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": f"/items/{i}", "raw_path": f"/items/{i}".encode(), "root_path": "",
+            "query_string": b"", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        }
+
+    for i in range(200):
+        await app(scope(i), receive, send)
+    began = time.perf_counter()
+    for i in range(requests):
+        await app(scope(i), receive, send)
+    return time.perf_counter() - began
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    per_request = {}
+    for variant in ("none", "basehttp", "asgi"):
+        elapsed = asyncio.run(drive(build_app(variant), args.requests))
+        per_request[variant] = elapsed / args.requests * 1e6
+        print(f"{variant:<9} {args.requests / elapsed:10.0f} req/s   {per_request[variant]:7.1f} us/req")
+    for variant in ("basehttp", "asgi"):
+        print(f"{variant} overhead: {per_request[variant] - per_request['none']:6.1f} us/req")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+GET /orders/export throughput (rows/s) and memory for growing exports.
+
+For each row count, streams the whole table through OrderService.export_orders
+(the StreamingResponse body, as Starlette would send it) as NDJSON, CSV and
+gzipped CSV, and compares with "buffered": the same rows fetched as one
+OrderRepository.list_orders page and encoded by encode_order_list, which is
+what exporting through GET /orders costs. "peak" is the tracemalloc peak of
+a separate run, so it is the Python heap high-water mark of each path; the
+streamed paths should stay flat as the row count grows.
+
+    python -m benchmarks.bench_order_export --rows 10000 100000 1000000
+    python -m benchmarks.bench_order_export --batch-size 1000 --gzip-level 6
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.app_harness import prepare_app
+
+def seed(path: str, rows: int, users: int = 1000):
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM orders")
+    conn.executemany(
+        "INSERT INTO orders (user_id, success, created_at) VALUES (?, ?, ?)",
+        ((rng.randint(1, users), rng.random() < 0.9, (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"))
+         for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+async def streamed(export_format: str, gzip: bool) -> int:
+    from app.db.session import AsyncSessionLocal
+    from app.schemas.order import OrderExportFilter
+    from app.services.order_service import OrderService
+    async with AsyncSessionLocal() as db:
+        response = await OrderService(db).export_orders(OrderExportFilter(format=export_format, gzip=gzip))
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        return size
+
+async def buffered(rows: int) -> int:
+    from app.db.session import AsyncSessionLocal
+    from app.repositories.order_repository import OrderRepository
+    from app.schemas.order import OrderFilter
+    from app.utils.serialization import encode_order_list
+    filters = OrderFilter.model_construct(limit=rows, cursor=None, success=None, user_id=None,
+                                          created_from=None, created_to=None)
+    async with AsyncSessionLocal() as db:
+        return len(encode_order_list(await OrderRepository(db).list_orders(filters, rows), None))
+
+def measure(run) -> tuple[float, int, int]:
+    """(seconds, bytes, peak heap bytes) of asyncio.run(run()), the peak from a second, traced run"""
+    began = time.perf_counter()
+    size = asyncio.run(run())
+    elapsed = time.perf_counter() - began
+    tracemalloc.start()
+    asyncio.run(run())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--batch-size", type=int, help="ORDER_EXPORT_BATCH_SIZE")
+    parser.add_argument("--gzip-level", type=int, help="ORDER_EXPORT_GZIP_LEVEL")
+    args = parser.parse_args()
+
+    if args.batch_size:
+        os.environ["ORDER_EXPORT_BATCH_SIZE"] = str(args.batch_size)
+    if args.gzip_level is not None:
+        os.environ["ORDER_EXPORT_GZIP_LEVEL"] = str(args.gzip_level)
+    os.environ.setdefault("LOG_ACTION_TIMINGS", "False")
+    os.environ.setdefault("TRACING_ENABLED", "False")
+    prepare_app()
+    from app.core.config import settings
+    print(f"batch size {settings.ORDER_EXPORT_BATCH_SIZE}, gzip level {settings.ORDER_EXPORT_GZIP_LEVEL}")
+
+    paths = [
+        ("ndjson", lambda rows: lambda: streamed("ndjson", False)),
+        ("csv", lambda rows: lambda: streamed("csv", False)),
+        ("csv+gzip", lambda rows: lambda: streamed("csv", True)),
+        ("buffered", lambda rows: lambda: buffered(rows)),
+    ]
+    for rows in args.rows:
+        seed(settings.DATABASE_URL.removeprefix("sqlite:///"), rows)
+        for name, make_run in paths:
+            elapsed, size, peak = measure(make_run(rows))
+            print(f"{rows:>9} rows {name:<9} {rows / elapsed:10.0f} rows/s   "
+                  f"{size / 1024 / 1024:8.1f} MiB out   peak {peak / 1024 / 1024:7.1f} MiB")
+
+if __name__ == "__main__":
+    main()
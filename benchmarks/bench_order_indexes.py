@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Order listing query plans and latency before/after the index migration.
+
+Seeds a database at the baseline schema (migration 1), times the listing
+queries issued by OrderRepository.list_orders, applies the remaining
+migrations and times them again.
+
+    python -m benchmarks.bench_order_indexes --rows 10000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from app.db.migrations import run_migrations
+
+PAGE = 50
+
+QUERIES = {
+    "user listing": (
+        "SELECT id, user_id, success, created_at FROM orders WHERE user_id = :user_id "
+        "ORDER BY created_at DESC, id DESC LIMIT :limit"
+    ),
+    "user listing, deep cursor": (
+        "SELECT id, user_id, success, created_at FROM orders WHERE user_id = :user_id "
+        "AND (created_at < :created_at OR (created_at = :created_at AND id < :id)) "
+        "ORDER BY created_at DESC, id DESC LIMIT :limit"
+    ),
+    "failed orders in range": (
+        "SELECT id, user_id, success, created_at FROM orders WHERE success = 0 "
+        "AND created_at >= :created_from AND created_at < :created_to "
+        "ORDER BY created_at DESC, id DESC LIMIT :limit"
+    ),
+    "admin listing, deep cursor": (
+        "SELECT id, user_id, success, created_at FROM orders "
+        "WHERE created_at < :created_at OR (created_at = :created_at AND id < :id) "
+        "ORDER BY created_at DESC, id DESC LIMIT :limit"
+    ),
+}
+
+def seed(path: str, rows: int, users: int, batch: int = 100_000):
+    start = datetime(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany(
+        "INSERT INTO users (id, username, email, hashed_password, role) VALUES (?, ?, ?, '', 'user')",
+        ((i, f"user{i}", f"user{i}@example.com") for i in range(1, users + 1))
+    )
+    rng = random.Random(42)
+    for offset in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO orders (user_id, success, created_at) VALUES (?, ?, ?)",
+            (
+                (rng.randint(1, users), rng.random() < 0.9,
+                 (start + timedelta(seconds=(offset + i) * 3)).strftime("%Y-%m-%d %H:%M:%S"))
+                for i in range(min(batch, rows - offset))
+            )
+        )
+        conn.commit()
+        print(f"  seeded {min(offset + batch, rows):,}/{rows:,}", end="\r", flush=True)
+    print()
+    conn.execute("ANALYZE")
+    conn.close()
+    return start
+
+def params_for(rows: int, users: int, start: datetime, rng: random.Random) -> dict:
+    deep = start + timedelta(seconds=rows * 3 // 10)
+    return {
+        "user_id": rng.randint(1, users),
+        "limit": PAGE,
+        "created_at": deep.strftime("%Y-%m-%d %H:%M:%S"),
+        "id": rows // 10,
+        "created_from": deep.strftime("%Y-%m-%d %H:%M:%S"),
+        "created_to": (deep + timedelta(days=7)).strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def measure(path: str, rows: int, users: int, start: datetime, repeats: int) -> dict:
+    conn = sqlite3.connect(path)
+    rng = random.Random(7)
+    results = {}
+    for name, sql in QUERIES.items():
+        plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params_for(rows, users, start, rng))]
+        timings = []
+        for _ in range(repeats):
+            params = params_for(rows, users, start, rng)
+            began = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - began) * 1000)
+        results[name] = (plan, statistics.median(timings), max(timings))
+    conn.close()
+    return results
+
+def report(title: str, results: dict):
+    print(f"\n== {title}")
+    for name, (plan, median_ms, max_ms) in results.items():
+        print(f"{name:<28} median {median_ms:9.3f} ms   max {max_ms:9.3f} ms")
+        for step in plan:
+            print(f"    {step}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--db", default="bench_orders.db")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database file")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    run_migrations(engine, target=1)
+    print(f"Seeding {args.rows:,} orders for {args.users:,} users into {args.db}")
+    start = seed(args.db, args.rows, args.users)
+
+    report("before (baseline schema)", measure(args.db, args.rows, args.users, start, args.repeats))
+
+    began = time.perf_counter()
+    run_migrations(engine)
+    print(f"\nMigrations applied in {time.perf_counter() - began:.1f}s")
+    sqlite3.connect(args.db).execute("ANALYZE")
+
+    report("after (indexes + foreign key)", measure(args.db, args.rows, args.users, start, args.repeats))
+
+    engine.dispose()
+    if not args.keep:
+        os.remove(args.db)
+
+if __name__ == "__main__":
+    main()
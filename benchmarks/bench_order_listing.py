@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Order listing serialization: ORM + response_model versus column rows + orjson.
+
+For each page size, times fetching and encoding one page both ways:
+
+  orm   select(Order) entities, validated into OrderListResponse and again
+        by FastAPI against response_model, then rendered (the old path)
+  fast  OrderRepository.list_orders column rows encoded by encode_order_list
+
+and checks both produce identical bytes.
+
+    python -m benchmarks.bench_order_listing --rows 1000 10000 100000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.app_harness import prepare_app
+
+def seed(path: str, rows: int):
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO orders (user_id, success, created_at) VALUES (1, ?, ?)",
+        ((rng.random() < 0.9, (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S")) for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+async def orm_page(db, filters, limit: int) -> bytes:
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from app.db.models import Order
+    from app.schemas.order import OrderListResponse
+
+    query = select(Order).order_by(Order.created_at.desc(), Order.id.desc()).limit(limit)
+    orders = list((await db.scalars(query)).all())
+    response = OrderListResponse(orders=orders, next_cursor=None)
+    adapter = TypeAdapter(OrderListResponse)
+    return adapter.dump_json(adapter.validate_python(response, from_attributes=True))
+
+async def fast_page(db, filters, limit: int) -> bytes:
+    from app.repositories.order_repository import OrderRepository
+    from app.utils.serialization import encode_order_list
+    return encode_order_list(await OrderRepository(db).list_orders(filters, limit), None)
+
+async def time_path(path, filters, limit: int, repeat: int):
+    from app.db.session import AsyncSessionLocal
+    timings = []
+    body = None
+    for _ in range(repeat + 1):  # first run warms the connection and caches
+        async with AsyncSessionLocal() as db:
+            began = time.perf_counter()
+            body = await path(db, filters, limit)
+            timings.append(time.perf_counter() - began)
+    return statistics.median(timings[1:]) * 1000, body
+
+async def compare(sizes, repeat: int):
+    from app.schemas.order import OrderFilter
+    filters = OrderFilter.model_construct(limit=max(sizes), cursor=None, success=None, user_id=None,
+                                          created_from=None, created_to=None)
+    for size in sizes:
+        orm_ms, orm_body = await time_path(orm_page, filters, size, repeat)
+        fast_ms, fast_body = await time_path(fast_page, filters, size, repeat)
+        assert orm_body == fast_body, "encodings differ"
+        print(f"{size:>7} rows: orm {orm_ms:9.1f} ms   fast {fast_ms:9.1f} ms   "
+              f"{orm_ms / fast_ms:5.1f}x   {len(fast_body) / 1024:8.0f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app, _ = prepare_app()
+    from app.core.config import settings
+    seed(settings.DATABASE_URL.removeprefix("sqlite:///"), max(args.rows))
+    asyncio.run(compare(args.rows, args.repeat))
+
+if __name__ == "__main__":
+    main()
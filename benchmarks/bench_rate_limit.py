@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Rate limiter cost per request, and consistency across worker processes.
+
+"check" times RateLimiter.check directly for each store; "dependency" adds
+client identification (JWT decode) and route lookup by driving a request
+through the app with the limiter enabled and then disabled. Finally several
+processes hammer one SQLite bucket to show the limit holds across workers.
+
+    python -m benchmarks.bench_rate_limit --checks 20000 --processes 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.app_harness import prepare_app, client_for
+
+def time_checks(store, checks: int, keys: int) -> float:
+    from app.core.rate_limit import RateLimiter
+    limiter = RateLimiter(lambda: store)
+    limiter.check("GET /bench", "warmup")
+    began = time.perf_counter()
+    for i in range(checks):
+        limiter.check("GET /bench", f"user:{i % keys}")
+    return (time.perf_counter() - began) / checks * 1e6
+
+async def time_requests(app, token: str, requests: int) -> float:
+    async with client_for(app, token) as client:
+        for _ in range(50):
+            await client.get("/auth/me")
+        began = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/auth/me")
+        return (time.perf_counter() - began) / requests * 1e6
+
+def hammer(path: str, attempts: int, results):
+    from app.core.rate_limit import SQLiteBucketStore
+    store = SQLiteBucketStore(path)
+    allowed = sum(store.take("shared", 100, 0.0001, time.time())[0] for _ in range(attempts))
+    results.put(allowed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    app, token = prepare_app()
+    from app.core.config import settings
+    from app.core.rate_limit import MemoryBucketStore, SQLiteBucketStore, rate_limiter
+
+    workdir = tempfile.mkdtemp(prefix="bench-ratelimit-")
+    for keys in (1, 10000):
+        memory = time_checks(MemoryBucketStore(), args.checks, keys)
+        sqlite = time_checks(SQLiteBucketStore(os.path.join(workdir, f"check-{keys}.db")), args.checks, keys)
+        print(f"check, {keys:>5} keys: memory {memory:6.1f} us   sqlite {sqlite:6.1f} us")
+
+    # Large limit so every request is allowed and does the full check
+    settings.RATE_LIMIT_REQUESTS = 10 ** 9
+    settings.RATE_LIMIT_SQLITE_PATH = os.path.join(workdir, "app.db")
+    timings = {}
+    for enabled in (False, True):
+        settings.RATE_LIMIT_ENABLED = enabled
+        timings[enabled] = asyncio.run(time_requests(app, token, args.requests))
+    print(f"GET /auth/me: {timings[False]:7.1f} us without limiter, {timings[True]:7.1f} us with "
+          f"({settings.RATE_LIMIT_BACKEND}), overhead {timings[True] - timings[False]:6.1f} us")
+    rate_limiter.reset()
+
+    path = os.path.join(workdir, "shared.db")
+    SQLiteBucketStore(path).close()
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=hammer, args=(path, 1000, results)) for _ in range(args.processes)]
+    began = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    allowed = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - began
+    print(f"{args.processes} processes x 1000 attempts on a 100-token bucket: {allowed} allowed "
+          f"({args.processes * 1000 / elapsed:.0f} checks/s)")
+
+if __name__ == "__main__":
+    main()
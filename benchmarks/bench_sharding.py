@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Order write throughput with the orders spread over 1, 2, 4... shards.
+
+Each writer process runs OrderService.create_order back to back (order,
+order_stats upsert and outbox row in one transaction) for its share of the
+users, for --duration seconds. "primary" is the unsharded baseline, every
+order on DATABASE_URL; the sharded runs use a shard map with that many shard
+databases, so writers whose users live on different shards no longer queue
+for the same write lock.
+
+How much sharding helps depends on how long the lock is held: with
+synchronous=FULL every commit waits for an fsync while holding it, with
+NORMAL (the default) a WAL commit is mostly CPU, and on a machine with fewer
+cores than writers the processes compete for CPU instead.
+
+    python -m benchmarks.bench_sharding --writers 8 --shards 1,2,4 --duration 5
+    python -m benchmarks.bench_sharding --synchronous FULL
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+def writer(env: dict, users: list[int], duration: float, start_at: float, results):
+    os.environ.update(env)
+    from fastapi import HTTPException
+    from app.db.session import AsyncSessionLocal
+    from app.db.sharding import shard_router
+    from app.schemas.order import OrderCreate
+    from app.services.order_service import OrderService
+    from app.services.principal_cache import Principal
+
+    principals = [Principal(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                            role="user", created_at=None) for user_id in users]
+    order = OrderCreate(success=True)
+
+    async def run():
+        committed = failed = 0
+        await asyncio.sleep(max(0.0, start_at - time.time()))
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            async with AsyncSessionLocal() as db:
+                try:
+                    await OrderService(db).create_order(order, principals[(committed + failed) % len(principals)])
+                    committed += 1
+                except HTTPException:
+                    failed += 1
+        await shard_router.dispose()
+        return committed, failed
+    results.put(asyncio.run(run()))
+
+def prepare(workdir: str, shards: int, users: int, env: dict) -> dict:
+    """Primary with users (and a shard map when shards > 0); returns the writers' environment"""
+    os.environ.update(env)
+    from app.db.migrations import run_migrations
+    from app.db.sharding import ShardMap, migrate_shards
+
+    url = f"sqlite:///{os.path.join(workdir, 'primary.db')}"
+    primary = create_engine(url)
+    run_migrations(primary)
+    with primary.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_password, role) VALUES "
+                          "(:id, :username, :email, '', 'user')"),
+                     [{"id": i, "username": f"user{i}", "email": f"user{i}@example.com"} for i in range(1, users + 1)])
+    primary.dispose()
+
+    run_env = {**env, "DATABASE_URL": url, "ORDER_SHARD_MAP": ""}
+    if shards:
+        shard_map = ShardMap([f"sqlite:///{os.path.join(workdir, f'orders-{i}.db')}" for i in range(shards)])
+        migrate_shards(shard_map)
+        run_env["ORDER_SHARD_MAP"] = os.path.join(workdir, "shards.json")
+        shard_map.save(run_env["ORDER_SHARD_MAP"])
+    return run_env
+
+def run(shards: int, args, env: dict) -> float:
+    workdir = tempfile.mkdtemp(prefix="bench-sharding-")
+    run_env = prepare(workdir, shards, args.users, env)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start_at = time.time() + args.startup
+    processes = [
+        context.Process(target=writer, args=(run_env, list(range(w + 1, args.users + 1, args.writers)),
+                                             args.duration, start_at, results))
+        for w in range(args.writers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    committed = sum(c for c, _ in outcomes)
+    failed = sum(f for _, f in outcomes)
+    throughput = committed / args.duration
+    label = f"{shards} shard{'s' if shards > 1 else ''}" if shards else "primary"
+    print(f"{label:<10} {throughput:9.0f} orders/s   committed={committed} failed={failed}", end="")
+    return throughput
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8, help="writer processes")
+    parser.add_argument("--shards", default="1,2,4", help="comma-separated shard counts")
+    parser.add_argument("--users", type=int, default=256)
+    parser.add_argument("--duration", type=float, default=5, help="seconds of writing per run")
+    parser.add_argument("--startup", type=float, default=3, help="seconds allowed for the writers to import the app")
+    parser.add_argument("--synchronous", default="NORMAL", help="SQLITE_SYNCHRONOUS for every database")
+    args = parser.parse_args()
+
+    env = {
+        "SQLITE_SYNCHRONOUS": args.synchronous,
+        "LOG_LEVEL": "WARNING",
+        "LOG_ACTION_TIMINGS": "False",
+        "TRACING_ENABLED": "False",
+        "RATE_LIMIT_ENABLED": "False",
+    }
+    print(f"{args.writers} writers, synchronous={args.synchronous}, {os.cpu_count()} CPUs")
+    baseline = run(0, args, env)
+    print()
+    for shards in (int(count) for count in args.shards.split(",")):
+        throughput = run(shards, args, env)
+        print(f"   x{throughput / baseline:.2f} vs primary")
+
+if __name__ == "__main__":
+    main()
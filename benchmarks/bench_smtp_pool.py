@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Email throughput: one SMTP connection per message vs the pooled sessions.
+
+Runs against a local stand-in server whose per-connection delay models the
+TLS handshake and login of a real relay.
+
+    python -m benchmarks.bench_smtp_pool --messages 500 --concurrency 8 --connect-delay 0.05
+"""
+
+import argparse
+import os
+import smtplib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.email_templates import get_template_engine
+from app.core.smtp_pool import SMTPConnectionPool
+from benchmarks.smtp_server import StandInSMTPServer
+
+SENDER, RECIPIENT = "shop@example.com", "customer@example.com"
+
+def per_message(port: int):
+    def send(msg):
+        server = smtplib.SMTP("127.0.0.1", port)
+        server.sendmail(SENDER, [RECIPIENT], msg)
+        server.quit()
+    return send
+
+def pooled(pool: SMTPConnectionPool):
+    return lambda msg: pool.sendmail(SENDER, [RECIPIENT], msg)
+
+def run(name: str, send, messages: int, concurrency: int, server: StandInSMTPServer):
+    # The message the notification worker sends, as EmailService renders it
+    msg = get_template_engine().render("order_success", RECIPIENT, username="customer", order_id=1,
+                                       created_at="2026-01-01 12:00 UTC")
+    server.connections = server.messages = 0
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: send(msg), range(messages)))
+    elapsed = time.perf_counter() - began
+    print(f"{name:<14} {messages / elapsed:9.1f} msg/s   {elapsed:7.2f}s   "
+          f"connections={server.connections} delivered={server.messages}")
+    return messages / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--connect-delay", type=float, default=0.05, help="seconds per new connection")
+    parser.add_argument("--rtt", type=float, default=0.0, help="seconds per SMTP command")
+    args = parser.parse_args()
+
+    server = StandInSMTPServer(connect_delay=args.connect_delay, rtt=args.rtt).start()
+    try:
+        baseline = run("per-message", per_message(server.port), args.messages, args.concurrency, server)
+        pool = SMTPConnectionPool("127.0.0.1", server.port, use_tls=False, max_size=args.concurrency)
+        pooled_rate = run("pooled", pooled(pool), args.messages, args.concurrency, server)
+        pool.close()
+        print(f"speedup x{pooled_rate / baseline:.1f}")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Concurrent create_order-style commits: default SQLite engine vs tuned engine.
+
+Each writer process repeatedly commits one order plus its outbox row, like
+OrderService.create_order, against a shared database file. "default" is the
+engine as originally configured (rollback journal, synchronous=FULL, no
+explicit busy_timeout); "tuned" is create_db_engine with the Settings
+pragmas (WAL, synchronous=NORMAL, busy_timeout, cache/mmap sizing).
+
+    python -m benchmarks.bench_sqlite_writers --writers 8 --commits 300
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+def writer(mode: str, url: str, commits: int, user_id: int, results):
+    from sqlalchemy.exc import OperationalError
+    from app.db.session import create_db_engine
+    if mode == "tuned":
+        engine = create_db_engine(url)
+    else:
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    locked = 0
+    for _ in range(commits):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO orders (user_id, success) VALUES (:user_id, 1)"), {"user_id": user_id})
+                conn.execute(text(
+                    "INSERT INTO outbox (event_type, payload, status, attempts) VALUES ('order.succeeded', '{}', 'pending', 0)"
+                ))
+        except OperationalError:
+            locked += 1
+    engine.dispose()
+    results.put(locked)
+
+def run(mode: str, writers: int, commits: int):
+    from app.db.migrations import run_migrations
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-writers-"), "orders.db")
+    url = f"sqlite:///{path}"
+    setup = create_engine(url)
+    run_migrations(setup)
+    with setup.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, email, hashed_password, role) VALUES (1, 'u', 'u@example.com', '', 'user')"))
+    setup.dispose()
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=writer, args=(mode, url, commits, 1, results)) for _ in range(writers)]
+    began = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - began
+    locked = sum(results.get() for _ in processes)
+    committed = writers * commits - locked
+    print(f"{mode:<8} {committed / elapsed:9.0f} commits/s   {elapsed:6.2f}s   "
+          f"committed={committed} 'database is locked'={locked}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--commits", type=int, default=300, help="commits per writer")
+    args = parser.parse_args()
+    for mode in ("default", "tuned"):
+        run(mode, args.writers, args.commits)
+
+if __name__ == "__main__":
+    main()
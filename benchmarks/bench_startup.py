@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cold start: import time of app.main and time to first request under uvicorn.
+
+Each sample is a fresh interpreter, as with every new uvicorn worker:
+
+  import          `import app.main`, timed inside the process
+  ready           uvicorn launched until GET /health first answers 200
+  first login     the first POST /auth/login (starts the password hashing pool)
+  first listing   the first authenticated GET /orders/
+
+The run exits with status 1 if the median import or ready time is over its
+budget, so scaling out workers and cold starts stay fast.
+
+    python -m benchmarks.bench_startup --samples 5 --import-budget-ms 600 --ready-budget-ms 1500
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from app.tests.load.harness import ADMIN, ROOT, free_port
+
+IMPORT_SNIPPET = "import time; began = time.perf_counter(); import app.main; print((time.perf_counter() - began) * 1000)"
+
+def time_import(env: dict) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def time_server(env: dict) -> tuple:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    began = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--no-access-log", "--log-level", "warning"],
+        cwd=ROOT, env=env, start_new_session=True
+    )
+    try:
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            while True:
+                try:
+                    if client.get("/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter() - began
+
+            mark = time.perf_counter()
+            token = client.post("/auth/login", json=ADMIN).json()["access_token"]
+            login = time.perf_counter() - mark
+
+            mark = time.perf_counter()
+            client.get("/orders/", headers={"Authorization": f"Bearer {token}"}).raise_for_status()
+            listing = time.perf_counter() - mark
+    finally:
+        process.terminate()
+        process.wait()
+    return ready * 1000, login * 1000, listing * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=600)
+    parser.add_argument("--ready-budget-ms", type=float, default=1500)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra app environment")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "RATE_LIMIT_ENABLED": "False",
+        "LOG_FILE": os.path.join(workdir, "app.log"),
+        "LOG_LEVEL": "WARNING",
+        **dict(item.split("=", 1) for item in args.env),
+    }
+    subprocess.run([sys.executable, os.path.join(ROOT, "init_db.py")], cwd=ROOT, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+
+    imports = [time_import(env) for _ in range(args.samples)]
+    servers = [time_server(env) for _ in range(args.samples)]
+    medians = {
+        "import": statistics.median(imports),
+        "ready": statistics.median(s[0] for s in servers),
+        "first login": statistics.median(s[1] for s in servers),
+        "first listing": statistics.median(s[2] for s in servers),
+    }
+    budgets = {"import": args.import_budget_ms, "ready": args.ready_budget_ms}
+
+    over = []
+    for name, value in medians.items():
+        budget = budgets.get(name)
+        verdict = ""
+        if budget is not None:
+            verdict = f"  budget {budget:.0f} ms " + ("OK" if value <= budget else "OVER")
+            if value > budget:
+                over.append(name)
+        print(f"{name:<14} {value:8.1f} ms (median of {args.samples}){verdict}")
+    if over:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
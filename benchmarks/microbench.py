@@ -0,0 +1,111 @@
+"""
+Micro-benchmark timing with warmup, repeats and baseline comparison.
+
+measure() runs a callable for --warmup seconds, picks a loop count so each
+repeat lasts about --min-time seconds, then times --repeat such loops with
+the garbage collector disabled (as timeit does). The per-call median is the
+headline number; min, mean, standard deviation and interquartile range show
+how noisy it was. Coroutine functions are awaited on the given event loop.
+
+Baselines are JSON files of per-benchmark statistics plus the machine they
+were recorded on, in the load-test harness's format (app/tests/load/harness.py,
+which reads and writes them for both); compare() flags benchmarks whose median got slower than
+the baseline by more than a threshold.
+"""
+
+import gc
+import inspect
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from app.tests.load import harness
+from app.tests.load.harness import load_baseline
+
+@dataclass
+class Result:
+    name: str
+    number: int          # calls per repeat
+    repeat: int
+    median_ns: float     # per call
+    min_ns: float
+    mean_ns: float
+    stdev_ns: float
+    iqr_ns: float
+
+    @property
+    def ops_per_sec(self) -> float:
+        return 1e9 / self.median_ns if self.median_ns else 0.0
+
+def _runner(func, loop):
+    """Callable timing `number` back-to-back calls of func, in nanoseconds"""
+    if inspect.iscoroutinefunction(func):
+        async def calls(number):
+            began = time.perf_counter_ns()
+            for _ in range(number):
+                await func()
+            return time.perf_counter_ns() - began
+        return lambda number: loop.run_until_complete(calls(number))
+
+    def run(number):
+        began = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        return time.perf_counter_ns() - began
+    return run
+
+def measure(name: str, func, warmup: float = 0.2, repeat: int = 7, min_time: float = 0.1, loop=None) -> Result:
+    run = _runner(func, loop)
+
+    # Warm caches and find how many calls fill min_time
+    number = 1
+    deadline = time.perf_counter() + warmup
+    while True:
+        elapsed = run(number) / 1e9
+        if elapsed >= min_time and time.perf_counter() >= deadline:
+            break
+        if elapsed < min_time:
+            number = max(number + 1, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = [run(number) / number for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    return Result(
+        name=name,
+        number=number,
+        repeat=repeat,
+        median_ns=statistics.median(samples),
+        min_ns=min(samples),
+        mean_ns=statistics.fmean(samples),
+        stdev_ns=statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        iqr_ns=quartiles[2] - quartiles[0],
+    )
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
+
+def format_result(result: Result, width: int = 40) -> str:
+    spread = result.stdev_ns / result.median_ns if result.median_ns else 0.0
+    return (f"{result.name:<{width}} {format_ns(result.median_ns):>10}  "
+            f"min {format_ns(result.min_ns):>10}  +-{spread:5.1%}  "
+            f"{result.ops_per_sec:12,.0f} ops/s  ({result.repeat} x {result.number})")
+
+def save_baseline(path: str, results: list):
+    """Merge results into the baseline file, keyed by benchmark name"""
+    harness.save_baseline(path, [asdict(result) for result in results], key=lambda result: result["name"])
+
+def compare(result: Result, baseline: dict, threshold: float = 0.1):
+    """Relative change of the median against the baseline (None without one), and whether it regressed"""
+    previous = baseline.get("results", {}).get(result.name)
+    if previous is None:
+        return None, False
+    change = (result.median_ns - previous["median_ns"]) / previous["median_ns"]
+    return change, change > threshold
@@ -0,0 +1,69 @@
+"""
+Minimal stand-in SMTP server for benchmarks.
+
+Accepts EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP and QUIT and discards the
+messages. ``connect_delay`` models the TCP + STARTTLS + AUTH handshake a
+real relay costs per connection, and ``rtt`` the round-trip per command.
+"""
+
+import socketserver
+import threading
+import time
+
+class _Handler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        if self.server.rtt:
+            time.sleep(self.server.rtt)
+        self.wfile.write(line.encode() + b"\r\n")
+        self.wfile.flush()
+
+    def handle(self):
+        self.server.connections += 1
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+        self.reply("220 localhost stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.split(b" ", 1)[0].strip().upper()
+            if command == b"EHLO":
+                self.reply("250-localhost\r\n250-8BITMIME\r\n250 SIZE 10485760")
+            elif command in (b"HELO", b"MAIL", b"RCPT", b"RSET", b"NOOP"):
+                self.reply("250 OK")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 OK queued")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, connect_delay: float = 0.0, rtt: float = 0.0):
+        super().__init__((host, port), _Handler)
+        self.connect_delay = connect_delay
+        self.rtt = rtt
+        self.connections = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "StandInSMTPServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Database initialization script for Mini Order Management Service
-Creates tables and initial admin user
+Applies schema migrations and creates the initial admin user
 """
 
 import sys
@@ -10,14 +10,23 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal, engine
-from app.db.models import Base, User
+from app.db.models import User
+from app.db.migrations import run_migrations
+from app.db.sharding import migrate_shards, shard_router
 from app.core.security import hash_password
 from app.core.config import settings
+from app.core.logger import configure_logging
 
 def init_db():
     """Initialize database with tables and admin user"""
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    print("Applying database migrations...")
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+    if shard_router.enabled and not os.path.exists(shard_router.path):
+        print(f"Shard map {shard_router.path} not found; create it with app/workers/rebalance_shards.py init")
+    elif shard_router.enabled:
+        for url, applied in migrate_shards(shard_router.shard_map).items():
+            print(f"Shard {url}: applied migrations {applied}" if applied else f"Shard {url}: schema is up to date")
     
     db = SessionLocal()
     try:
@@ -49,4 +58,5 @@ def init_db():
         db.close()
 
 if __name__ == "__main__":
+    configure_logging()
     init_db()